@@ -2,6 +2,7 @@
 #
 # SPDX-License-Identifier: MIT
 from floodsystem.stationdata import build_station_list
+from floodsystem import profiling
 
 
 def run():
@@ -23,4 +24,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 1A: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -7,6 +7,7 @@ Created on Sat Jan 18 17:22:45 2020
 
 from floodsystem.stationdata import build_station_list
 from floodsystem.geo import stations_by_distance
+from floodsystem import profiling
 
 
 def run():
@@ -32,4 +33,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 1B: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -7,6 +7,7 @@ Created on Sat Jan 18 17:38:52 2020
 
 from floodsystem.stationdata import build_station_list
 from floodsystem.geo import stations_within_radius
+from floodsystem import profiling
 
 
 def run():
@@ -23,4 +24,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 1C: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -7,6 +7,7 @@ Created on Sun Jan 18 20:47:52 2020
 
 from floodsystem.stationdata import build_station_list
 from floodsystem.geo import rivers_with_stations, stations_by_river
+from floodsystem import profiling
 
 
 def run():
@@ -30,4 +31,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 1D: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -7,6 +7,7 @@ Created on Sun Jan 18 21:26:52 2020
 
 import floodsystem.geo as geo
 import floodsystem.stationdata as stationdata
+from floodsystem import profiling
 
 
 def run():
@@ -20,4 +21,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 1E: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -7,6 +7,7 @@ Created on Sat Jan 23 12:22:45 2020
 
 from floodsystem.stationdata import build_station_list
 from floodsystem.station import MonitoringStation
+from floodsystem import profiling
 
 
 def run():
@@ -22,4 +23,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 1F: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: MIT
 
 from floodsystem.stationdata import build_station_list, update_water_levels
+from floodsystem import profiling
 
 
 def run():
@@ -30,4 +31,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 2A: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -9,6 +9,7 @@ from floodsystem.stationdata import build_station_list, update_water_levels
 from floodsystem.geo import rivers_with_stations, stations_by_river
 from floodsystem.station import MonitoringStation
 from floodsystem.flood import stations_level_over_threshold, stations_highest_rel_level
+from floodsystem import profiling
 
 
 def run():
@@ -27,4 +28,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 2C: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
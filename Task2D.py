@@ -5,6 +5,7 @@
 import datetime
 from floodsystem.datafetcher import fetch_measure_levels
 from floodsystem.stationdata import build_station_list
+from floodsystem import profiling
 
 
 def run():
@@ -47,4 +48,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 2D: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
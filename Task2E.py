@@ -5,6 +5,7 @@ from floodsystem.stationdata import build_station_list
 from floodsystem.datafetcher import fetch_measure_levels
 from floodsystem.flood import stations_highest_rel_level
 from floodsystem.plot import plot_water_levels
+from floodsystem import profiling
 
 
 def run():
@@ -31,4 +32,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 2E: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -10,6 +10,7 @@ from floodsystem.stationdata import build_station_list
 from floodsystem.datafetcher import fetch_measure_levels
 from floodsystem.flood import stations_highest_rel_level
 from floodsystem.plot import plot_water_levels_with_fit
+from floodsystem import profiling
 
 
 def run():
@@ -36,4 +37,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 2F: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from floodsystem.stationdata import build_station_list, \
-    build_station_dataframe, update_water_levels
-from floodsystem.warningdata import build_warning_list, build_regions_geojson,\
+from floodsystem.pipeline import startup
+from floodsystem.stationdata import build_station_dataframe
+from floodsystem.warningdata import build_regions_geojson, \
     build_severity_dataframe, update_poly_area_caches
 from floodsystem.warning import FloodWarning, SeverityLevel
-from floodsystem.plot import map_flood_warnings,\
-    get_recommended_simplification_params
+from floodsystem.plot import map_flood_warnings
+from floodsystem import profiling
 
 
 def run():
@@ -14,31 +14,22 @@ def run():
 
     # a severity of moderate includes all currently active flood warnings
     # severity.low includes warnings which were in force in the past 24 hours
-    stations = build_station_list()
-    update_water_levels(stations)
-
     severity = SeverityLevel.moderate
 
-    print("Building warning list of severity {}...".format(severity.value))
-    warnings = build_warning_list(severity.value)
+    # stations, levels and warnings are fetched concurrently, and warning
+    # geometry is simplified as soon as it arrives
+    print("Building station list and warning list of severity {}...".format(
+        severity.value))
+    stations, warnings = startup(severity.value)
     if len(warnings) == 0:
         print("No warnings of this severity")
         return
 
-    print("Simplifying geometry...")
-    simplification_params = get_recommended_simplification_params(len(warnings))
-
-    for warning in warnings:
-        # if the simplification parameters used for the cached file were
-        # incorrect, resimplify the geometry
-        if warning.is_poly_simplified != simplification_params:
-            print('resimplifying')
-            warning.simplify_geojson(tol=simplification_params['tol'],
-                                     buf=simplification_params['buf'])
-            warning.is_poly_simplified = simplification_params
-
     print("Making datasets...")
-    geojson = build_regions_geojson(warnings)
+    # only the warning id is needed to match regions to the dataframe,
+    # and 5 decimal places of coordinates is roughly 1m
+    geojson = build_regions_geojson(warnings, precision=5,
+                                    properties=['FWS_TACODE'])
     df = build_severity_dataframe(warnings)
     df2 = build_station_dataframe(stations)
 
@@ -70,4 +61,4 @@ def run():
 
 if __name__ == "__main__":
     print("*** Task 2G: CUED Part IA Flood Warning System ***")
-    run()
+    profiling.main(run)
@@ -0,0 +1,6 @@
+"""Benchmarks for the floodsystem package.
+
+Benchmarks are run from the repository root as modules, e.g.
+
+    python -m benchmarks.bench_station_memory
+"""
@@ -0,0 +1,80 @@
+"""Measure the cold import time of the floodsystem modules.
+
+Each module is imported in a fresh interpreter run with -X importtime, and
+the cumulative import time of the module, including everything it imports,
+is read from the report. The best of several runs is compared with a budget,
+so regressions such as a heavy dependency imported at module level, rather
+than through utils.lazy_import, are caught:
+
+    python -m benchmarks.bench_import_time --budget 50
+
+The exit status is non-zero if any module is over the budget.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+MODULES = ['floodsystem.station', 'floodsystem.datafetcher',
+           'floodsystem.stationdata', 'floodsystem.geo', 'floodsystem.flood',
+           'floodsystem.warning', 'floodsystem.warningdata',
+           'floodsystem.plot', 'floodsystem.index', 'floodsystem.monitor',
+           'floodsystem.asyncdatafetcher', 'floodsystem.pipeline']
+
+# milliseconds
+DEFAULT_BUDGET = 50.0
+# modules built on asyncio, which alone takes about 40 ms to import
+BUDGETS = {'floodsystem.asyncdatafetcher': 100.0,
+           'floodsystem.pipeline': 100.0}
+
+
+def import_time(module):
+    """Return the cumulative time to import a module in a fresh
+    interpreter, in milliseconds."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=root, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError("no import time reported for " + module)
+
+
+def run(modules=MODULES, budget=DEFAULT_BUDGET, repeat=5):
+    """Print the import time of each module, returning the modules over
+    budget.
+
+    The budget of the modules in BUDGETS is scaled in proportion to the
+    given budget.
+    """
+    over = []
+    print("{:<30} {:>10} {:>10}".format("module", "time (ms)", "budget"))
+    for module in modules:
+        t = min(import_time(module) for _ in range(repeat))
+        module_budget = BUDGETS.get(module, DEFAULT_BUDGET) * \
+            budget / DEFAULT_BUDGET
+        ok = t <= module_budget
+        if not ok:
+            over.append(module)
+        print("{:<30} {:>10.1f} {:>10.0f} {}".format(
+            module, t, module_budget, "ok" if ok else "OVER"))
+    return over
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modules", nargs='*', default=MODULES,
+                        help="modules to import, by default all floodsystem "
+                             "modules")
+    parser.add_argument("-b", "--budget", type=float, default=DEFAULT_BUDGET,
+                        help="maximum import time of each module, in ms, "
+                             "scaled for the modules built on asyncio")
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+                        help="number of runs, of which the best is taken")
+    args = parser.parse_args()
+    if run(args.modules, args.budget, args.repeat):
+        sys.exit(1)
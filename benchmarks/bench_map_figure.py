@@ -0,0 +1,101 @@
+"""Measure construction time and output size of the flood warning map.
+
+Large station and warning sets are made by replicating the test station
+data and by placing square warning regions at random across England. The
+customdata previously built with DataFrame.iterrows() is measured alongside
+the column-selected arrays now passed to plotly.
+"""
+
+import argparse
+import random
+import time
+import plotly.graph_objects as go
+from shapely.geometry import box, mapping
+from floodsystem.plot import create_flood_warning_map
+from floodsystem.stationdata import build_station_list, \
+    build_station_dataframe
+from floodsystem.warning import FloodWarning
+from floodsystem.warningdata import build_regions_geojson, \
+    build_severity_dataframe
+
+
+def make_stations(copies):
+    """Replicate the test stations, with random levels."""
+    rng = random.Random(0)
+    stations = []
+    for _ in range(copies):
+        for station in build_station_list(use_cache=False, test=True):
+            station.latest_level = rng.uniform(-0.5, 3.0)
+            stations.append(station)
+    return stations
+
+
+def make_warnings(n):
+    """Create n warnings with square regions at random locations."""
+    rng = random.Random(0)
+    warnings = []
+    for i in range(n):
+        lat, long = rng.uniform(50.5, 54.5), rng.uniform(-4.0, 1.0)
+        region = box(long, lat, long + 0.05, lat + 0.05)
+        identifier = "BENCH{:05d}".format(i)
+        geojson = [{'type': 'Feature',
+                    'properties': {'FWS_TACODE': identifier},
+                    'geometry': mapping(region)}]
+        warning = FloodWarning(identifier=identifier, county="Somerset",
+                               label="Benchmark area {}".format(i),
+                               severity_lev=rng.randint(1, 4),
+                               message="Flood warning",
+                               region=[region], geojson=geojson)
+        warning.last_update = "2020-01-01T00:00:00"
+        warnings.append(warning)
+    return warnings
+
+
+def time_call(func, *args, **kwargs):
+    """Return the result of func and the time it took, in seconds."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def customdata_size(customdata):
+    """Return the size in bytes of a trace holding customdata, as JSON."""
+    return len(go.Scattermapbox(customdata=customdata).to_json())
+
+
+def run(station_copies=5, num_warnings=500):
+    """Report figure build time and size, and customdata cost per method."""
+    station_df = build_station_dataframe(make_stations(station_copies))
+    warnings = make_warnings(num_warnings)
+    warning_df = build_severity_dataframe(warnings)
+    geojson = build_regions_geojson(warnings)
+
+    fig, build_time = time_call(create_flood_warning_map, geojson,
+                                warning_df=warning_df, station_df=station_df)
+    print("{} stations, {} warnings".format(len(station_df), len(warnings)))
+    print("figure build: {:.3f} s, {:.1f} kB JSON".format(
+        build_time, len(fig.to_json()) / 1024))
+
+    print("{:<10} {:<10} {:>10} {:>12}".format("data", "method", "time (s)",
+                                               "size (kB)"))
+    station_cols = ['name', 'level', 'typical_low', 'typical_high',
+                    'rel_level', 'town']
+    warning_cols = ['severity', 'label', 'last_updated', 'county']
+    for name, df, cols in (("stations", station_df, station_cols),
+                           ("warnings", warning_df, warning_cols)):
+        rows, rows_time = time_call(lambda: [row for _, row in df.iterrows()])
+        arr, arr_time = time_call(lambda: df[cols].to_numpy(dtype=object))
+        print("{:<10} {:<10} {:>10.3f} {:>12.1f}".format(
+            name, "iterrows", rows_time, customdata_size(rows) / 1024))
+        print("{:<10} {:<10} {:>10.3f} {:>12.1f}".format(
+            name, "columns", arr_time, customdata_size(arr) / 1024))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--station-copies", type=int, default=5,
+                        help="number of copies of the test station data")
+    parser.add_argument("-w", "--warnings", type=int, default=500,
+                        help="number of synthetic warnings")
+    args = parser.parse_args()
+    run(args.station_copies, args.warnings)
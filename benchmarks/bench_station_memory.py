@@ -0,0 +1,67 @@
+"""Measure the memory footprint of MonitoringStation objects.
+
+The test station data is replicated to reach a realistic station list size,
+and the memory allocated while building the list is reported per station.
+A plain __dict__ based class holding the same attributes is measured
+alongside for reference.
+"""
+
+import argparse
+import tracemalloc
+from floodsystem.station import MonitoringStation
+from floodsystem.stationdata import build_station_list
+
+
+class DictStation:
+    """Reference station with a per-instance __dict__ and tuple coordinate."""
+
+    def __init__(self, station_id, measure_id, label, coord, typical_range,
+                 river, town):
+        self.station_id = station_id
+        self.measure_id = measure_id
+        self.name = label
+        self.coord = coord
+        self.typical_range = typical_range
+        self.river = river
+        self.town = town
+        self.latest_level = None
+
+
+def measure(station_class, template, copies):
+    """Return the bytes allocated building copies of the template stations.
+
+    Strings are copied so that each replicated station owns distinct string
+    objects, as it would when parsed from freshly fetched JSON.
+    """
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    stations = []
+    for _ in range(copies):
+        for s in template:
+            stations.append(station_class(
+                "".join(s.station_id), "".join(s.measure_id), s.name,
+                (s.coord[0], s.coord[1]), s.typical_range,
+                "".join(s.river) if s.river is not None else None,
+                "".join(s.town) if s.town is not None else None))
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return end - start, len(stations)
+
+
+def run(copies=2):
+    """Report the memory used per station for each station representation."""
+    template = build_station_list(use_cache=False, test=True)
+
+    for station_class in (DictStation, MonitoringStation):
+        total, n = measure(station_class, template, copies)
+        print("{:<20} {:>7} stations {:>10.1f} kB {:>8.1f} B/station".format(
+            station_class.__name__, n, total / 1024, total / n))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--copies", type=int, default=2,
+                        help="number of copies of the test station data to "
+                             "build")
+    args = parser.parse_args()
+    run(args.copies)
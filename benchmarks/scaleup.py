@@ -0,0 +1,53 @@
+"""Scaled-up station data for benchmarks.
+
+Station data is made by replicating the test station data with jittered
+locations and unique identifiers. Synthetic warning data is generated by
+floodsystem.synthetic.
+"""
+
+import random
+from floodsystem import datafetcher
+
+
+def scale_station_data(n, seed=0):
+    """Return station data with n stations, based on the test data.
+
+    Parameters
+    ----------
+    n : int
+        number of stations.
+    seed : int, optional
+        random seed. The default is 0.
+
+    Returns
+    -------
+    dict
+        station data in the form returned by datafetcher.fetch_station_data.
+
+    """
+    rng = random.Random(seed)
+    template = datafetcher.fetch_test_station_data()['items']
+    items = []
+    for i in range(n):
+        e = dict(template[i % len(template)])
+        copy = i // len(template)
+        if copy:
+            e['@id'] = "{}-{}".format(e['@id'], copy)
+            e['measures'] = [dict(m, **{'@id': "{}-{}".format(m['@id'], copy)})
+                             for m in e.get('measures', [])]
+            if 'lat' in e and 'long' in e:
+                e['lat'] = e['lat'] + rng.uniform(-0.05, 0.05)
+                e['long'] = e['long'] + rng.uniform(-0.05, 0.05)
+        items.append(e)
+    return {'items': items}
+
+
+def level_data_for(station_data, seed=0):
+    """Return latest reading data with a random level for every station."""
+    rng = random.Random(seed)
+    items = []
+    for e in station_data['items']:
+        for m in e.get('measures', [])[-1:]:
+            items.append({'latestReading': {'measure': m['@id'],
+                                            'value': rng.uniform(0.0, 3.0)}})
+    return {'items': items}
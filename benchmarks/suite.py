@@ -0,0 +1,384 @@
+"""Benchmark suite for the floodsystem hot paths.
+
+Run the suite, optionally saving the results as the baseline:
+
+    python -m benchmarks.suite run --stations 10000 100000 --warnings 200
+    python -m benchmarks.suite run --save-baseline
+
+and compare results against the baseline, failing if any benchmark is
+slower by more than the threshold:
+
+    python -m benchmarks.suite run --output results.json
+    python -m benchmarks.suite compare benchmarks/baseline.json results.json
+
+Each benchmark is run a number of times and the minimum and median times
+are recorded. Station data is scaled up from the test data by
+benchmarks.scaleup and warning data is generated by floodsystem.synthetic.
+All fetches go to a datafetcher.StubDataSource, so the results do not
+depend on the network.
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from floodsystem import geo, geometrystore
+from floodsystem.flood import stations_highest_rel_level
+from floodsystem.index import WarningIndex
+from floodsystem.lookup import lookup_csv
+from floodsystem.plot import create_flood_warning_map
+from floodsystem.stationdata import build_station_list, update_water_levels, \
+    build_station_dataframe
+from floodsystem.synthetic import SyntheticDataset
+from floodsystem.warning import FloodWarning
+from floodsystem.warningdata import build_warning_list, \
+    build_regions_geojson, build_severity_dataframe
+from benchmarks import scaleup
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# registered benchmarks, as (name, kind, function) where kind is the data
+# the benchmark is scaled by and function takes the data and returns a
+# callable to be timed
+BENCHMARKS = []
+
+
+def benchmark(kind):
+    """Register a benchmark scaled by 'stations' or 'warnings'."""
+    def register(func):
+        BENCHMARKS.append((func.__name__, kind, func))
+        return func
+    return register
+
+
+class Data:
+    """Lazily built benchmark data for a given number of stations and
+    warnings."""
+
+    def __init__(self, n_stations, n_warnings):
+        self.n_stations = n_stations
+        self.n_warnings = n_warnings
+        self._source = None
+        self._stations = None
+        self._warnings = None
+
+    @property
+    def source(self):
+        if self._source is None:
+            station_data = scaleup.scale_station_data(self.n_stations)
+            self._source = SyntheticDataset(
+                n_stations=0, n_warnings=self.n_warnings,
+                polygon_vertices=200).source()
+            self._source.station_data = station_data
+            self._source.level_data = scaleup.level_data_for(station_data)
+        return self._source
+
+    @property
+    def stations(self):
+        if self._stations is None:
+            self._stations = build_station_list(source=self.source)
+            update_water_levels(self._stations, source=self.source)
+        return self._stations
+
+    @property
+    def warnings(self):
+        if self._warnings is None:
+            self._warnings = build_warning_list(4, use_pickle_caches=False,
+                                                source=self.source)
+        return self._warnings
+
+
+def query_points(n, seed=0):
+    """Return n random (lat, long) points across England."""
+    rng = random.Random(seed)
+    return [(rng.uniform(50.5, 54.5), rng.uniform(-4.0, 1.0))
+            for _ in range(n)]
+
+
+@benchmark('stations')
+def bench_build_station_list(data):
+    source = data.source
+    return lambda: build_station_list(source=source)
+
+
+@benchmark('stations')
+def bench_stations_by_distance(data):
+    stations = data.stations
+    return lambda: geo.stations_by_distance(stations, (52.2053, 0.1218))
+
+
+@benchmark('stations')
+def bench_stations_by_river(data):
+    stations = data.stations
+    return lambda: geo.stations_by_river(stations)
+
+
+@benchmark('stations')
+def bench_stations_highest_rel_level(data):
+    stations = data.stations
+    return lambda: stations_highest_rel_level(stations, 10)
+
+
+@benchmark('warnings')
+def bench_build_warning_list(data):
+    source = data.source
+
+    def run():
+        # the regions of data.warnings would otherwise be reused
+        geometrystore.store.clear()
+        build_warning_list(4, use_pickle_caches=False, source=source)
+    return run
+
+
+@benchmark('warnings')
+def bench_simplify_geojson(data):
+    warnings = data.warnings
+
+    def run():
+        for w in warnings:
+            # a new geometry, without the simplified versions of the last run
+            g = w.geometry
+            w.geometry = geometrystore.RegionGeometry(g.key, g.geojson,
+                                                      g.region)
+            w.simplify_geojson(tol=0.001, buf=0.002)
+    return run
+
+
+@benchmark('warnings')
+def bench_simplify_geojson_cached(data):
+    warnings = data.warnings
+    for w in warnings:
+        w.simplify_geojson(tol=0.001, buf=0.002)
+
+    def run():
+        for w in warnings:
+            w.simplify_geojson(tol=0.001, buf=0.002)
+    return run
+
+
+@benchmark('warnings')
+def bench_check_warnings_at_location(data):
+    warnings = data.warnings
+    points = query_points(100)
+
+    def run():
+        for p in points:
+            FloodWarning.check_warnings_at_location(warnings, p)
+    return run
+
+
+@benchmark('stations')
+def bench_assign_stations(data):
+    stations = data.stations
+    index = WarningIndex(data.warnings)
+    return lambda: index.assign_stations(stations)
+
+
+@benchmark('stations')
+def bench_warning_masks(data):
+    coords = [s.coord for s in data.stations if s.coord is not None]
+    warnings = data.warnings
+    return lambda: FloodWarning.warning_masks(warnings, coords)
+
+
+@benchmark('warnings')
+def bench_lookup_locations(data):
+    index = WarningIndex(data.warnings)
+    points = query_points(10000)
+    return lambda: index.warnings_at_many(points)
+
+
+@benchmark('stations')
+def bench_nearest_warnings(data):
+    coords = [s.coord for s in data.stations if s.coord is not None]
+    index = WarningIndex(data.warnings)
+    return lambda: index.nearest_warnings(coords)
+
+
+@benchmark('warnings')
+def bench_lookup_csv(data):
+    index = WarningIndex(data.warnings)
+    text = "lat,long\n" + "".join("{},{}\n".format(*p)
+                                  for p in query_points(10000))
+
+    def run():
+        lookup_csv(index, io.StringIO(text), io.StringIO())
+    return run
+
+
+@benchmark('warnings')
+def bench_map_flood_warnings(data):
+    warnings = data.warnings
+    geojson = build_regions_geojson(warnings, precision=5,
+                                    properties=['FWS_TACODE'])
+    warning_df = build_severity_dataframe(warnings)
+    station_df = build_station_dataframe(data.stations)
+    return lambda: create_flood_warning_map(geojson, warning_df=warning_df,
+                                            station_df=station_df)
+
+
+def time_benchmark(func, repeat):
+    """Return the times of repeated calls of func, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(station_counts, warning_counts, repeat=5, names=None):
+    """Run the benchmarks and return the results.
+
+    Benchmarks scaled by stations are run for each station count, with the
+    smallest warning count, and those scaled by warnings for each warning
+    count, with the smallest station count.
+
+    Parameters
+    ----------
+    station_counts : list[int]
+        numbers of stations.
+    warning_counts : list[int]
+        numbers of warnings.
+    repeat : int, optional
+        number of times each benchmark is run. The default is 5.
+    names : list[string], optional
+        run only the benchmarks with these names. The default is None, where
+        all benchmarks are run.
+
+    Returns
+    -------
+    dict
+        the results, with metadata describing the machine.
+
+    """
+    datasets = {}
+
+    def data_for(n_stations, n_warnings):
+        key = (n_stations, n_warnings)
+        if key not in datasets:
+            datasets[key] = Data(n_stations, n_warnings)
+        return datasets[key]
+
+    results = {}
+    for name, kind, func in BENCHMARKS:
+        if names is not None and name not in names:
+            continue
+        if kind == 'stations':
+            cases = [data_for(n, min(warning_counts)) for n in station_counts]
+        else:
+            cases = [data_for(min(station_counts), n) for n in warning_counts]
+        for data in cases:
+            n = data.n_stations if kind == 'stations' else data.n_warnings
+            key = "{}[{}={}]".format(name, kind, n)
+            times = time_benchmark(func(data), repeat)
+            results[key] = {'min': min(times),
+                            'median': statistics.median(times),
+                            'repeat': repeat}
+            print("{:<55} {:>10.4f} s {:>10.4f} s".format(
+                key, results[key]['min'], results[key]['median']))
+
+    return {'meta': {'date': datetime.datetime.now().isoformat(),
+                     'python': platform.python_version(),
+                     'platform': platform.platform(),
+                     'machine': platform.machine()},
+            'results': results}
+
+
+def compare(baseline, current, threshold=0.2):
+    """Compare benchmark results against a baseline.
+
+    Parameters
+    ----------
+    baseline, current : dict
+        results returned by run.
+    threshold : float, optional
+        the fractional slow-down of the median time above which a benchmark
+        is reported as a regression. The default is 0.2.
+
+    Returns
+    -------
+    regressions : list[string]
+        names of the benchmarks which regressed.
+
+    """
+    regressions = []
+    print("{:<55} {:>10} {:>10} {:>8}".format("benchmark", "baseline",
+                                              "current", "ratio"))
+    for key, result in current['results'].items():
+        if key not in baseline['results']:
+            print("{:<55} {:>10} {:>10.4f}".format(key, "-",
+                                                   result['median']))
+            continue
+        base = baseline['results'][key]['median']
+        ratio = result['median'] / base if base > 0 else float('inf')
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print("{:<55} {:>10.4f} {:>10.4f} {:>8.2f}{}".format(
+            key, base, result['median'], ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="floodsystem benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="run the benchmarks")
+    run_parser.add_argument("--stations", type=int, nargs='+',
+                            default=[10000],
+                            help="numbers of stations to benchmark with")
+    run_parser.add_argument("--warnings", type=int, nargs='+', default=[200],
+                            help="numbers of warnings to benchmark with")
+    run_parser.add_argument("-r", "--repeat", type=int, default=5,
+                            help="number of times each benchmark is run")
+    run_parser.add_argument("-b", "--benchmark", nargs='+', default=None,
+                            dest='names', help="benchmarks to run")
+    run_parser.add_argument("-o", "--output", type=str, default=None,
+                            help="file to save the results to")
+    run_parser.add_argument("--save-baseline", action='store_true',
+                            dest='save_baseline',
+                            help="save the results as the baseline, in "
+                                 "benchmarks/baseline.json")
+
+    compare_parser = subparsers.add_parser(
+        'compare', help="compare results against a baseline")
+    compare_parser.add_argument("baseline", type=str)
+    compare_parser.add_argument("current", type=str)
+    compare_parser.add_argument("-t", "--threshold", type=float, default=0.2,
+                                help="fractional slow-down reported as a "
+                                     "regression")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run(args.stations, args.warnings, args.repeat, args.names)
+        outputs = [args.output] if args.output else []
+        if args.save_baseline:
+            outputs.append(BASELINE_FILE)
+        for output in outputs:
+            with open(output, 'w') as f:
+                json.dump(results, f, indent=1)
+            print("Results saved to {}".format(output))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print("{} benchmark(s) regressed".format(len(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,52 +1,45 @@
 """Flood warning system extension demo code."""
 
 import argparse
-from progressbar import ProgressBar
-from floodsystem.stationdata import build_station_list, \
-    build_station_dataframe, update_water_levels
-from floodsystem.warningdata import build_warning_list, build_regions_geojson,\
+import os
+from floodsystem.pipeline import startup
+from floodsystem.stationdata import build_station_dataframe
+from floodsystem.warningdata import build_regions_geojson, \
     build_severity_dataframe, update_poly_area_caches
 from floodsystem.warning import FloodWarning, SeverityLevel
-from floodsystem.plot import map_flood_warnings, \
-    get_recommended_simplification_params
+from floodsystem.plot import map_flood_warnings
+from floodsystem import lookup, profiling
 
 
 def run(severity, coords, plot_warnings, plot_stations, print_messages,
-        overwrite_cache, simpl_params):
+        overwrite_cache, simpl_params, output_file=None, locations_file=None,
+        locations_output=None):
 
     warning_df = None
     station_df = None
     geojson = []
-    warnings = []
-
-    if plot_warnings or print_messages or overwrite_cache or coords is not None:
-        # create warning list of the required severity level
-        print("building warning list for {} severity warnings..."
-              .format(severity.name))
-        warnings = build_warning_list(severity.value, progress_bar=True)
-        if len(warnings) == 0:
-            print("No warnings of this severity available")
-        print("")
-
-    if plot_warnings or overwrite_cache:
-        # if we are plotting the warnings or updating the cache the warning
-        # geometry should be simplified
-        print("Simplifying geometry...")
-        bar = ProgressBar(max_value=len(warnings)).start()
-        # if the simplification parameters were not explicitly specified,
-        # uses the recommended ones
-        if simpl_params is None:
-            simpl_params = get_recommended_simplification_params(len(warnings))
-
-        for progress_count, warning in enumerate(warnings):
-            # if the cached geometry was simplified differently, resimplify
-            if warning.is_poly_simplified != simpl_params:
-                warning.simplify_geojson(tol=simpl_params['tol'],
-                                         buf=simpl_params['buf'])
-                warning.is_poly_simplified = simpl_params
-            bar.update(progress_count)
-        bar.finish()
-        print("")
+
+    load_warnings = plot_warnings or print_messages or overwrite_cache \
+        or coords is not None or locations_file is not None
+
+    # the station, level and warning data are fetched concurrently, and
+    # if we are plotting the warnings or updating the cache the warning
+    # geometry is simplified as it arrives. If the simplification
+    # parameters were not explicitly specified, the recommended ones are used.
+    # Otherwise the geometry is only loaded if needed to check a location,
+    # unless there is a file of locations, where all of it is needed
+    geometry_needed = plot_warnings or overwrite_cache \
+        or locations_file is not None
+    print("Building station list and warning list for {} severity "
+          "warnings...".format(severity.name))
+    stations, warnings = startup(severity.value, load_stations=plot_stations,
+                                 load_warnings=load_warnings,
+                                 simplify=geometry_needed,
+                                 simpl_params=simpl_params,
+                                 lazy_geometry=not geometry_needed)
+    if load_warnings and len(warnings) == 0:
+        print("No warnings of this severity available")
+    print("")
 
     if len(warnings) != 0:
         # caches are updated as long as some warnings are present
@@ -57,20 +50,29 @@ def run(severity, coords, plot_warnings, plot_stations, print_messages,
         # if we are plotting, build a dataframe and geojson object
         # containing information about each warnings and its geometry
         warning_df = build_severity_dataframe(warnings)
-        geojson = build_regions_geojson(warnings)
+        # only the warning id is needed to match regions to the dataframe,
+        # and 5 decimal places of coordinates is roughly 1m
+        geojson = build_regions_geojson(warnings, precision=5,
+                                        properties=['FWS_TACODE'])
 
     if plot_stations:
-        print("Building station list and updating water levels...")
-        stations = build_station_list()
-        update_water_levels(stations)
-
         station_df = build_station_dataframe(stations)
 
     # mapping if there is anything to map
     if plot_warnings or plot_stations:
         print("Mapping...")
-        map_flood_warnings(geojson, warning_df=warning_df,
-                           min_severity=severity.value, station_df=station_df)
+        if output_file is None:
+            map_flood_warnings(geojson, warning_df=warning_df,
+                               min_severity=severity.value,
+                               station_df=station_df)
+        else:
+            # write the map to a file without opening a browser
+            output = 'json' if output_file.endswith('.json') else 'html'
+            map_flood_warnings(geojson, warning_df=warning_df,
+                               min_severity=severity.value,
+                               station_df=station_df, output=output,
+                               filename=output_file)
+            print("Map written to {}".format(output_file))
 
     if print_messages:
         # we want the most severe warnings last - the list will be long
@@ -95,6 +97,18 @@ def run(severity, coords, plot_warnings, plot_stations, print_messages,
                 print(warning)
                 print("\n")
 
+    # checks for flood warnings at each location in a CSV file
+    if locations_file is not None:
+        output_name = locations_output if locations_output is not None \
+            else "warnings_" + os.path.basename(locations_file)
+        print("Checking for warnings at the locations in {}...".format(
+            locations_file))
+        with open(locations_file, newline='') as infile, \
+                open(output_name, 'w', newline='') as outfile:
+            rows, affected = lookup.lookup_csv(warnings, infile, outfile)
+        print("{} of {} locations are affected by a warning, written to "
+              "{}".format(affected, rows, output_name))
+
     print("Done")
 
 
@@ -161,6 +175,25 @@ if __name__ == "__main__":
                              "provide detailed warning regions and keep the "
                              "map responsive are used")
 
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        dest='output_file',
+                        help="Writes the map to the given file instead of "
+                             "opening it in a browser. Files ending in .json "
+                             "are written as plotly JSON, otherwise as HTML "
+                             "loading plotly.js from a CDN")
+    parser.add_argument("-l", "--locations", type=str, default=None,
+                        dest='locations_file',
+                        help="Checks for warnings at every location of a CSV "
+                             "file with 'lat' and 'long' columns, e.g. "
+                             "geocoded addresses. The file is streamed, so "
+                             "may be of any size")
+    parser.add_argument("-lo", "--locations-output", type=str, default=None,
+                        dest='locations_output',
+                        help="The CSV file the warnings at each location are "
+                             "written to. The default is the name of the "
+                             "locations file prefixed with warnings_")
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
 
     # process the command line inputs
@@ -174,10 +207,15 @@ if __name__ == "__main__":
                                  'buf': args.geometry_buffer}
 
     # run the demo
-    run(SeverityLevel[args.warning_min_severity],
+    profiling.call_with_args(
+        args, run,
+        SeverityLevel[args.warning_min_severity],
         coords,
         not args.disable_plot_warnings,
         not args.disable_plot_stations,
         not args.disable_warning_messages,
         args.overwrite_warning_cache,
-        simplification_params)
+        simplification_params,
+        args.output_file,
+        args.locations_file,
+        args.locations_output)
@@ -1,6 +1,8 @@
 """Module for analysis of historical level data."""
 
-import numpy as np
+from floodsystem.utils import lazy_import
+
+np = lazy_import('numpy')
 
 
 def polyfit(dates, levels, p):
@@ -36,3 +38,148 @@ def polyfit(dates, levels, p):
 
     # return polynomial object initial time offset
     return (poly, dates[-1])
+
+
+def lttb_indices(x, y, n_out):
+    """Choose points of a series to plot, by Largest-Triangle-Three-Buckets.
+
+    The points are split into n_out - 2 buckets between the first and last
+    point, and from each bucket the point forming the largest triangle with
+    the point chosen from the previous bucket and the mean of the next
+    bucket is kept, which preserves the visual shape of the series.
+
+    Parameters
+    ----------
+    x, y : array_like
+        coordinates of the points, with x in increasing order.
+    n_out : int
+        maximum number of points to keep.
+
+    Returns
+    -------
+    np.ndarray
+        the indices of the points kept, in increasing order.
+
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        # the first and last points, as far as there is room
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.intp)
+
+    # bucket edges over the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # the mean of each bucket, followed by the last point
+    counts = np.diff(edges)
+    x = x - x[0]
+    mean_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+
+    # buckets are mostly small, so the loop is faster over Python floats
+    xs, ys = x.tolist(), y.tolist()
+    mean_x, mean_y = mean_x.tolist(), mean_y.tolist()
+    edges = edges.tolist()
+    kept = [0]
+    a = 0
+    for b in range(n_out - 2):
+        ax, ay = xs[a], ys[a]
+        next_x, next_y = mean_x[b + 1], mean_y[b + 1]
+        dx, dy = ax - next_x, next_y - ay
+        # twice the area of the triangle with each point of the bucket
+        best = -1.0
+        for j in range(edges[b], edges[b + 1]):
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > best:
+                best, a = area, j
+        kept.append(a)
+    kept.append(n - 1)
+    return np.array(kept, dtype=np.intp)
+
+
+def minmax_indices(x, y, n_buckets):
+    """Choose points of a series to plot, keeping the extremes.
+
+    The range of x is split into n_buckets intervals of equal width, e.g.
+    one for each pixel, and the lowest and highest point of each interval
+    are kept, so no peak is lost.
+
+    Parameters
+    ----------
+    x, y : array_like
+        coordinates of the points, with x in increasing order.
+    n_buckets : int
+        number of intervals.
+
+    Returns
+    -------
+    np.ndarray
+        the indices of the points kept, in increasing order, including the
+        first and the last point. At most 2 * n_buckets + 2.
+
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    span = x[-1] - x[0]
+    bucket = np.zeros(n, dtype=np.intp) if span <= 0 else np.minimum(
+        ((x - x[0]) / span * n_buckets).astype(np.intp), n_buckets - 1)
+    # order by bucket, then by level: the ends of each bucket's run are the
+    # lowest and highest points in it
+    order = np.lexsort((y, bucket))
+    starts = np.flatnonzero(np.diff(bucket[order], prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate(([0, n - 1], order[starts],
+                                     order[ends])))
+
+
+def downsample(dates, levels, max_points, method='lttb'):
+    """Reduce a level series to at most about max_points points for
+    plotting.
+
+    Parameters
+    ----------
+    dates : list[DateTime]
+        dates of the readings, in any order.
+    levels : list[float]
+        level of each reading.
+    max_points : int
+        number of points to keep.
+    method : string, optional
+        'lttb', see lttb_indices, or 'minmax', see minmax_indices, or None
+        to keep every point. The default is 'lttb'.
+
+    Returns
+    -------
+    dates, levels : list, list
+        the readings kept, in order of date. The inputs are returned if
+        they have no more than max_points points.
+
+    Raises
+    ------
+    ValueError
+        if method is not one of the above, or max_points is less than 1.
+
+    """
+    if method not in ('lttb', 'minmax', None):
+        raise ValueError("Unknown downsampling method {}".format(method))
+    if max_points < 1:
+        raise ValueError("max_points must be at least 1, not {}".format(
+            max_points))
+    if method is None or len(dates) <= max_points:
+        return dates, levels
+
+    x = np.array([date.timestamp() for date in dates])
+    order = np.argsort(x, kind='stable')
+    y = np.asarray(levels, dtype=float)[order]
+    if method == 'lttb':
+        kept = order[lttb_indices(x[order], y, max_points)]
+    else:
+        kept = order[minmax_indices(x[order], y, max(max_points // 2 - 1,
+                                                     1))]
+    return [dates[i] for i in kept], [levels[i] for i in kept]
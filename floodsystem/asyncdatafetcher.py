@@ -0,0 +1,169 @@
+"""Asynchronous counterparts of the floodsystem.datafetcher functions.
+
+Requests are made through a single requests.Session, so connections to the
+Flood Monitoring API are pooled and reused between calls. Each request runs
+in a worker thread, and at most max_concurrency requests are in flight at
+once. Cache files are read and written exactly as by the synchronous
+functions, so the two may be used interchangeably.
+
+Example, fetching stations, levels and warnings concurrently:
+
+    stations, levels, warnings = await asyncio.gather(
+        fetch_station_data(), fetch_latest_water_level_data(),
+        fetch_flood_warnings(3))
+"""
+
+import asyncio
+import threading
+import weakref
+from floodsystem import datafetcher, instrument
+from floodsystem.utils import lazy_import
+
+requests = lazy_import('requests')
+
+_max_concurrency = 8
+_session = None
+_session_lock = threading.Lock()
+
+# asyncio semaphores belong to an event loop, so one is kept per loop
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def set_max_concurrency(n):
+    """Set the maximum number of requests in flight at once.
+
+    Parameters
+    ----------
+    n : int
+        the maximum number of concurrent requests, also used as the size of
+        the connection pool.
+
+    Returns
+    -------
+    None.
+
+    """
+    global _max_concurrency, _session
+    with _session_lock:
+        _max_concurrency = n
+        if _session is not None:
+            _session.close()
+        _session = None
+    _semaphores.clear()
+
+
+def get_session():
+    """Return the shared requests.Session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=_max_concurrency,
+                pool_maxsize=_max_concurrency)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def _semaphore():
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(_max_concurrency)
+    return _semaphores[loop]
+
+
+def _get_json(url):
+    """Fetch url with the shared session and return the decoded JSON."""
+    with instrument.timer('fetch'):
+        r = get_session().get(url)
+        data = r.json()
+    instrument.count('fetch_requests')
+    instrument.count('fetch_bytes', len(r.content))
+    return data
+
+
+async def fetch(url):
+    """Fetch data from url and return fetched JSON object"""
+    async with _semaphore():
+        return await asyncio.to_thread(_get_json, url)
+
+
+async def fetch_cached(url, filename, use_cache):
+    """Fetch JSON from url, or from a cache file if use_cache is true.
+
+    See datafetcher.fetch_cached.
+
+    """
+    cache_file = datafetcher.cache_file_path(filename)
+
+    if use_cache:
+        try:
+            data = await asyncio.to_thread(datafetcher.load, cache_file)
+            instrument.count('cache_hits', file=filename)
+            return data
+        except FileNotFoundError:
+            pass
+
+    instrument.count('cache_misses', file=filename)
+    data = await fetch(url)
+    await asyncio.to_thread(datafetcher.dump, data, cache_file)
+    return data
+
+
+async def fetch_station_data(use_cache=True):
+    """Fetch data for all active river level monitoring stations.
+
+    See datafetcher.fetch_station_data.
+
+    """
+    return await fetch_cached(datafetcher.station_data_url(),
+                              'station_data.json', use_cache)
+
+
+async def fetch_latest_water_level_data(use_cache=False):
+    """Fetch latest levels from all 'measures'.
+
+    See datafetcher.fetch_latest_water_level_data.
+
+    """
+    return await fetch_cached(datafetcher.latest_water_level_url(),
+                              'level_data.json', use_cache)
+
+
+async def fetch_measure_levels(measure_id, dt):
+    """Fetch measure levels from latest reading and going back a period dt.
+
+    See datafetcher.fetch_measure_levels.
+
+    """
+    data = await fetch(datafetcher.measure_levels_url(measure_id, dt))
+    return datafetcher.parse_measure_levels(data)
+
+
+async def fetch_flood_warnings(severity_level, use_cache=False):
+    """Fetch the flood warnings issued from the API.
+
+    See datafetcher.fetch_flood_warnings.
+
+    """
+    return await fetch_cached(datafetcher.flood_warnings_url(severity_level),
+                              'warning_data.json', use_cache)
+
+
+async def fetch_warning_region(url):
+    """Fetch the geoJSON polygon for the area over which a warning is active.
+
+    See datafetcher.fetch_warning_region.
+
+    """
+    return datafetcher.parse_warning_region(await fetch(url))
+
+
+async def fetch_warning_area(url):
+    """Fetch information on the area of a warning.
+
+    See datafetcher.fetch_warning_area.
+
+    """
+    return await fetch(url)
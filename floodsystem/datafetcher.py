@@ -9,14 +9,46 @@ latest time history level data
 import datetime
 import json
 import os
-import dateutil.parser
-import requests
+from floodsystem import instrument
+from floodsystem.utils import lazy_import
+
+dateutil_parser = lazy_import('dateutil.parser')
+requests = lazy_import('requests')
+
+# Base url of the Flood Monitoring API. May be changed with set_base_url, or
+# the FLOODSYSTEM_BASE_URL environment variable, e.g. to use a local stub
+# server (see floodsystem.stubserver)
+DEFAULT_BASE_URL = "http://environment.data.gov.uk/flood-monitoring"
+BASE_URL = os.environ.get('FLOODSYSTEM_BASE_URL', DEFAULT_BASE_URL)
+
+
+def set_base_url(url=None):
+    """Set the base url of the Flood Monitoring API used by all fetches.
+
+    Urls of measures and flood areas come from the fetched data, so are
+    relative to the base url the data was fetched from.
+
+    Parameters
+    ----------
+    url : string, optional
+        The base url. The default is None, which restores DEFAULT_BASE_URL.
+
+    Returns
+    -------
+    None.
+
+    """
+    global BASE_URL
+    BASE_URL = (url if url is not None else DEFAULT_BASE_URL).rstrip('/')
 
 
 def fetch(url):
     """Fetch data from url and return fetched JSON object"""
-    r = requests.get(url)
-    data = r.json()
+    with instrument.timer('fetch'):
+        r = requests.get(url)
+        data = r.json()
+    instrument.count('fetch_requests')
+    instrument.count('fetch_bytes', len(r.content))
     return data
 
 
@@ -35,6 +67,43 @@ def load(filename):
     return data
 
 
+def cache_file_path(filename):
+    """Return the path of a file in the cache directory, creating the
+    directory if it does not exist."""
+    sub_dir = 'cache'
+    try:
+        os.makedirs(sub_dir)
+    except FileExistsError:
+        pass
+    return os.path.join(sub_dir, filename)
+
+
+def fetch_cached(url, filename, use_cache):
+    """Fetch JSON from url, or from a cache file if use_cache is true.
+
+    If use_cache is true and the cache file exists, its contents are
+    returned. Otherwise data is fetched from url and dumped to the cache
+    file.
+
+    """
+    cache_file = cache_file_path(filename)
+
+    if use_cache:
+        try:
+            # Attempt to load from file
+            data = load(cache_file)
+            instrument.count('cache_hits', file=filename)
+            return data
+        except FileNotFoundError:
+            pass
+
+    # Fetch and dump to file
+    instrument.count('cache_misses', file=filename)
+    data = fetch(url)
+    dump(data, cache_file)
+    return data
+
+
 def fetch_station_data(use_cache=True):
     """Fetch data from Environment agency for all active river level
     monitoring stations via a REST API and return retrieved data as a
@@ -47,34 +116,18 @@ def fetch_station_data(use_cache=True):
 
     """
 
-    # URL for retrieving data for active stations with river level
-    # monitoring (see
-    # http://environment.data.gov.uk/flood-monitoring/doc/reference)
-    url = "http://environment.data.gov.uk/flood-monitoring/id/stations?status=Active&parameter=level&qualifier=Stage&_view=full"  # noqa
-
-    sub_dir = 'cache'
-    try:
-        os.makedirs(sub_dir)
-    except FileExistsError:
-        pass
-    cache_file = os.path.join(sub_dir, 'station_data.json')
-
     # Attempt to load station data from file, otherwise fetch over
     # Internet
-    if use_cache:
-        try:
-            # Attempt to load from file
-            data = load(cache_file)
-        except FileNotFoundError:
-            # If load from file fails, fetch and dump to file
-            data = fetch(url)
-            dump(data, cache_file)
-    else:
-        # Fetch and dump to file
-        data = fetch(url)
-        dump(data, cache_file)
+    return fetch_cached(station_data_url(), 'station_data.json', use_cache)
 
-    return data
+
+def station_data_url():
+    """Return the url of the data for all active river level stations."""
+
+    # URL for retrieving data for active stations with river level
+    # monitoring (see
+    # http://environment.data.gov.uk/flood-monitoring/doc/reference)
+    return BASE_URL + "/id/stations?status=Active&parameter=level&qualifier=Stage&_view=full"  # noqa
 
 
 def fetch_test_station_data():
@@ -98,30 +151,16 @@ def fetch_test_station_data():
 def fetch_latest_water_level_data(use_cache=False):
     """Fetch latest levels from all 'measures'. Returns JSON object"""
 
-    # URL for retrieving data
-    url = "http://environment.data.gov.uk/flood-monitoring/id/measures?parameter=level&qualifier=Stage&qualifier=level"  # noqa
-
-    sub_dir = 'cache'
-    try:
-        os.makedirs(sub_dir)
-    except FileExistsError:
-        pass
-    cache_file = os.path.join(sub_dir, 'level_data.json')
-
     # Attempt to load level data from file, otherwise fetch over
     # Internet
-    if use_cache:
-        try:
-            # Attempt to load from file
-            data = load(cache_file)
-        except FileNotFoundError:
-            data = fetch(url)
-            dump(data, cache_file)
-    else:
-        data = fetch(url)
-        dump(data, cache_file)
+    return fetch_cached(latest_water_level_url(), 'level_data.json',
+                        use_cache)
 
-    return data
+
+def latest_water_level_url():
+    """Return the url of the latest readings of all level measures."""
+
+    return BASE_URL + "/id/measures?parameter=level&qualifier=Stage&qualifier=level"  # noqa
 
 
 def fetch_measure_levels(measure_id, dt):
@@ -130,6 +169,15 @@ def fetch_measure_levels(measure_id, dt):
 
     """
 
+    # Fetch data
+    data = fetch(measure_levels_url(measure_id, dt))
+
+    return parse_measure_levels(data)
+
+
+def measure_levels_url(measure_id, dt):
+    """Return the url of the readings of a measure over the past period dt."""
+
     # Current time (UTC)
     now = datetime.datetime.utcnow()
 
@@ -139,17 +187,18 @@ def fetch_measure_levels(measure_id, dt):
     # Construct URL for fetching data
     url_base = measure_id
     url_options = "/readings/?_sorted&since=" + start.isoformat() + 'Z'
-    url = url_base + url_options
+    return url_base + url_options
 
-    # Fetch data
-    data = fetch(url)
+
+def parse_measure_levels(data):
+    """Return lists of dates and values from fetched readings data."""
 
     # Extract dates and levels
     dates, levels = [], []
     for measure in data['items']:
         # Convert date-time string to a datetime object
         if 'dateTime' in measure and 'value' in measure:
-            d = dateutil.parser.parse(measure['dateTime'])
+            d = dateutil_parser.parse(measure['dateTime'])
 
             # Append data
             dates.append(d)
@@ -161,36 +210,27 @@ def fetch_measure_levels(measure_id, dt):
 def fetch_flood_warnings(severity_level, use_cache=False):
     """Fetches the flood warnings issued from the API"""
 
-    url = "http://environment.data.gov.uk/flood-monitoring/id/floods?min-severity={}".format(severity_level)
+    # Attempt to load warning data from file, otherwise fetch over
+    # Internet
+    return fetch_cached(flood_warnings_url(severity_level),
+                        'warning_data.json', use_cache)
 
-    sub_dir = 'cache'
-    try:
-        os.makedirs(sub_dir)
-    except FileExistsError:
-        pass
-    cache_file = os.path.join(sub_dir, 'warning_data.json')
 
-    # Attempt to load station data from file, otherwise fetch over
-    # Internet
-    if use_cache:
-        try:
-            # Attempt to load from file
-            data = load(cache_file)
-        except FileNotFoundError:
-            # If load from file fails, fetch and dump to file
-            data = fetch(url)
-            dump(data, cache_file)
-    else:
-        data = fetch(url)
-        dump(data, cache_file)
+def flood_warnings_url(severity_level):
+    """Return the url of the flood warnings of at least a given severity."""
 
-    return data
+    return BASE_URL + "/id/floods?min-severity={}".format(severity_level)
 
 
 def fetch_warning_region(url):
     """fetches a geoJSON polygon for area over which a warning is active"""
 
-    data = fetch(url)
+    return parse_warning_region(fetch(url))
+
+
+def parse_warning_region(data):
+    """Return the geoJSON features of fetched flood area polygon data, or
+    None if there are none."""
 
     if 'features' in data:
         if len(data['features']) > 0:
@@ -211,9 +251,85 @@ def fetch_stations_by_type(type):
     """Fetches the stations of other types issued from the
     put type = Groundwater for groundwater stations"""
 
-    base_url = "http://environment.data.gov.uk/flood-monitoring/id/"
+    base_url = BASE_URL + "/id/"
     url = base_url + "stations?status=Active&type={}&_view=full".format(type)
     print(url)
     data = fetch(url)
 
     return data
+
+
+class StubDataSource:
+    """Fixed data in place of the Flood Monitoring API.
+
+    Provides the fetch functions of this module used to build station and
+    warning lists, so that an instance may be passed as the source argument
+    of stationdata.build_station_list, stationdata.update_water_levels and
+    warningdata.build_warning_list to run them offline. The data may be
+    replaced between calls to simulate updates, and the number of calls to
+    each function is counted in calls.
+
+    Parameters
+    ----------
+    station_data : dict, optional
+        returned in place of fetch_station_data. Defaults to the test station
+        data.
+    level_data : dict, optional
+        returned in place of fetch_latest_water_level_data. Defaults to no
+        readings.
+    warning_data : dict, optional
+        returned in place of fetch_flood_warnings, filtered by severity.
+        Defaults to no warnings.
+    areas : dict{string : dict}, optional
+        flood area data returned by fetch_warning_area, keyed by url.
+    regions : dict{string : list}, optional
+        geoJSON features returned by fetch_warning_region, keyed by url.
+
+    """
+
+    def __init__(self, station_data=None, level_data=None, warning_data=None,
+                 areas=None, regions=None):
+        self.station_data = station_data if station_data is not None \
+            else fetch_test_station_data()
+        self.level_data = level_data if level_data is not None \
+            else {'items': []}
+        self.warning_data = warning_data if warning_data is not None \
+            else {'items': []}
+        self.areas = areas if areas is not None else {}
+        self.regions = regions if regions is not None else {}
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def fetch_station_data(self, use_cache=True):
+        """Return the stub station data."""
+        self._count('fetch_station_data')
+        return self.station_data
+
+    def fetch_test_station_data(self):
+        """Return the stub station data."""
+        self._count('fetch_test_station_data')
+        return self.station_data
+
+    def fetch_latest_water_level_data(self, use_cache=False):
+        """Return the stub level data."""
+        self._count('fetch_latest_water_level_data')
+        return self.level_data
+
+    def fetch_flood_warnings(self, severity_level, use_cache=False):
+        """Return the stub warnings of at least the given severity."""
+        self._count('fetch_flood_warnings')
+        items = [w for w in self.warning_data['items']
+                 if w.get('severityLevel', 4) <= severity_level]
+        return {'items': items}
+
+    def fetch_warning_region(self, url):
+        """Return the stub geoJSON features for a flood area polygon url."""
+        self._count('fetch_warning_region')
+        return self.regions.get(url)
+
+    def fetch_warning_area(self, url):
+        """Return the stub flood area data for a url."""
+        self._count('fetch_warning_area')
+        return self.areas[url]
@@ -3,8 +3,9 @@
 # SPDX-License-Identifier: MIT
 """Collection of functions related to geographical data."""
 
-from haversine import haversine
-from floodsystem.utils import sorted_by_key  # noqa
+from floodsystem.utils import sorted_by_key, lazy_import  # noqa
+
+haversine = lazy_import('haversine')
 
 
 def stations_by_distance(stations, p):
@@ -27,7 +28,7 @@ def stations_by_distance(stations, p):
     output = []
     for station in stations:
         # use haversine to calculate distance to p
-        output.append((station, (haversine(station.coord, p))))
+        output.append((station, (haversine.haversine(station.coord, p))))
     return sorted_by_key(output, 1)
 
 
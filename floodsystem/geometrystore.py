@@ -0,0 +1,167 @@
+"""Content-addressed store of flood warning region geometry.
+
+Warnings of different severities, and successive warnings for the same
+flood area, have identical polygons. Each distinct geoJSON region is held
+once, as a RegionGeometry keyed by a hash of its content, and warnings
+refer to it. The shapely region and any simplified versions of the geoJSON
+are derived from it when first needed, and shared by every warning
+referring to it.
+
+Geometries are held weakly, so they are released when no warning refers
+to them.
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+from floodsystem.utils import lazy_import
+
+shapely = lazy_import('shapely')
+
+
+def content_hash(geojson):
+    """Return the hash identifying a list of geoJSON features.
+
+    Features with the same properties and coordinates have the same hash,
+    whether their coordinates are held in lists or tuples.
+    """
+    text = json.dumps(geojson, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def geo_json_to_shape(geo_json_obj):
+    """Convert a geoJSON geometry to a shapely object, corrected to form a
+    simple polygon, e.g. by adding points at self intersections."""
+    return shapely.geometry.shape(geo_json_obj).buffer(0)
+
+
+class RegionGeometry:
+    """The geometry of a flood warning region.
+
+    The geoJSON is shared by every warning with the same region, so must not
+    be modified.
+
+    Parameters
+    ----------
+    key : string
+        the content hash of geojson.
+    geojson : list[dict]
+        the geoJSON features of the region, as fetched from the API.
+    region : list[shapely geometry], optional
+        the shapely geometry of each feature. The default is None, where it
+        is made from geojson when first used.
+
+    """
+
+    __slots__ = ('key', 'geojson', '_region', '_simplified', '__weakref__')
+
+    def __init__(self, key, geojson, region=None):
+        self.key = key
+        self.geojson = geojson
+        self._region = region
+        self._simplified = {}
+
+    @property
+    def region(self):
+        """The shapely geometry of each feature."""
+        if self._region is None:
+            self._region = [geo_json_to_shape(f['geometry'])
+                            for f in self.geojson]
+        return self._region
+
+    def simplified(self, tol, buf):
+        """Return the geoJSON features simplified for plotting.
+
+        The result is computed once for each pair of parameters.
+
+        Parameters
+        ----------
+        tol : float
+            the maximum allowed deviation from the original shape.
+        buf : float
+            the amount to dilate the shapes in order to smooth them.
+
+        Returns
+        -------
+        list[dict]
+            the simplified geoJSON features, or the original features if tol
+            and buf are both 0.
+
+        """
+        if not tol and not buf:
+            return self.geojson
+        key = (tol, buf)
+        features = self._simplified.get(key)
+        if features is None:
+            features = []
+            for f, r in zip(self.geojson, self.region):
+                simplified_poly = r.simplify(
+                    tol, preserve_topology=False).buffer(buf)
+                features.append({
+                    'type': 'Feature', 'properties': f.get('properties'),
+                    'geometry': shapely.geometry.mapping(simplified_poly)})
+            self._simplified[key] = features
+        return features
+
+    def simplified_versions(self):
+        """Return the simplified features computed so far, keyed by
+        (tol, buf)."""
+        return dict(self._simplified)
+
+    def add_simplified(self, tol, buf, features):
+        """Set previously computed simplified features, e.g. from a cache."""
+        self._simplified.setdefault((tol, buf), features)
+
+
+class GeometryStore:
+    """Store of RegionGeometry keyed by content hash."""
+
+    def __init__(self):
+        self._geometries = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._geometries)
+
+    def clear(self):
+        """Forget every stored geometry, so the same geoJSON is stored anew,
+        e.g. to time building geometry from scratch. Geometries already
+        held by warnings are unchanged."""
+        with self._lock:
+            self._geometries.clear()
+
+    def get(self, key):
+        """Return the geometry with a content hash, or None."""
+        return self._geometries.get(key)
+
+    def intern(self, geojson, region=None, key=None):
+        """Return the stored geometry of geoJSON features, adding it if it
+        is not already stored.
+
+        Parameters
+        ----------
+        geojson : list[dict]
+            geoJSON features.
+        region : list[shapely geometry], optional
+            the shapely geometry of each feature, if already made.
+        key : string, optional
+            the content hash of geojson, if already known.
+
+        Returns
+        -------
+        RegionGeometry
+
+        """
+        if key is None:
+            key = content_hash(geojson)
+        with self._lock:
+            geometry = self._geometries.get(key)
+            if geometry is None:
+                geometry = RegionGeometry(key, geojson, region)
+                self._geometries[key] = geometry
+            return geometry
+
+
+# the store used by floodsystem
+store = GeometryStore()
@@ -0,0 +1,394 @@
+"""Spatial indexes over stations and flood warnings for fast queries."""
+
+import math
+from floodsystem import instrument
+from floodsystem.utils import lazy_import
+
+haversine = lazy_import('haversine')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+shapely = lazy_import('shapely')
+
+# length of a degree of latitude on the sphere used by haversine, in km,
+# rounded down so that bounding boxes always contain their circle
+KM_PER_DEGREE = 111.19
+
+
+def bounding_box_size(centre, r):
+    """Return the half height and width in degrees of a box containing the
+    circle of radius r km about centre, as (dlat, dlong)."""
+    dlat = r / KM_PER_DEGREE
+    # degrees of longitude shrink towards the poles; use the latitude
+    # furthest from the equator within the circle
+    max_lat = np.minimum(np.abs(centre[0]) + dlat, 89.9)
+    dlong = r / (KM_PER_DEGREE * np.cos(np.radians(max_lat)))
+    return dlat, dlong
+
+
+class StationIndex:
+    """Index of monitoring stations by location and by river.
+
+    Stations are placed in a grid of cells of equal size in degrees, so a
+    radius query only measures the distance to stations in the cells
+    overlapping the bounding box of the circle.
+
+    Parameters
+    ----------
+    stations : list[MonitoringStation]
+        generated using build_station_list.
+    cell_size : float, optional
+        size of the grid cells in degrees. The default is 0.1.
+
+    """
+
+    def __init__(self, stations, cell_size=0.1):
+        self.stations = stations
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rivers = {}
+
+        for station in stations:
+            if station.coord is not None:
+                self.cells.setdefault(self._cell(station.coord),
+                                      []).append(station)
+            if station.river:
+                self.rivers.setdefault(station.river, []).append(station)
+
+    def _cell(self, coord):
+        return (math.floor(coord[0] / self.cell_size),
+                math.floor(coord[1] / self.cell_size))
+
+    @instrument.timed('within_radius')
+    def within_radius(self, centre, r):
+        """Return the stations within radius r of centre, nearest first.
+
+        Parameters
+        ----------
+        centre : (lat, long)
+            coordinates of the centre.
+        r : float
+            radius in km.
+
+        Returns
+        -------
+        list[(MonitoringStation, float)]
+            pairs of station and its distance from centre in km, in order of
+            increasing distance.
+
+        """
+        dlat, dlong = bounding_box_size(centre, r)
+        min_i, min_j = self._cell((centre[0] - dlat, centre[1] - dlong))
+        max_i, max_j = self._cell((centre[0] + dlat, centre[1] + dlong))
+
+        output = []
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                for station in self.cells.get((i, j), []):
+                    distance = haversine.haversine(station.coord, centre)
+                    if distance <= r:
+                        output.append((station, distance))
+        return sorted(output, key=lambda pair: pair[1])
+
+    def on_river(self, river):
+        """Return the stations on the named river."""
+        return self.rivers.get(river, [])
+
+
+class WarningIndex:
+    """R-tree index of flood warning regions.
+
+    Parameters
+    ----------
+    warnings : list[FloodWarning]
+        generated using warningdata.build_warning_list. Warnings without a
+        region are not indexed.
+
+    """
+
+    def __init__(self, warnings):
+        self.warnings = warnings
+        self.geometries = []
+        self.owners = []
+        for i, w in enumerate(warnings):
+            if w.region is not None:
+                for r in w.region:
+                    self.geometries.append(r)
+                    self.owners.append(i)
+        self.tree = shapely.STRtree(self.geometries)
+        # the bounding boxes of the regions, for cheap nearest queries
+        self.envelope_tree = shapely.STRtree(
+            [g.envelope for g in self.geometries])
+
+    @instrument.timed('warnings_at')
+    def warnings_at(self, coord):
+        """Return the warnings whose region contains a coordinate.
+
+        Parameters
+        ----------
+        coord : (lat, long)
+
+        Returns
+        -------
+        list[FloodWarning]
+            the warnings at the location, in the order of the warning list.
+
+        """
+        hits = self.tree.query(shapely.Point(coord[1], coord[0]),
+                               predicate='within')
+        return [self.warnings[i] for i in sorted({self.owners[h]
+                                                  for h in hits})]
+
+    @instrument.timed('nearest_warnings')
+    def nearest_warnings(self, coords):
+        """Return the nearest warning to each of many coordinates.
+
+        The distance to a warning is the haversine distance, as used by geo,
+        to the nearest point of its region in latitude and longitude, and is
+        0 within the region. The distance to the region with the nearest
+        bounding box in degrees bounds the search for the nearest region in
+        km, which is only made among the regions whose bounding boxes
+        overlap the box about the circle of that radius.
+
+        Parameters
+        ----------
+        coords : array_like
+            (lat, long) coordinates, of shape (N, 2).
+
+        Returns
+        -------
+        list[(FloodWarning, float) or None]
+            the nearest warning to each coordinate and its distance in km, or
+            None if no warning has a region.
+
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        if not len(coords) or not self.geometries:
+            return [None] * len(coords)
+        points = shapely.points(coords[:, 1], coords[:, 0])
+        point_idx, geom_idx = self.envelope_tree.query_nearest(
+            points, all_matches=False)
+        bound = np.empty(len(coords))
+        bound[point_idx] = self._distances(coords, points, point_idx,
+                                           geom_idx)
+        # regions nearer in km than that region are within the bounding
+        # box of the circle through it
+        point_idx, geom_idx, distances = self._query_within(coords, points,
+                                                            bound)
+        nearest = [None] * len(coords)
+        for p, g, d in zip(point_idx, geom_idx, distances):
+            if nearest[p] is None or d < nearest[p][1]:
+                nearest[p] = (self.warnings[self.owners[g]], float(d))
+        return nearest
+
+    def nearest_warning(self, coord):
+        """Return the nearest warning to a coordinate and its distance in km,
+        or None if no warning has a region. See nearest_warnings."""
+        return self.nearest_warnings([coord])[0]
+
+    @instrument.timed('warnings_within')
+    def warnings_within(self, centre, r):
+        """Return the warnings within radius r of centre, nearest first.
+
+        Parameters
+        ----------
+        centre : (lat, long)
+            coordinates of the centre.
+        r : float
+            radius in km.
+
+        Returns
+        -------
+        list[(FloodWarning, float)]
+            pairs of warning and its distance from centre in km, as
+            nearest_warnings, in order of increasing distance.
+
+        """
+        if not self.geometries:
+            return []
+        coords = np.asarray([centre], dtype=float)
+        points = shapely.points(coords[:, 1], coords[:, 0])
+        _, geom_idx, distances = self._query_within(coords, points,
+                                                    np.array([r]))
+        found = {}
+        for g, d in zip(geom_idx, distances):
+            i = self.owners[g]
+            if d <= r and d < found.get(i, math.inf):
+                found[i] = float(d)
+        return sorted(((self.warnings[i], d) for i, d in found.items()),
+                      key=lambda pair: pair[1])
+
+    def _query_within(self, coords, points, r):
+        """Return (point_idx, geom_idx, distances) for the regions whose
+        bounding boxes overlap that of a circle of radius r[i] km about each
+        point."""
+        dlat, dlong = bounding_box_size((coords[:, 0], coords[:, 1]), r)
+        boxes = shapely.box(coords[:, 1] - dlong, coords[:, 0] - dlat,
+                            coords[:, 1] + dlong, coords[:, 0] + dlat)
+        point_idx, geom_idx = self.tree.query(boxes)
+        return point_idx, geom_idx, self._distances(coords, points,
+                                                    point_idx, geom_idx)
+
+    def _distances(self, coords, points, point_idx, geom_idx):
+        """Return the distance in km from each points[point_idx] to the
+        nearest point of self.geometries[geom_idx]."""
+        if not len(point_idx):
+            return np.empty(0)
+        geometries = np.asarray(self.geometries, dtype=object)[geom_idx]
+        lines = shapely.shortest_line(geometries, points[point_idx])
+        # the first point of the line is on the region
+        nearest = shapely.get_coordinates(shapely.get_point(lines, 0))
+        return haversine.haversine_vector(coords[point_idx],
+                                          nearest[:, ::-1])
+
+    @instrument.timed('warnings_at_many')
+    def warnings_at_many(self, coords):
+        """Return the warnings whose region contains each of many
+        coordinates.
+
+        All the coordinates are queried against the R-tree together.
+
+        Parameters
+        ----------
+        coords : array_like
+            (lat, long) coordinates, of shape (N, 2).
+
+        Returns
+        -------
+        list[list[FloodWarning]]
+            the warnings at each location, as warnings_at.
+
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        found = [[] for _ in range(len(coords))]
+        if not len(coords) or not self.geometries:
+            return found
+        hits = self.tree.query(shapely.points(coords[:, 1], coords[:, 0]),
+                               predicate='within')
+        owners = np.asarray(self.owners)[hits[1]]
+        pairs = np.unique(hits[0].astype(np.int64) * len(self.warnings)
+                          + owners)
+        for point, owner in zip(*np.divmod(pairs, len(self.warnings))):
+            found[point].append(self.warnings[owner])
+        return found
+
+    @instrument.timed('assign_stations')
+    def assign_stations(self, stations):
+        """Find the warnings containing each station, in one spatial join.
+
+        The locations of all the stations are queried against the R-tree
+        together, so each station is only tested against the regions whose
+        bounding boxes contain it.
+
+        Parameters
+        ----------
+        stations : list[MonitoringStation]
+            generated using build_station_list. Stations without coordinates
+            are in no warning.
+
+        Returns
+        -------
+        StationAssignment
+
+        """
+        located = [i for i, s in enumerate(stations) if s.coord is not None]
+        if located and self.geometries:
+            coords = np.array([stations[i].coord for i in located],
+                              dtype=float)
+            points = shapely.points(coords[:, 1], coords[:, 0])
+            hits = self.tree.query(points, predicate='within')
+            station_idx = np.asarray(located)[hits[0]]
+            warning_idx = np.asarray(self.owners)[hits[1]]
+        else:
+            station_idx = warning_idx = np.empty(0, dtype=np.intp)
+        return StationAssignment(stations, self.warnings, station_idx,
+                                 warning_idx)
+
+
+class StationAssignment:
+    """Sparse table of the stations within each flood warning.
+
+    The table is held twice in compressed sparse row form: by warning, the
+    stations of warning i are stations[station_indices[warning_indptr[i]:
+    warning_indptr[i + 1]]], in the order of the station list, and by
+    station, the warnings of station j are warnings[warning_indices[
+    station_indptr[j]:station_indptr[j + 1]]], in the order of the warning
+    list.
+
+    Parameters
+    ----------
+    stations : list[MonitoringStation]
+    warnings : list[FloodWarning]
+    station_idx, warning_idx : array_like of int
+        the index of the station and the warning of each pair of a station
+        within a warning. Repeated pairs are counted once.
+
+    """
+
+    def __init__(self, stations, warnings, station_idx, warning_idx):
+        self.stations = stations
+        self.warnings = warnings
+        n_stations, n_warnings = len(stations), len(warnings)
+
+        pairs = np.unique(np.asarray(warning_idx, dtype=np.int64)
+                          * n_stations
+                          + np.asarray(station_idx, dtype=np.int64))
+        by_warning_w, by_warning_s = np.divmod(pairs, n_stations or 1)
+        self.station_indices = by_warning_s.astype(np.intp)
+        self.warning_indptr = _indptr(by_warning_w, n_warnings)
+
+        order = np.lexsort((by_warning_w, by_warning_s))
+        self.warning_indices = by_warning_w[order].astype(np.intp)
+        self.station_indptr = _indptr(by_warning_s[order], n_stations)
+
+    def __len__(self):
+        return len(self.station_indices)
+
+    def stations_in_warning(self, i):
+        """Return the stations within warning i of the warning list, as
+        FloodWarning.stations_in_warning."""
+        return [self.stations[j] for j in self.station_indices[
+            self.warning_indptr[i]:self.warning_indptr[i + 1]]]
+
+    def warnings_at_station(self, j):
+        """Return the warnings containing station j of the station list."""
+        return [self.warnings[i] for i in self.warning_indices[
+            self.station_indptr[j]:self.station_indptr[j + 1]]]
+
+    def station_lists(self):
+        """Return the stations within each warning, keyed by warning id."""
+        return {w.id: self.stations_in_warning(i)
+                for i, w in enumerate(self.warnings)}
+
+    def towns_affected(self):
+        """Return the towns of the stations within each warning, keyed by
+        warning id, as FloodWarning.find_towns_affected."""
+        return {w.id: [s.town for s in self.stations_in_warning(i)]
+                for i, w in enumerate(self.warnings)}
+
+    def to_dataframe(self):
+        """Return the table as a DataFrame with one row for each station
+        within a warning.
+
+        Returns
+        -------
+        pd.DataFrame
+            columns 'station', 'warning', the indices of the station and
+            warning, and 'station_id', 'warning_id', 'town'.
+
+        """
+        warning_idx = np.repeat(np.arange(len(self.warnings)),
+                                np.diff(self.warning_indptr))
+        return pd.DataFrame({
+            'station': self.station_indices,
+            'warning': warning_idx,
+            'station_id': [self.stations[j].station_id
+                           for j in self.station_indices],
+            'warning_id': [self.warnings[i].id for i in warning_idx],
+            'town': [self.stations[j].town for j in self.station_indices]})
+
+
+def _indptr(rows, n_rows):
+    """Return the CSR row pointer of sorted row indices."""
+    indptr = np.zeros(n_rows + 1, dtype=np.intp)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr
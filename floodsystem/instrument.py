@@ -0,0 +1,206 @@
+"""Opt-in timers and counters across floodsystem.
+
+Instrumentation is disabled by default, when timers and counters cost only a
+check of a module flag. Once enabled with enable(), the time spent in the
+fetches, the station and warning list builders, geometry simplification,
+containment checks and plot builders is recorded, along with counts of
+fetched bytes and cache hits and misses, e.g.
+
+    from floodsystem import instrument
+    instrument.enable()
+    stations = build_station_list()
+    print(instrument.report())
+    instrument.dump_json('metrics.json')
+
+Each timer and counter has a name and optional labels, e.g.
+count('cache_hits', file='station_data.json'). The recorded values can be
+exported as a JSON summary or in the Prometheus text exposition format.
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+_enabled = False
+_lock = threading.Lock()
+
+# {(name, ((label, value), ...)): [count, total, min, max]}
+_timers = {}
+# {(name, ((label, value), ...)): value}
+_counters = {}
+
+
+def enable():
+    """Start recording timers and counters."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording timers and counters. Recorded values are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """Return True if timers and counters are being recorded."""
+    return _enabled
+
+
+def reset():
+    """Discard all recorded values."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def count(name, value=1, **labels):
+    """Add value to the named counter, if instrumentation is enabled."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def record_time(name, seconds, **labels):
+    """Add a duration in seconds to the named timer."""
+    key = _key(name, labels)
+    with _lock:
+        t = _timers.get(key)
+        if t is None:
+            _timers[key] = [1, seconds, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            t[2] = min(t[2], seconds)
+            t[3] = max(t[3], seconds)
+
+
+@contextmanager
+def _timing(name, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(name, time.perf_counter() - start, **labels)
+
+
+@contextmanager
+def _not_timing():
+    yield
+
+
+def timer(name, **labels):
+    """Context manager timing its body with the named timer, if
+    instrumentation is enabled."""
+    if not _enabled:
+        return _not_timing()
+    return _timing(name, labels)
+
+
+def timed(name):
+    """Decorator timing each call of a function with the named timer."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _label_string(labels):
+    return ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"'))
+                    for k, v in labels)
+
+
+def _display_name(key):
+    name, labels = key
+    return "{}{{{}}}".format(name, _label_string(labels)) if labels else name
+
+
+def summary():
+    """Return the recorded values.
+
+    Returns
+    -------
+    dict
+        with 'timers', mapping each timer to its count, total, mean, min and
+        max in seconds, and 'counters', mapping each counter to its value.
+        Labelled timers and counters are named as name{label="value"}.
+
+    """
+    with _lock:
+        timers = {_display_name(k): {'count': t[0], 'total': t[1],
+                                     'mean': t[1] / t[0], 'min': t[2],
+                                     'max': t[3]}
+                  for k, t in sorted(_timers.items())}
+        counters = {_display_name(k): v for k, v in sorted(_counters.items())}
+    return {'timers': timers, 'counters': counters}
+
+
+def dump_json(filename):
+    """Write the summary of recorded values to a JSON file."""
+    with open(filename, 'w') as f:
+        json.dump(summary(), f, indent=2)
+
+
+def prometheus_text(prefix='floodsystem'):
+    """Return the recorded values in the Prometheus text exposition format.
+
+    Timers are exported as summaries, name_seconds_count and
+    name_seconds_sum, and counters as name_total.
+
+    """
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+
+    lines = []
+    for name in sorted({k[0] for k, _ in timers}):
+        metric = "{}_{}_seconds".format(prefix, name)
+        lines.append("# TYPE {} summary".format(metric))
+        for (n, labels), t in timers:
+            if n == name:
+                label_string = "{" + _label_string(labels) + "}" \
+                    if labels else ""
+                lines.append("{}_count{} {}".format(metric, label_string,
+                                                    t[0]))
+                lines.append("{}_sum{} {!r}".format(metric, label_string,
+                                                    t[1]))
+    for name in sorted({k[0] for k, _ in counters}):
+        metric = "{}_{}_total".format(prefix, name)
+        lines.append("# TYPE {} counter".format(metric))
+        for (n, labels), v in counters:
+            if n == name:
+                label_string = "{" + _label_string(labels) + "}" \
+                    if labels else ""
+                lines.append("{}{} {}".format(metric, label_string, v))
+    return "\n".join(lines) + "\n"
+
+
+def report():
+    """Return the recorded values as a printable table."""
+    s = summary()
+    lines = ["{:<48} {:>7} {:>10} {:>10} {:>10}".format(
+        "timer", "count", "total", "mean", "max")]
+    for name, t in s['timers'].items():
+        lines.append("{:<48} {:>7} {:>10.4f} {:>10.4f} {:>10.4f}".format(
+            name, t['count'], t['total'], t['mean'], t['max']))
+    lines.append("")
+    lines.append("{:<48} {:>10}".format("counter", "value"))
+    for name, v in s['counters'].items():
+        lines.append("{:<48} {:>10}".format(name, v))
+    return "\n".join(lines)
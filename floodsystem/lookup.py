@@ -0,0 +1,148 @@
+"""Look up the flood warnings affecting many locations, e.g. addresses.
+
+Locations are looked up in chunks against a WarningIndex, so a CSV file of
+any size can be streamed through lookup_csv in constant memory.
+"""
+
+import csv
+from itertools import islice
+from floodsystem import instrument
+from floodsystem.index import WarningIndex
+
+# number of locations looked up together by the streaming functions
+CHUNK_SIZE = 10000
+
+
+def lookup_locations(warnings, coords):
+    """Return the warnings affecting each of many locations.
+
+    Parameters
+    ----------
+    warnings : list[FloodWarning] or WarningIndex
+        the warnings, or an index of them.
+    coords : array_like
+        (lat, long) coordinates, of shape (N, 2).
+
+    Returns
+    -------
+    list[list[FloodWarning]]
+        the warnings at each location, in the order of the warning list.
+
+    """
+    index = warnings if isinstance(warnings, WarningIndex) \
+        else WarningIndex(warnings)
+    return index.warnings_at_many(coords)
+
+
+def stream_lookup(warnings, locations, chunk_size=CHUNK_SIZE):
+    """Look up the warnings affecting a stream of locations.
+
+    Parameters
+    ----------
+    warnings : list[FloodWarning] or WarningIndex
+        the warnings, or an index of them.
+    locations : iterable
+        pairs of (item, coord), where coord is (lat, long) or None if the
+        item has no location. Read chunk_size at a time.
+    chunk_size : int, optional
+        number of locations looked up together. The default is CHUNK_SIZE.
+
+    Yields
+    ------
+    (item, list[FloodWarning])
+        each item with the warnings at its location, in the input order.
+        Items without a location have no warnings.
+
+    """
+    index = warnings if isinstance(warnings, WarningIndex) \
+        else WarningIndex(warnings)
+    locations = iter(locations)
+    while True:
+        chunk = list(islice(locations, chunk_size))
+        if not chunk:
+            return
+        located = [i for i, (_, coord) in enumerate(chunk)
+                   if coord is not None]
+        found = index.warnings_at_many([chunk[i][1] for i in located])
+        results = [[] for _ in chunk]
+        for i, warnings_here in zip(located, found):
+            results[i] = warnings_here
+        instrument.count('location_lookups', len(chunk))
+        for (item, _), warnings_here in zip(chunk, results):
+            yield item, warnings_here
+
+
+def read_locations(rows, lat_column='lat', long_column='long'):
+    """Return the locations of CSV rows, for stream_lookup.
+
+    Parameters
+    ----------
+    rows : iterable[dict]
+        rows, e.g. from csv.DictReader.
+    lat_column, long_column : string, optional
+        the columns holding the latitude and longitude in degrees. The
+        defaults are 'lat' and 'long'.
+
+    Yields
+    ------
+    (dict, (float, float) or None)
+        each row with its location, or None if it has no valid location.
+
+    """
+    for row in rows:
+        try:
+            coord = (float(row[lat_column]), float(row[long_column]))
+        except (KeyError, TypeError, ValueError):
+            coord = None
+        yield row, coord
+
+
+@instrument.timed('lookup_csv')
+def lookup_csv(warnings, infile, outfile, lat_column='lat',
+               long_column='long', chunk_size=CHUNK_SIZE):
+    """Add the warnings affecting each location of a CSV file.
+
+    The input is streamed, so the file may be larger than memory. The output
+    has the columns of the input, followed by 'warning_ids', the ids of the
+    warnings at the location separated by ';', and 'max_severity', the
+    severity level of the most severe of them, empty if there are none.
+    Rows without a valid location have no warnings.
+
+    Parameters
+    ----------
+    warnings : list[FloodWarning] or WarningIndex
+        the warnings, or an index of them.
+    infile, outfile : file
+        text files open for reading and writing, with newline=''.
+    lat_column, long_column : string, optional
+        the columns of the input holding the latitude and longitude in
+        degrees. The defaults are 'lat' and 'long'.
+    chunk_size : int, optional
+        number of locations looked up together. The default is CHUNK_SIZE.
+
+    Returns
+    -------
+    rows, affected : int, int
+        the number of rows, and of those affected by a warning.
+
+    """
+    reader = csv.DictReader(infile)
+    fieldnames = list(reader.fieldnames or []) + ['warning_ids',
+                                                  'max_severity']
+    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+    writer.writeheader()
+
+    rows = affected = 0
+    for row, warnings_here in stream_lookup(
+            warnings, read_locations(reader, lat_column, long_column),
+            chunk_size):
+        rows += 1
+        severities = [w.severity_lev for w in warnings_here
+                      if w.severity_lev is not None]
+        if warnings_here:
+            affected += 1
+        row['warning_ids'] = ';'.join(w.id for w in warnings_here
+                                      if w.id is not None)
+        row['max_severity'] = min(severities) if severities else ''
+        writer.writerow(row)
+    return rows, affected
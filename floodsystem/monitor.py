@@ -0,0 +1,262 @@
+"""Long-running monitor holding station and warning data in memory.
+
+The monitor refreshes water levels and flood warnings on independent
+schedules, and only recomputes the data derived from them which may have
+changed: the stations with the highest relative levels and the station
+dataframe when levels are refreshed, and the stations within each warning,
+the map geoJSON, the warning dataframe and the warning index when warnings
+are refreshed.
+"""
+
+import threading
+import time
+from floodsystem import datafetcher, instrument
+from floodsystem.flood import stations_highest_rel_level
+from floodsystem.index import StationIndex, WarningIndex
+from floodsystem.plot import get_recommended_simplification_params
+from floodsystem.stationdata import build_station_list, update_water_levels, \
+    attach_water_levels, build_station_dataframe
+from floodsystem.warning import SeverityLevel
+from floodsystem.warningdata import refresh_warning_list, \
+    build_regions_geojson, build_severity_dataframe, update_poly_area_caches
+
+
+class FloodMonitor:
+    """In-memory flood data kept up to date by scheduled refreshes.
+
+    Parameters
+    ----------
+    severity : SeverityLevel, optional
+        warnings of this severity or greater are monitored. The default is
+        SeverityLevel.moderate, all currently active warnings.
+    level_interval : float, optional
+        seconds between water level refreshes. The default is 900, the
+        interval at which most stations report.
+    warning_interval : float, optional
+        seconds between flood warning refreshes. The default is 900.
+    top_n : int, optional
+        number of stations with the highest relative water level to keep.
+        The default is 10.
+    use_pickle_caches : bool, optional
+        If True, flood area and polygon data is read from and saved to the
+        pickle caches. The default is True.
+    source : optional
+        Provides the fetch functions of floodsystem.datafetcher, such as
+        datafetcher.StubDataSource. The default is the datafetcher module.
+    retry_interval : float, optional
+        seconds before a failed refresh is retried, if less than its
+        interval. The default is 60.
+
+    """
+
+    def __init__(self, severity=SeverityLevel.moderate, level_interval=900,
+                 warning_interval=900, top_n=10, use_pickle_caches=True,
+                 source=datafetcher, retry_interval=60):
+        self.severity = severity
+        self.level_interval = level_interval
+        self.warning_interval = warning_interval
+        self.retry_interval = retry_interval
+        self.top_n = top_n
+        self.use_pickle_caches = use_pickle_caches
+        self.source = source
+
+        # held while the state is updated, so that it may be read
+        # consistently from other threads
+        self.lock = threading.RLock()
+
+        self.stations = []
+        self.warnings = []
+        self.station_warnings = {}
+        self.highest_stations = []
+        self.station_df = None
+        self.warning_df = None
+        self.geojson = {'type': 'FeatureCollection', 'features': []}
+        self.station_index = StationIndex([])
+        self.warning_index = WarningIndex([])
+        self.last_level_update = None
+        self.last_warning_update = None
+
+        self._next_level_update = None
+        self._next_warning_update = None
+
+    @instrument.timed('refresh_stations')
+    def refresh_stations(self):
+        """Rebuild the station list, and everything derived from it."""
+        stations = build_station_list(source=self.source)
+        update_water_levels(stations, source=self.source)
+        station_index = StationIndex(stations)
+        with self.lock:
+            self.stations = stations
+            self.station_index = station_index
+            self._update_levels_derived()
+            # every warning has to be checked against the new station list
+            self.station_warnings = {}
+            self._update_station_warnings(self.warnings)
+            self.last_level_update = time.time()
+
+    @instrument.timed('refresh_levels')
+    def refresh_levels(self):
+        """Fetch the latest water levels and update the derived data."""
+        # the levels are fetched without the lock, but attached under it, as
+        # attach_water_levels clears every level before setting the new ones
+        measure_data = self.source.fetch_latest_water_level_data()
+        with self.lock:
+            attach_water_levels(self.stations, measure_data)
+            self._update_levels_derived()
+            self.last_level_update = time.time()
+
+    @instrument.timed('refresh_warnings')
+    def refresh_warnings(self):
+        """Fetch the flood warnings and update data for those that changed.
+
+        Only new warnings have their area and region fetched, and warnings
+        whose message changed keep the geometry of their previous version,
+        see warningdata.refresh_warning_list.
+
+        Returns
+        -------
+        WarningChangeset
+            the refreshed warnings, and the warnings added, changed and
+            removed.
+
+        """
+        with self.lock:
+            previous = self.warnings
+        changes = refresh_warning_list(
+            previous, self.severity.value,
+            use_pickle_caches=self.use_pickle_caches, source=self.source)
+        warnings = changes.warnings
+
+        shared_to_simplify = []
+        if changes:
+            simpl_params = get_recommended_simplification_params(len(warnings))
+            new_ids = {id(w) for w in changes.added + changes.changed}
+            for w in warnings:
+                if w.region is None or w.is_poly_simplified == simpl_params:
+                    continue
+                if id(w) in new_ids:
+                    w.simplify_geojson(tol=simpl_params['tol'],
+                                       buf=simpl_params['buf'])
+                else:
+                    # unchanged warnings are shared with readers, so the
+                    # simplified geoJSON is computed here, where it is kept
+                    # by the geometry, but only switched to under the lock
+                    w.geometry.simplified(simpl_params['tol'],
+                                          simpl_params['buf'])
+                    shared_to_simplify.append(w)
+            if self.use_pickle_caches and changes.added:
+                update_poly_area_caches(changes.added)
+            warning_index = WarningIndex(warnings)
+
+        with self.lock:
+            self.warnings = warnings
+            if changes:
+                for w in shared_to_simplify:
+                    w.simplify_geojson(tol=simpl_params['tol'],
+                                       buf=simpl_params['buf'])
+                for w in changes.removed:
+                    self.station_warnings.pop(w.id, None)
+                # changed warnings keep their region, so only new warnings
+                # have to be checked against the stations
+                self._update_station_warnings(changes.added)
+                self.geojson = build_regions_geojson(
+                    warnings, precision=5, properties=['FWS_TACODE'])
+                self.warning_df = build_severity_dataframe(warnings)
+                self.warning_index = warning_index
+            self.last_warning_update = time.time()
+
+        return changes
+
+    def run_pending(self, now=None):
+        """Run the refreshes which are due.
+
+        The station list is built on the first call, and rebuilt on later
+        calls until that succeeds. A refresh which raises an exception, e.g.
+        from a failed request, is reported and retried after retry_interval,
+        and the data it would have updated is left unchanged.
+
+        Parameters
+        ----------
+        now : float, optional
+            the current time, as given by time.monotonic(). The default is
+            None, where time.monotonic() is used.
+
+        Returns
+        -------
+        list[string]
+            names of the refreshes that ran successfully, from 'stations',
+            'levels' and 'warnings'.
+
+        """
+        if now is None:
+            now = time.monotonic()
+
+        ran = []
+        if self._next_level_update is None or now >= self._next_level_update:
+            if self.last_level_update is None:
+                name, refresh = 'stations', self.refresh_stations
+            else:
+                name, refresh = 'levels', self.refresh_levels
+            self._next_level_update = self._run_refresh(
+                name, refresh, now, self.level_interval, ran)
+
+        if self._next_warning_update is None \
+                or now >= self._next_warning_update:
+            self._next_warning_update = self._run_refresh(
+                'warnings', self.refresh_warnings, now, self.warning_interval,
+                ran)
+
+        return ran
+
+    def _run_refresh(self, name, refresh, now, interval, ran):
+        """Run a refresh, adding its name to ran if it succeeds, and return
+        the time it is next due."""
+        try:
+            refresh()
+        except Exception as e:
+            retry = min(interval, self.retry_interval)
+            instrument.count('refresh_errors', refresh=name)
+            print("Error refreshing {}, retrying in {} s: {!r}".format(
+                name, retry, e))
+            return now + retry
+        ran.append(name)
+        return now + interval
+
+    def run(self, stop_event=None, callback=None):
+        """Refresh data on schedule until stop_event is set.
+
+        Parameters
+        ----------
+        stop_event : threading.Event, optional
+            the monitor stops when this is set. The default is None, where
+            the monitor runs until interrupted.
+        callback : function, optional
+            called with the monitor and the list of refreshes run, after
+            any refresh.
+
+        Returns
+        -------
+        None.
+
+        """
+        if stop_event is None:
+            stop_event = threading.Event()
+
+        while not stop_event.is_set():
+            ran = self.run_pending()
+            if ran and callback is not None:
+                callback(self, ran)
+            wait = min(self._next_level_update,
+                       self._next_warning_update) - time.monotonic()
+            stop_event.wait(max(wait, 0))
+
+    def _update_levels_derived(self):
+        """Recompute data which depends on the water levels."""
+        self.highest_stations = stations_highest_rel_level(self.stations,
+                                                           self.top_n)
+        self.station_df = build_station_dataframe(self.stations)
+
+    def _update_station_warnings(self, warnings):
+        """Find the stations within each of the given warnings."""
+        assignment = WarningIndex(warnings).assign_stations(self.stations)
+        self.station_warnings.update(assignment.station_lists())
@@ -0,0 +1,258 @@
+"""Concurrent start-up of the station and warning data.
+
+The station, water level and flood warning data are fetched concurrently
+using floodsystem.asyncdatafetcher. Flood area and polygon data for each
+warning is then fetched concurrently, and each warning region is simplified
+for plotting as soon as its polygon arrives, so the start-up takes about as
+long as the slowest chain of fetches.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from floodsystem import asyncdatafetcher
+from floodsystem.plot import get_recommended_simplification_params
+from floodsystem.stationdata import parse_station_data, attach_water_levels
+from floodsystem.warningdata import warning_from_json, load_poly_area_caches, \
+    apply_cached_area, apply_cached_poly, needs_area, needs_region, \
+    set_warning_area, set_warning_region, geometry_loader
+
+
+class StageTimer:
+    """Record the time spent in each stage of a process.
+
+    Stages may overlap and may be entered several times, e.g. once per
+    warning. For each stage the time of its first start and last end are
+    recorded, relative to the creation of the timer, as well as the total
+    time spent within it and the number of times it was entered.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager timing one run of the named stage."""
+        start = time.perf_counter() - self.t0
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self.t0
+            with self._lock:
+                if name not in self.stages:
+                    self.stages[name] = {'start': start, 'end': end,
+                                         'busy': 0.0, 'count': 0}
+                s = self.stages[name]
+                s['start'] = min(s['start'], start)
+                s['end'] = max(s['end'], end)
+                s['busy'] += end - start
+                s['count'] += 1
+
+    def report(self):
+        """Return the timing breakdown as a printable table."""
+        lines = ["{:<26} {:>8} {:>8} {:>8} {:>8} {:>6}".format(
+            "stage", "start", "end", "wall", "busy", "count")]
+        for name, s in sorted(self.stages.items(),
+                              key=lambda item: item[1]['start']):
+            lines.append("{:<26} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.3f} "
+                         "{:>6}".format(name, s['start'], s['end'],
+                                        s['end'] - s['start'], s['busy'],
+                                        s['count']))
+        return "\n".join(lines)
+
+
+async def build_station_list_async(use_cache=True, timer=None):
+    """Fetch station and level data concurrently and build the station list.
+
+    Parameters
+    ----------
+    use_cache : bool, optional
+        If True, station data is loaded from the cache if available, as in
+        stationdata.build_station_list. The default is True.
+    timer : StageTimer, optional
+        records the time of each stage.
+
+    Returns
+    -------
+    stations : list[MonitoringStation]
+        the stations, with their latest water levels attached.
+
+    """
+    timer = timer if timer is not None else StageTimer()
+
+    async def fetch_stations():
+        with timer.stage("fetch stations"):
+            data = await asyncdatafetcher.fetch_station_data(use_cache)
+        with timer.stage("build stations"):
+            return parse_station_data(data)
+
+    async def fetch_levels():
+        with timer.stage("fetch levels"):
+            return await asyncdatafetcher.fetch_latest_water_level_data()
+
+    stations, level_data = await asyncio.gather(fetch_stations(),
+                                                fetch_levels())
+    with timer.stage("attach levels"):
+        attach_water_levels(stations, level_data)
+    return stations
+
+
+async def build_warning_list_async(severity, use_pickle_caches=True,
+                                   simplify=True, simpl_params=None,
+                                   timer=None, lazy_geometry=False):
+    """Build the warning list, fetching area and polygon data concurrently.
+
+    Parameters
+    ----------
+    severity : int
+        warnings of this severity value or lower are returned.
+    use_pickle_caches : bool, optional
+        If True, cached area and polygon data is used where available, as in
+        warningdata.build_warning_list. The default is True.
+    simplify : bool, optional
+        If True, warning regions are simplified for plotting as their
+        polygons arrive. The default is True.
+    simpl_params : dict, optional
+        {'tol': float, 'buf': float}, the simplification parameters. The
+        default is None, where plot.get_recommended_simplification_params is
+        used.
+    timer : StageTimer, optional
+        records the time of each stage.
+    lazy_geometry : bool, optional
+        If True, warning regions are not fetched or simplified, but loaded
+        when first used, as in warningdata.build_warning_list. The default is
+        False.
+
+    Returns
+    -------
+    warnings : list[FloodWarning]
+
+    """
+    timer = timer if timer is not None else StageTimer()
+
+    with timer.stage("fetch warnings"):
+        data = await asyncdatafetcher.fetch_flood_warnings(severity)
+
+    with timer.stage("load warning caches"):
+        if use_pickle_caches:
+            polys, areas = await asyncio.to_thread(load_poly_area_caches)
+        else:
+            polys, areas = {}, {}
+
+    items = data['items']
+    if simpl_params is None:
+        simpl_params = get_recommended_simplification_params(len(items))
+
+    def simplify_warning(warning):
+        with timer.stage("simplify"):
+            warning.simplify_geojson(tol=simpl_params['tol'],
+                                     buf=simpl_params['buf'])
+            warning.is_poly_simplified = simpl_params
+
+    async def complete_area(warning, w):
+        if needs_area(warning) and '@id' in w['floodArea']:
+            with timer.stage("fetch areas"):
+                flood_area = await asyncdatafetcher.fetch_warning_area(
+                    w['floodArea']['@id'])
+            set_warning_area(warning, flood_area)
+
+    async def complete_region(warning, w):
+        if needs_region(warning) and 'polygon' in w['floodArea']:
+            with timer.stage("fetch polygons"):
+                poly = await asyncdatafetcher.fetch_warning_region(
+                    w['floodArea']['polygon'])
+            with timer.stage("build regions"):
+                await asyncio.to_thread(set_warning_region, warning, poly)
+        if simplify and warning.region is not None \
+                and warning.is_poly_simplified != simpl_params:
+            await asyncio.to_thread(simplify_warning, warning)
+
+    warnings = []
+    tasks = []
+    for w in items:
+        warning = warning_from_json(w)
+        apply_cached_area(warning, areas)
+        warnings.append(warning)
+        tasks.append(complete_area(warning, w))
+        if lazy_geometry:
+            warning.set_geometry_loader(geometry_loader(
+                warning.id, polys, w['floodArea'].get('polygon')))
+        else:
+            apply_cached_poly(warning, polys)
+            tasks.append(complete_region(warning, w))
+
+    await asyncio.gather(*tasks)
+    return warnings
+
+
+async def startup_async(severity, load_stations=True, load_warnings=True,
+                        use_pickle_caches=True, simplify=True,
+                        simpl_params=None, timer=None, lazy_geometry=False):
+    """Build the station list and warning list concurrently.
+
+    See build_station_list_async and build_warning_list_async.
+
+    Returns
+    -------
+    stations, warnings : list[MonitoringStation], list[FloodWarning]
+        Either is an empty list if it was not loaded.
+
+    """
+    timer = timer if timer is not None else StageTimer()
+
+    async def nothing():
+        return []
+
+    with timer.stage("total"):
+        return await asyncio.gather(
+            build_station_list_async(timer=timer) if load_stations
+            else nothing(),
+            build_warning_list_async(severity, use_pickle_caches, simplify,
+                                     simpl_params, timer, lazy_geometry)
+            if load_warnings else nothing())
+
+
+def startup(severity, load_stations=True, load_warnings=True,
+            use_pickle_caches=True, simplify=True, simpl_params=None,
+            print_timing=True, lazy_geometry=False):
+    """Build the station list and warning list concurrently.
+
+    Parameters
+    ----------
+    severity : int
+        warnings of this severity value or lower are loaded.
+    load_stations : bool, optional
+        If True, the station list is built with the latest water levels.
+        The default is True.
+    load_warnings : bool, optional
+        If True, the warning list is built. The default is True.
+    use_pickle_caches : bool, optional
+        If True, cached area and polygon data is used. The default is True.
+    simplify : bool, optional
+        If True, warning regions are simplified for plotting. The default is
+        True.
+    simpl_params : dict, optional
+        {'tol': float, 'buf': float}, the simplification parameters. The
+        default is None, where the recommended parameters are used.
+    print_timing : bool, optional
+        If True, prints the time taken by each stage. The default is True.
+    lazy_geometry : bool, optional
+        If True, warning regions are loaded when first used, see
+        build_warning_list_async. The default is False.
+
+    Returns
+    -------
+    stations, warnings : list[MonitoringStation], list[FloodWarning]
+        Either is an empty list if it was not loaded.
+
+    """
+    timer = StageTimer()
+    stations, warnings = asyncio.run(startup_async(
+        severity, load_stations, load_warnings, use_pickle_caches, simplify,
+        simpl_params, timer, lazy_geometry))
+    if print_timing:
+        print(timer.report())
+    return stations, warnings
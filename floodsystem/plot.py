@@ -1,28 +1,44 @@
 """Visualizations of historical data, flooding zones, and stations."""
 
-import numpy as np
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-from plotly.offline import plot
-from floodsystem.analysis import polyfit
+import os
+from floodsystem import instrument
+from floodsystem.analysis import polyfit, downsample
+from floodsystem.utils import lazy_import
 from floodsystem.warning import SeverityLevel
 
+np = lazy_import('numpy')
+go = lazy_import('plotly.graph_objects')
+offline = lazy_import('plotly.offline')
+subplots = lazy_import('plotly.subplots')
 
-def create_water_levels_plot(listinput):
+# width in pixels that water level plots are downsampled for
+PLOT_WIDTH = 1600
+
+
+@instrument.timed('create_water_levels_plot')
+def create_water_levels_plot(listinput, width=PLOT_WIDTH, method='lttb'):
     """Plot the water levels of stations given corresponding date.
 
-    Subplots are created for each station.
+    Subplots are created for each station. The levels of each station are
+    downsampled to about two points per pixel of width before they are
+    added to the figure, so long histories stay fast to build and render.
 
     Parameters
     ----------
     listinput : list
         list of station (MonitoringStation), dates (list), and
             levels (list), in this order. List must be of length multiple of 3.
+    width : int, optional
+        width of the plot in pixels. The default is PLOT_WIDTH.
+    method : string, optional
+        how the levels are downsampled, 'lttb' or 'minmax', or None to plot
+        every reading. See analysis.downsample. The default is 'lttb'.
 
     Raises
     ------
     ValueError
-        when listinput is not of length multiple of three.
+        when listinput is not of length multiple of three, or width is less
+        than 1.
 
     Returns
     -------
@@ -33,20 +49,27 @@ def create_water_levels_plot(listinput):
     if len(listinput) % 3 != 0:
         raise ValueError("Number of arguments must be a multiple of three, as \
                          station, dates, and levels.")
+    if width < 1:
+        raise ValueError("Plot width must be at least 1 pixel, not {}".format(
+            width))
 
-    fig = make_subplots(rows=len(listinput) // 3, cols=1, shared_xaxes=True,
-                        subplot_titles=[station.name for station in
-                                        listinput[::3]])
+    fig = subplots.make_subplots(rows=len(listinput) // 3, cols=1,
+                                 shared_xaxes=True,
+                                 subplot_titles=[station.name for station in
+                                                 listinput[::3]])
 
     for i in range(len(listinput) // 3):
         # initialize values to plot
         station = listinput[3 * i]
         dates = listinput[3 * i + 1]
         levels = listinput[3 * i + 2]
+        plot_dates, plot_levels = downsample(dates, levels, 2 * width,
+                                             method)
 
         # add traces: high, low, level
         fig.add_trace(
-            go.Scatter(x=dates, y=levels, mode='lines', name='Water level',
+            go.Scatter(x=plot_dates, y=plot_levels, mode='lines',
+                       name='Water level',
                        showlegend=(i == 0), legendgroup="level",
                        line_color='blue'), row=i + 1, col=1)
         fig.add_trace(go.Scatter(x=[min(dates), max(dates)],
@@ -71,7 +94,8 @@ def create_water_levels_plot(listinput):
     return fig
 
 
-def plot_water_levels(listinput):
+def plot_water_levels(listinput, output='browser', filename=None,
+                      plotlyjs='cdn', width=PLOT_WIDTH, method='lttb'):
     """Display plot generated in create_water_levels_plot.
 
     Parameters
@@ -79,17 +103,25 @@ def plot_water_levels(listinput):
     listinput : list
         list of station (MonitoringStation), dates (list), and levels (list),
         in this order. List must be of length multiple of 3.
+    output, filename, plotlyjs : optional
+        How the figure is rendered, see render_figure. By default the figure
+        is opened in a browser.
+    width, method : optional
+        How the levels are downsampled, see create_water_levels_plot.
 
     Returns
     -------
-    None.
+    The result of render_figure.
 
     """
-    fig = create_water_levels_plot(listinput)
-    plot(fig, auto_open=True)
+    fig = create_water_levels_plot(listinput, width=width, method=method)
+    return render_figure(fig, output=output, filename=filename,
+                         plotlyjs=plotlyjs)
 
 
-def plot_water_levels_with_fit(listinput, p):
+def plot_water_levels_with_fit(listinput, p, output='browser', filename=None,
+                               plotlyjs='cdn', width=PLOT_WIDTH,
+                               method='lttb'):
     """Add best-fit line to water level graphs, and display them.
 
     Parameters
@@ -99,13 +131,19 @@ def plot_water_levels_with_fit(listinput, p):
         in this order. List must be of length multiple of 3.
     p : int
         order of polynomial fit
+    output, filename, plotlyjs : optional
+        How the figure is rendered, see render_figure. By default the figure
+        is opened in a browser.
+    width, method : optional
+        How the levels are downsampled, see create_water_levels_plot. The
+        fitted curve is evaluated at the dates of the plotted levels.
 
     Returns
     -------
-    None.
+    The result of render_figure.
 
     """
-    fig = create_water_levels_plot(listinput)
+    fig = create_water_levels_plot(listinput, width=width, method=method)
 
     for i in range(len(listinput) // 3):
         # initialize values to plot
@@ -113,6 +151,7 @@ def plot_water_levels_with_fit(listinput, p):
         levels = listinput[3 * i + 2]
 
         poly, d0 = polyfit(dates, levels, p)
+        dates, _ = downsample(dates, levels, 2 * width, method)
 
         # convert dates to minutes (integers), normalized to start at zero
         x = [date.timestamp() / 60 for date in dates]
@@ -129,12 +168,17 @@ def plot_water_levels_with_fit(listinput, p):
                                  legendgroup="fittedlevel", line_color='gray'),
                       row=i + 1, col=1)
 
-    plot(fig, auto_open=True)
+    return render_figure(fig, output=output, filename=filename,
+                         plotlyjs=plotlyjs)
 
 
-def map_flood_warnings(geojson, warning_df=None, min_severity=4,
-                       station_df=None):
-    """Plot flood warnings and station levels as a chloropleth map figure.
+@instrument.timed('create_flood_warning_map')
+def create_flood_warning_map(geojson, warning_df=None, min_severity=4,
+                             station_df=None):
+    """Create a chloropleth map figure of flood warnings and station levels.
+
+    Only the dataframe columns referenced by the hover templates are passed
+    to plotly as customdata, as NumPy arrays.
 
     Parameters
     ----------
@@ -147,7 +191,8 @@ def map_flood_warnings(geojson, warning_df=None, min_severity=4,
         Defaults to None, where warnings are not mapped.
     station_df : pandas.dataframe, optional
          Contains information of position and relative water level of each
-         station, to be plotted as a scatter map. Defaults to None, where
+         station, to be plotted as a scatter map. Created using
+         stationdata.build_station_dataframe. Defaults to None, where
          stations are not mapped.
     min_severity : int, optional
         If provided, plots only warnings equal to or above this severity
@@ -157,22 +202,23 @@ def map_flood_warnings(geojson, warning_df=None, min_severity=4,
 
     Returns
     -------
-    None.
+    fig : plotly.graph_objects.Figure
+        the map figure.
 
     """
-    hover_temp_choro = "<b>%{customdata[2]}</b><br>" \
+    hover_temp_choro = "<b>%{customdata[1]}</b><br>" \
                        "severity : %{customdata[0]}<br>" \
-                       "last update : %{customdata[3]}<br><br>" \
+                       "last update : %{customdata[2]}<br><br>" \
                        "warning link : <a href='https://flood-warning-" \
                        "information.service.gov.uk/warnings?location=" \
-                       "%{customdata[6]}'> %{customdata[6]}</a>"
+                       "%{customdata[3]}'> %{customdata[3]}</a>"
 
     hover_temp_scatter = "<b>%{customdata[0]}</b><br>" \
-                         "Water level : %{customdata[3]} m<br>" \
-                         "Typical Range : %{customdata[5][0]}m - " \
-                         "%{customdata[5][1]}m<br>" \
+                         "Water level : %{customdata[1]}<br>" \
+                         "Typical Range : %{customdata[2]}m - " \
+                         "%{customdata[3]}m<br>" \
                          "Relative Level : %{customdata[4]:.3r}<br>" \
-                         "Town : %{customdata[6]}"
+                         "Town : %{customdata[5]}"
 
     fig = go.Figure()
 
@@ -180,7 +226,7 @@ def map_flood_warnings(geojson, warning_df=None, min_severity=4,
         colorscale, ticktext = create_choropleth_colour_scale(min_severity)
 
         fig.add_choroplethmapbox(geojson=geojson,
-                                 z=5 - warning_df['int_severity'],
+                                 z=5 - warning_df['int_severity'].to_numpy(),
                                  zmax=min_severity + 0.1, zmin=1 - 0.1,
                                  colorscale=colorscale, autocolorscale=False,
 
@@ -193,11 +239,12 @@ def map_flood_warnings(geojson, warning_df=None, min_severity=4,
                                  colorbar_yanchor="bottom", colorbar_y=0,
                                  colorbar_title_text="Flood Warnings",
 
-                                 locations=warning_df['id'],
+                                 locations=warning_df['id'].to_numpy(),
                                  featureidkey="properties.FWS_TACODE",
                                  hovertemplate=hover_temp_choro,
-                                 customdata=[row for _, row in
-                                             warning_df.iterrows()],
+                                 customdata=warning_df[
+                                     ['severity', 'label', 'last_updated',
+                                      'county']].to_numpy(),
                                  marker_opacity=0.6,
                                  marker_line_width=0,
                                  name="Flood Warning")
@@ -207,19 +254,28 @@ def map_flood_warnings(geojson, warning_df=None, min_severity=4,
         min_lev = station_df.rel_level.mean() - station_df.rel_level.std()
         max_lev = station_df.rel_level.mean() + station_df.rel_level.std()
 
+        customdata = station_df[['name', 'level', 'typical_low',
+                                 'typical_high', 'rel_level',
+                                 'town']].to_numpy(dtype=object)
+        # a missing level is NaN in the dataframe
+        customdata[:, 1] = ["Not available" if np.isnan(level)
+                            else "{} m".format(level)
+                            for level in station_df['level'].to_numpy()]
+
         # create map of stations
-        fig.add_scattermapbox(lon=station_df.lon, lat=station_df.lat,
-                              text=station_df.name, mode='markers',
+        fig.add_scattermapbox(lon=station_df['lon'].to_numpy(),
+                              lat=station_df['lat'].to_numpy(),
+                              text=station_df['name'].to_numpy(),
+                              mode='markers',
                               # hover information column
-                              marker_color=station_df.rel_level,
+                              marker_color=station_df['rel_level'].to_numpy(),
                               marker_cmin=min_lev, marker_cmax=max_lev,
                               marker_colorscale='rdbu_r',
                               marker_colorbar_thickness=15,
                               marker_colorbar_x=0.1,
                               marker_colorbar_title='Relative Water Level',
 
-                              customdata=[row for _, row in
-                                          station_df.iterrows()],
+                              customdata=customdata,
                               hovertemplate=hover_temp_scatter,
                               name="Station", )
 
@@ -231,7 +287,135 @@ def map_flood_warnings(geojson, warning_df=None, min_severity=4,
                       hovermode='closest')
 
     fig.update_geos(lataxis_showgrid=True, lonaxis_showgrid=True, visible=True)
-    plot(fig, auto_open=True)
+    return fig
+
+
+def map_flood_warnings(geojson, warning_df=None, min_severity=4,
+                       station_df=None, output='browser', filename=None,
+                       plotlyjs='cdn'):
+    """Display the map generated in create_flood_warning_map.
+
+    Parameters
+    ----------
+    geojson : geo_json
+        Contains the perimeter definitions for all warnings. Created from
+            warningdata.build_regions_geojson.
+    warning_df : pandas.dataframe, optional
+        Created using warningdata.build_severity_dataframe. Defaults to None,
+        where warnings are not mapped.
+    min_severity : int, optional
+        Plots only warnings equal to or above this severity level. Default is
+        4 (all warnings plotted).
+    station_df : pandas.dataframe, optional
+        Created using stationdata.build_station_dataframe. Defaults to None,
+        where stations are not mapped.
+    output, filename, plotlyjs : optional
+        How the figure is rendered, see render_figure. By default the figure
+        is opened in a browser.
+
+    Returns
+    -------
+    The result of render_figure.
+
+    """
+    fig = create_flood_warning_map(geojson, warning_df=warning_df,
+                                   min_severity=min_severity,
+                                   station_df=station_df)
+    return render_figure(fig, output=output, filename=filename,
+                         plotlyjs=plotlyjs)
+
+
+@instrument.timed('render_figure')
+def render_figure(fig, output='browser', filename=None, plotlyjs='cdn'):
+    """Render a figure to a browser, a file, or return it unchanged.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure
+        the figure to render.
+    output : {'browser', 'figure', 'html', 'json'}, optional
+        'browser' writes an HTML file with plotly.js inlined and opens it in
+        the default browser. 'figure' returns the figure without rendering,
+        'html' writes an HTML file without opening it and 'json' writes the
+        figure as plotly JSON. The default is 'browser'.
+    filename : string, optional
+        The file written for 'html' and 'json' output. Defaults to
+        temp-plot.html or temp-plot.json.
+    plotlyjs : string, optional
+        How HTML output references plotly.js, passed to plotly's
+        include_plotlyjs. 'cdn' loads it from the plotly CDN, 'directory'
+        references a plotly.min.js placed once alongside the HTML files,
+        and a path or URL ending in .js references that file. The default is
+        'cdn'.
+
+    Raises
+    ------
+    ValueError
+        when output is not one of the supported options.
+
+    Returns
+    -------
+    fig, filename or None
+        the figure for 'figure' output, the file written for 'html' and
+        'json' output, otherwise None.
+
+    """
+    if output == 'browser':
+        offline.plot(fig, auto_open=True)
+        return None
+    if output == 'figure':
+        return fig
+    if output == 'html':
+        if filename is None:
+            filename = 'temp-plot.html'
+        fig.write_html(filename, include_plotlyjs=plotlyjs, auto_open=False)
+        return filename
+    if output == 'json':
+        if filename is None:
+            filename = 'temp-plot.json'
+        fig.write_json(filename)
+        return filename
+    raise ValueError("output must be one of 'browser', 'figure', 'html' or "
+                     "'json', not {!r}".format(output))
+
+
+def render_figures(figs, directory, output='html', plotlyjs='directory'):
+    """Write several figures to files in a directory.
+
+    With the default settings plotly.js is written to the directory once, as
+    plotly.min.js, and referenced by every HTML file rather than embedded in
+    each of them.
+
+    Parameters
+    ----------
+    figs : dict{string : plotly.graph_objects.Figure}
+        The figures to write, keyed by the file name to use, without an
+        extension.
+    directory : string
+        The output directory, which is created if it does not exist.
+    output : {'html', 'json'}, optional
+        The file type to write. The default is 'html'.
+    plotlyjs : string, optional
+        How HTML output references plotly.js, see render_figure. The default
+        is 'directory'.
+
+    Returns
+    -------
+    filenames : list[string]
+        The files written.
+
+    """
+    try:
+        os.makedirs(directory)
+    except FileExistsError:
+        pass
+
+    filenames = []
+    for name, fig in figs.items():
+        filename = os.path.join(directory, "{}.{}".format(name, output))
+        filenames.append(render_figure(fig, output=output, filename=filename,
+                                       plotlyjs=plotlyjs))
+    return filenames
 
 
 def get_recommended_simplification_params(warning_len):
@@ -0,0 +1,228 @@
+"""Profiling of the Task and demo programs.
+
+Each program accepts the options added by add_arguments, e.g.
+
+    python Task1F.py --profile cprofile
+    python extension_demo.py --profile sample --profile-memory
+
+In cprofile mode the main thread is profiled with cProfile, the statistics
+are written to PREFIX.prof, for use with pstats or snakeviz, and the
+functions with the greatest cumulative time are printed. In sample mode the
+stacks of all threads are sampled at a fixed interval, and written to
+PREFIX.collapsed in the collapsed stack format read by flamegraph.pl and
+speedscope, one line per distinct stack with the number of samples in it.
+With --profile-memory the peak memory allocated through Python, and the
+largest allocations remaining at the end of the run, are also reported
+using tracemalloc.
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILE_MODES = ['cprofile', 'sample']
+
+
+class StackSampler:
+    """Sample the stacks of all threads at a fixed interval.
+
+    Parameters
+    ----------
+    interval : float, optional
+        seconds between samples. The default is 0.005.
+
+    Attributes
+    ----------
+    counts : dict{tuple(string) : int}
+        number of samples of each stack, outermost frame first. The first
+        item of each stack is the name of the thread.
+    samples : int
+        number of times the threads were sampled.
+
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='StackSampler')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stack = tuple(reversed(stack))
+                self.counts[stack] = self.counts.get(stack, 0) + 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Return the samples in the collapsed stack format."""
+        return ["{} {}".format(";".join(stack), n) for stack, n in
+                sorted(self.counts.items(), key=lambda item: -item[1])]
+
+    def write_collapsed(self, filename):
+        """Write the samples to a file in the collapsed stack format."""
+        with open(filename, 'w') as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+
+    def top(self, n=25):
+        """Return the n functions seen in the most samples, with the
+        fraction of samples they were seen in."""
+        seen = {}
+        for stack, count in self.counts.items():
+            for label in set(stack[1:]):
+                seen[label] = seen.get(label, 0) + count
+        total = max(sum(self.counts.values()), 1)
+        return [(label, count / total) for label, count in
+                sorted(seen.items(), key=lambda item: -item[1])[:n]]
+
+
+def frame_label(frame):
+    """Return the label of a frame as file:function."""
+    code = frame.f_code
+    return "{}:{}".format(os.path.basename(code.co_filename),
+                          getattr(code, 'co_qualname', code.co_name))
+
+
+def profile_call(func, *args, mode='cprofile', output='profile',
+                 interval=0.005, memory=False, **kwargs):
+    """Call a function under the profiler and report the results.
+
+    Parameters
+    ----------
+    func : function
+        the function to profile, called with args and kwargs.
+    mode : string, optional
+        'cprofile' or 'sample', see the module documentation, or None to
+        only time the call, and report its memory if memory is True. The
+        default is 'cprofile'.
+    output : string, optional
+        prefix of the output files, PREFIX.prof or PREFIX.collapsed. The
+        default is 'profile'.
+    interval : float, optional
+        seconds between samples in sample mode. The default is 0.005.
+    memory : bool, optional
+        If True, the peak memory is reported using tracemalloc. This slows
+        the run down considerably. The default is False.
+
+    Returns
+    -------
+    The return value of func.
+
+    """
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError("mode must be one of {}".format(PROFILE_MODES))
+
+    if memory:
+        tracemalloc.start()
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+    elif mode == 'sample':
+        profiler = StackSampler(interval)
+
+    start = time.perf_counter()
+    if mode == 'cprofile':
+        profiler.enable()
+    elif mode == 'sample':
+        profiler.start()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        if mode == 'cprofile':
+            profiler.disable()
+        elif mode == 'sample':
+            profiler.stop()
+        elapsed = time.perf_counter() - start
+
+        print("")
+        print("*** Profile: {:.3f} s ***".format(elapsed))
+        if mode == 'cprofile':
+            filename = output + '.prof'
+            profiler.dump_stats(filename)
+            stats = pstats.Stats(profiler)
+            stats.sort_stats('cumulative').print_stats(25)
+            print("Profile written to {}".format(filename))
+        elif mode == 'sample':
+            filename = output + '.collapsed'
+            profiler.write_collapsed(filename)
+            print("{} samples".format(profiler.samples))
+            for label, fraction in profiler.top():
+                print("{:>6.1%}  {}".format(fraction, label))
+            print("Profile written to {}".format(filename))
+
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print("")
+            print("Peak memory: {:.1f} MB, at end: {:.1f} MB".format(
+                peak / 1e6, current / 1e6))
+            for stat in snapshot.statistics('lineno')[:10]:
+                print("    {}".format(stat))
+
+    return result
+
+
+def add_arguments(parser):
+    """Add the profiling options to an argparse parser."""
+    parser.add_argument("--profile", type=str, default=None,
+                        choices=PROFILE_MODES,
+                        help="Profiles the run with cProfile, or by sampling "
+                             "the stacks, written as collapsed stacks for "
+                             "flame graphs.")
+    parser.add_argument("--profile-output", type=str, default='profile',
+                        dest='profile_output',
+                        help="Prefix of the profile output file.")
+    parser.add_argument("--profile-interval", type=float, default=0.005,
+                        dest='profile_interval',
+                        help="Seconds between stack samples.")
+    parser.add_argument("--profile-memory", action='store_true',
+                        dest='profile_memory',
+                        help="Reports the peak memory using tracemalloc.")
+
+
+def call_with_args(args, func, *func_args, **func_kwargs):
+    """Call a function, profiled if requested by the parsed options."""
+    if args.profile is None and not args.profile_memory:
+        return func(*func_args, **func_kwargs)
+    return profile_call(func, *func_args, mode=args.profile,
+                        output=args.profile_output,
+                        interval=args.profile_interval,
+                        memory=args.profile_memory, **func_kwargs)
+
+
+def main(func, argv=None):
+    """Parse the profiling options and call func, for programs with no
+    other options."""
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return call_with_args(args, func)
@@ -0,0 +1,195 @@
+"""HTTP/JSON interface to the flood data held by a FloodMonitor.
+
+Endpoints, answered with JSON:
+
+    /status                              counts and update times
+    /warnings?lat=LAT&long=LONG          warnings in force at a location
+    /stations/near?lat=LAT&long=LONG&radius=KM
+                                         stations within a radius, nearest
+                                         first
+    /stations/river?name=RIVER           stations on a river
+    /stations/highest?n=N                stations with the highest relative
+                                         water level
+
+and /metrics, answering with the timers and counters of
+floodsystem.instrument in the Prometheus text format.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from floodsystem import instrument
+from floodsystem.flood import stations_highest_rel_level
+
+
+def station_to_dict(station, distance=None):
+    """Return the JSON representation of a station."""
+    d = {'name': station.name,
+         'station_id': station.station_id,
+         'coord': station.coord,
+         'river': station.river,
+         'town': station.town,
+         'typical_range': station.typical_range,
+         'latest_level': station.latest_level,
+         'relative_level': station.relative_water_level()}
+    if distance is not None:
+        d['distance'] = distance
+    return d
+
+
+def warning_to_dict(warning):
+    """Return the JSON representation of a flood warning."""
+    return {'id': warning.id,
+            'label': warning.label,
+            'severity': warning.severity.name,
+            'severity_level': warning.severity_lev,
+            'county': warning.county,
+            'message': warning.message,
+            'last_update': warning.last_update}
+
+
+class FloodRequestHandler(BaseHTTPRequestHandler):
+    """Answers queries using the monitor of the server."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == '/metrics':
+            self.send_text(instrument.prometheus_text())
+            return
+        routes = {'/status': self.status,
+                  '/warnings': self.warnings,
+                  '/stations/near': self.stations_near,
+                  '/stations/river': self.stations_on_river,
+                  '/stations/highest': self.stations_highest}
+        if url.path not in routes:
+            self.send_json({'error': 'not found'}, status=404)
+            return
+        try:
+            self.send_json(routes[url.path](self.server.monitor, params))
+        except (KeyError, ValueError) as e:
+            self.send_json({'error': 'invalid parameter: {}'.format(e)},
+                           status=400)
+
+    def send_json(self, data, status=200):
+        self.send_text(json.dumps(data), status, 'application/json')
+
+    def send_text(self, text, status=200,
+                  content_type='text/plain; version=0.0.4'):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    @staticmethod
+    def status(monitor, params):
+        with monitor.lock:
+            return {'stations': len(monitor.stations),
+                    'warnings': len(monitor.warnings),
+                    'last_level_update': monitor.last_level_update,
+                    'last_warning_update': monitor.last_warning_update}
+
+    @staticmethod
+    def warnings(monitor, params):
+        coord = (float(params['lat']), float(params['long']))
+        with monitor.lock:
+            index = monitor.warning_index
+        return [warning_to_dict(w) for w in index.warnings_at(coord)]
+
+    @staticmethod
+    def stations_near(monitor, params):
+        coord = (float(params['lat']), float(params['long']))
+        radius = float(params['radius'])
+        # levels are read under the lock, as refresh_levels changes them
+        with monitor.lock:
+            return [station_to_dict(s, d) for s, d in
+                    monitor.station_index.within_radius(coord, radius)]
+
+    @staticmethod
+    def stations_on_river(monitor, params):
+        with monitor.lock:
+            return [station_to_dict(s) for s in
+                    monitor.station_index.on_river(params['name'])]
+
+    @staticmethod
+    def stations_highest(monitor, params):
+        n = int(params.get('n', monitor.top_n))
+        if n < 1:
+            raise ValueError("n must be at least 1, not {}".format(n))
+        with monitor.lock:
+            if n <= len(monitor.highest_stations):
+                stations = monitor.highest_stations[:n]
+            else:
+                stations = stations_highest_rel_level(monitor.stations, n)
+            return [station_to_dict(s) for s in stations]
+
+
+def create_server(monitor, host='127.0.0.1', port=8000, quiet=False):
+    """Create an HTTP server answering queries from a monitor's data.
+
+    Each request is handled in its own thread.
+
+    Parameters
+    ----------
+    monitor : FloodMonitor
+        the monitor holding the data.
+    host : string, optional
+        the address to listen on. The default is '127.0.0.1'.
+    port : int, optional
+        the port to listen on, or 0 to pick a free port. The default is 8000.
+    quiet : bool, optional
+        If True, requests are not logged. The default is False.
+
+    Returns
+    -------
+    server : http.server.ThreadingHTTPServer
+
+    """
+    server = ThreadingHTTPServer((host, port), FloodRequestHandler)
+    server.daemon_threads = True
+    server.monitor = monitor
+    server.quiet = quiet
+    return server
+
+
+def serve(monitor, host='127.0.0.1', port=8000, callback=None):
+    """Serve queries while refreshing the monitor's data in the background.
+
+    Parameters
+    ----------
+    monitor : FloodMonitor
+        the monitor holding the data. Its data is built before the server
+        starts.
+    host, port : optional
+        the address to listen on, see create_server.
+    callback : function, optional
+        passed to FloodMonitor.run, called after each refresh.
+
+    Returns
+    -------
+    None.
+
+    """
+    ran = monitor.run_pending()
+    if callback is not None:
+        callback(monitor, ran)
+
+    stop_event = threading.Event()
+    refresh_thread = threading.Thread(target=monitor.run,
+                                      args=(stop_event, callback),
+                                      daemon=True)
+    refresh_thread.start()
+
+    server = create_server(monitor, host, port)
+    try:
+        server.serve_forever()
+    finally:
+        stop_event.set()
+        server.server_close()
@@ -3,11 +3,28 @@
 # SPDX-License-Identifier: MIT
 """Model for a monitoring station and tools for manipulating station data."""
 
+import sys
 from floodsystem.utils import map
 
 
+def _intern(value):
+    """Intern a string so repeated values share a single object."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
 class MonitoringStation:
-    """Class representing a river level monitoring station."""
+    """Class representing a river level monitoring station.
+
+    Instances use __slots__ rather than a per-instance __dict__, and the
+    river and town strings are interned, since these are repeated across the
+    several thousand stations in a station list. The coordinate is stored as
+    a (lat, long) tuple of floats, built once when it is set.
+    """
+
+    __slots__ = ('station_id', 'measure_id', 'name', '_coord',
+                 'typical_range', 'river', 'town', 'latest_level')
 
     def __init__(self, station_id, measure_id, label, coord, typical_range,
                  river, town):
@@ -23,11 +40,23 @@ class MonitoringStation:
 
         self.coord = coord
         self.typical_range = typical_range
-        self.river = river
-        self.town = town
+        self.river = _intern(river)
+        self.town = _intern(town)
 
         self.latest_level = None
 
+    @property
+    def coord(self):
+        """(lat, long) coordinate of the station, or None if unknown."""
+        return self._coord
+
+    @coord.setter
+    def coord(self, coord):
+        if coord is None:
+            self._coord = None
+        else:
+            self._coord = (float(coord[0]), float(coord[1]))
+
     def __repr__(self):
         d = "Station name:     {}\n".format(self.name)
         d += "   id:            {}\n".format(self.station_id)
@@ -4,12 +4,16 @@
 """Interface for extracting station data from JSON objects fetched from the
 Internet."""
 
-import pandas as pd
-from floodsystem import datafetcher
+from floodsystem import datafetcher, instrument
 from floodsystem.station import MonitoringStation
+from floodsystem.utils import lazy_import
 
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
-def build_station_list(use_cache=True, test=False):
+
+@instrument.timed('build_station_list')
+def build_station_list(use_cache=True, test=False, source=datafetcher):
     """Build and return a list of all river level monitoring stations
     based on data fetched from the Environment agency. Each station is
     represented as a MonitoringStation object.
@@ -24,6 +28,9 @@ def build_station_list(use_cache=True, test=False):
     ----------
     use_cache : bool, optional
     test : bool, optional
+    source : optional
+        Provides the fetch functions of floodsystem.datafetcher, from which
+        data is obtained. The default is the datafetcher module itself.
 
     Returns
     -------
@@ -32,10 +39,26 @@ def build_station_list(use_cache=True, test=False):
     """
     # Fetch station data - if testing use the fixed test data
     if test:
-        data = datafetcher.fetch_test_station_data()
+        data = source.fetch_test_station_data()
     else:
-        data = datafetcher.fetch_station_data(use_cache)
+        data = source.fetch_station_data(use_cache)
+
+    return parse_station_data(data)
+
+
+def parse_station_data(data):
+    """Build a list of MonitoringStation objects from fetched station data.
+
+    Parameters
+    ----------
+    data : dict
+        station data, as returned by datafetcher.fetch_station_data.
 
+    Returns
+    -------
+    stations : list[MonitoringStations]
+
+    """
     # Build list of MonitoringStation objects
     stations = []
     for e in data["items"]:
@@ -76,11 +99,32 @@ def build_station_list(use_cache=True, test=False):
     return stations
 
 
-def update_water_levels(stations, use_cache=False):
-    """Attach level data contained in measure_data to stations."""
+@instrument.timed('update_water_levels')
+def update_water_levels(stations, use_cache=False, source=datafetcher):
+    """Attach level data contained in measure_data to stations.
+
+    Data is fetched using source, which provides the fetch functions of
+    floodsystem.datafetcher and defaults to the datafetcher module.
+    """
     # Fetch level data
-    measure_data = datafetcher.fetch_latest_water_level_data(use_cache)
+    measure_data = source.fetch_latest_water_level_data(use_cache)
+    attach_water_levels(stations, measure_data)
+
+
+def attach_water_levels(stations, measure_data):
+    """Attach fetched level data to stations.
+
+    Parameters
+    ----------
+    stations : list[MonitoringStation]
+    measure_data : dict
+        level data, as returned by datafetcher.fetch_latest_water_level_data.
 
+    Returns
+    -------
+    None.
+
+    """
     # Build map from measure id to latest reading (value)
     measure_id_to_value = dict()
     for measure in measure_data['items']:
@@ -101,9 +145,16 @@ def update_water_levels(stations, use_cache=False):
                 station.latest_level = measure_id_to_value[station.measure_id]
 
 
+@instrument.timed('build_station_dataframe')
 def build_station_dataframe(stations):
     """Create a pandas DataFrame containing data for all monitoring stations.
 
+    The station list is traversed once, and the relative water levels are
+    calculated for all stations at once from the level and typical range
+    columns. Numeric columns are floats with NaN marking missing data, e.g.
+    level is NaN for a station without a reading, and the town column is
+    categorical.
+
     Parameters
     ----------
     stations : list[MonitoringStation]
@@ -112,25 +163,50 @@ def build_station_dataframe(stations):
     Returns
     -------
     df : pandas DataFrame
-        the output dataframe.
+        the output dataframe, with columns name, lon, lat, level, rel_level,
+        typical_low, typical_high and town. rel_level is 0 where the relative
+        water level is not available.
 
     """
-    df = pd.DataFrame()
-    df['name'] = [(station.name if station.name is not None else "Unnamed")
-                  for station in stations]
-    df['lon'] = [(station.coord[1] if station.coord is not None else None)
-                 for station in stations]
-    df['lat'] = [(station.coord[0] if station.coord is not None else None)
-                 for station in stations]
-    df['level'] = [(station.latest_level if station.latest_level is not None
-                    else "Not available") for station in stations]
-    df['rel_level'] = [station.relative_water_level() if
-                       station.relative_water_level() is not None else 0
-                       for station in stations]
-    df['typical_range'] = [station.typical_range if station.typical_range is
-                            not None else (0, 0) for station in stations]
-    df['town'] = [station.town if station.town is not None else "Not available"
-                  for station in stations]
-
+    n = len(stations)
+    names = []
+    towns = []
+    coords = np.full((n, 2), np.nan)
+    levels = np.full(n, np.nan)
+    ranges = np.full((n, 2), np.nan)
+
+    for i, station in enumerate(stations):
+        names.append(station.name if station.name is not None else "Unnamed")
+        town = station.town
+        # as with labels, the data system sometimes returns a list of towns
+        if isinstance(town, list):
+            town = town[0]
+        towns.append(town if town is not None else "Not available")
+        if station.coord is not None:
+            coords[i] = station.coord
+        if station.latest_level is not None:
+            levels[i] = station.latest_level
+        if station.typical_range is not None:
+            ranges[i] = station.typical_range
+
+    # relative level is only defined for consistent, non-degenerate ranges,
+    # and as in MonitoringStation.relative_water_level not for a level of
+    # exactly zero
+    low, high = ranges[:, 0], ranges[:, 1]
+    width = high - low
+    valid = ~np.isnan(levels) & (levels != 0) & (width > 0)
+    rel_level = np.zeros(n)
+    rel_level[valid] = (levels[valid] - low[valid]) / width[valid]
+
+    df = pd.DataFrame({
+        'name': names,
+        'lon': coords[:, 1],
+        'lat': coords[:, 0],
+        'level': levels,
+        'rel_level': rel_level,
+        'typical_low': low,
+        'typical_high': high,
+        'town': pd.Categorical(towns),
+    })
 
     return df
@@ -0,0 +1,349 @@
+"""Local stub of the Flood Monitoring API for offline and load testing.
+
+The stub server answers the requests made by floodsystem.datafetcher:
+
+    /id/stations                         station data
+    /id/measures                         latest readings of all measures
+    /id/measures/{id}/readings           readings of a measure, with 'since'
+    /id/floods                           flood warnings, with 'min-severity'
+    /id/floodAreas/{id}                  flood area data
+    /id/floodAreas/{id}/polygon          flood area polygon
+
+from either a synthetic.SyntheticDataset or a RecordedDataset of payloads
+saved from the real API. Latency, errors, a bandwidth limit and a request
+rate limit can be injected. Point floodsystem at the server with
+datafetcher.set_base_url(server.url), or by setting the
+FLOODSYSTEM_BASE_URL environment variable, e.g.
+
+    python -m floodsystem.stubserver --port 8080 --latency 0.1
+    FLOODSYSTEM_BASE_URL=http://127.0.0.1:8080 python Task1A.py
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import dateutil.parser
+from floodsystem import datafetcher
+from floodsystem.synthetic import SyntheticDataset
+
+
+class RecordedDataset:
+    """Payloads recorded from the Flood Monitoring API.
+
+    The directory holds station_data.json, level_data.json and
+    warning_data.json, as written to the cache directory by datafetcher, and
+    optionally floodAreas/{id}.json and floodAreas/{id}_polygon.json files
+    for each flood area, see record_api_data. Readings are not recorded, so
+    none are returned.
+
+    Parameters
+    ----------
+    directory : string
+        the directory holding the payloads.
+    base_url : string, optional
+        the base url of the recorded urls. The default is the API's.
+
+    """
+
+    def __init__(self, directory, base_url=datafetcher.DEFAULT_BASE_URL):
+        self.directory = directory
+        self.base_url = base_url
+
+    def _load(self, *path):
+        return datafetcher.load(os.path.join(self.directory, *path))
+
+    def station_data(self):
+        return self._load('station_data.json')
+
+    def level_data(self):
+        return self._load('level_data.json')
+
+    def warning_data(self):
+        return self._load('warning_data.json')
+
+    def readings(self, measure_id, dt=None):
+        return {'items': []}
+
+    def flood_area(self, identifier):
+        return self._load('floodAreas', identifier + '.json')
+
+    def polygon(self, identifier):
+        return self._load('floodAreas', identifier + '_polygon.json')
+
+
+def record_api_data(directory, severity=4):
+    """Save payloads from the API for replay as a RecordedDataset.
+
+    Parameters
+    ----------
+    directory : string
+        the output directory, created if it does not exist.
+    severity : int, optional
+        flood warnings of this severity or greater, and their flood areas,
+        are recorded. The default is 4, all warnings.
+
+    Returns
+    -------
+    None.
+
+    """
+    os.makedirs(os.path.join(directory, 'floodAreas'), exist_ok=True)
+    warning_data = datafetcher.fetch_flood_warnings(severity)
+    for filename, data in (
+            ('station_data.json', datafetcher.fetch_station_data(False)),
+            ('level_data.json',
+             datafetcher.fetch_latest_water_level_data(False)),
+            ('warning_data.json', warning_data)):
+        datafetcher.dump(data, os.path.join(directory, filename))
+
+    for w in warning_data['items']:
+        area = w['floodArea']
+        identifier = w['floodAreaID']
+        path = os.path.join(directory, 'floodAreas', identifier)
+        if '@id' in area:
+            datafetcher.dump(datafetcher.fetch_warning_area(area['@id']),
+                             path + '.json')
+        if 'polygon' in area:
+            datafetcher.dump(datafetcher.fetch(area['polygon']),
+                             path + '_polygon.json')
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """Answers API requests from the dataset of the server."""
+
+    routes = [
+        (re.compile(r'^/id/stations/?$'), 'stations'),
+        (re.compile(r'^/id/measures/?$'), 'measures'),
+        (re.compile(r'^/id/measures/(?P<id>[^/]+)/readings/?$'), 'readings'),
+        (re.compile(r'^/id/floods/?$'), 'floods'),
+        (re.compile(r'^/id/floodAreas/(?P<id>[^/]+)/?$'), 'area'),
+        (re.compile(r'^/id/floodAreas/(?P<id>[^/]+)/polygon/?$'), 'polygon'),
+    ]
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        for pattern, kind in self.routes:
+            match = pattern.match(url.path)
+            if match:
+                break
+        else:
+            kind = None
+
+        server.throttle()
+        server.count(kind or 'unknown')
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        if kind is None:
+            self.send_json({'error': 'not found'}, status=404)
+            return
+        if server.error_rate and random.random() < server.error_rate:
+            server.count('errors')
+            self.send_json({'error': 'injected error'}, status=503)
+            return
+
+        try:
+            data = self.payload(kind, match, params)
+        except (FileNotFoundError, KeyError):
+            self.send_json({'error': 'not found'}, status=404)
+            return
+        self.send_json(data)
+
+    def payload(self, kind, match, params):
+        dataset = self.server.dataset
+        if kind == 'stations':
+            return dataset.station_data()
+        if kind == 'measures':
+            return dataset.level_data()
+        if kind == 'readings':
+            measure_id = "{}/id/measures/{}".format(dataset.base_url,
+                                                    match.group('id'))
+            dt = datetime.timedelta(days=1)
+            if 'since' in params:
+                since = dateutil.parser.parse(params['since'])
+                dt = datetime.datetime.now(since.tzinfo) - since
+            return dataset.readings(measure_id, dt)
+        if kind == 'floods':
+            data = dataset.warning_data()
+            if 'min-severity' in params:
+                severity = int(params['min-severity'])
+                data = dict(data, items=[
+                    w for w in data['items']
+                    if w.get('severityLevel', 4) <= severity])
+            return data
+        if kind == 'area':
+            return dataset.flood_area(match.group('id'))
+        return dataset.polygon(match.group('id'))
+
+    def send_json(self, data, status=200):
+        # urls in the data refer to the dataset's base url, so are rewritten
+        # to refer to this server
+        text = json.dumps(data).replace(self.server.dataset.base_url,
+                                        self.server.url)
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.server.send_limited(self.wfile, body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class StubAPIServer(ThreadingHTTPServer):
+    """HTTP server replaying a dataset as the Flood Monitoring API.
+
+    Parameters
+    ----------
+    dataset : SyntheticDataset or RecordedDataset, optional
+        the data served. The default is None, where a SyntheticDataset with
+        default parameters is used.
+    host : string, optional
+        the address to listen on. The default is '127.0.0.1'.
+    port : int, optional
+        the port to listen on, or 0 to pick a free port. The default is 0.
+    latency : float, optional
+        seconds added to every response. The default is 0.
+    jitter : float, optional
+        up to this many seconds are randomly added to every response. The
+        default is 0.
+    error_rate : float, optional
+        fraction of requests answered with a 503 error. The default is 0.
+    bandwidth : float, optional
+        maximum bytes per second sent in each response. The default is None,
+        unlimited.
+    rate_limit : float, optional
+        maximum requests per second across all clients; requests over the
+        limit are delayed. The default is None, unlimited.
+    quiet : bool, optional
+        If True, requests are not logged. The default is True.
+
+    Attributes
+    ----------
+    url : string
+        base url of the server, to be passed to datafetcher.set_base_url.
+    stats : dict{string : int}
+        number of requests of each kind, and of injected errors.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, dataset=None, host='127.0.0.1', port=0, latency=0.0,
+                 jitter=0.0, error_rate=0.0, bandwidth=None, rate_limit=None,
+                 quiet=True):
+        super().__init__((host, port), StubRequestHandler)
+        self.dataset = dataset if dataset is not None else SyntheticDataset()
+        self.url = "http://{}:{}".format(*self.server_address[:2])
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.rate_limit = rate_limit
+        self.quiet = quiet
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._next_request_time = time.monotonic()
+        self._thread = None
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def throttle(self):
+        """Delay the current request to keep within the rate limit."""
+        if not self.rate_limit:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_request_time)
+            self._next_request_time = start + 1 / self.rate_limit
+        time.sleep(start - now)
+
+    def send_limited(self, wfile, body, chunk_size=16384):
+        """Write body, keeping within the bandwidth limit."""
+        if not self.bandwidth:
+            wfile.write(body)
+            return
+        for i in range(0, len(body), chunk_size):
+            chunk = body[i:i + chunk_size]
+            wfile.write(chunk)
+            time.sleep(len(chunk) / self.bandwidth)
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving requests and close the server."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stub Flood Monitoring API server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=8080)
+    parser.add_argument("--recorded", type=str, default=None,
+                        help="directory of recorded payloads to serve, "
+                             "instead of synthetic data")
+    parser.add_argument("--stations", type=int, default=4000,
+                        help="number of synthetic stations")
+    parser.add_argument("--warnings", type=int, default=100,
+                        help="number of synthetic warnings")
+    parser.add_argument("--distribution", type=str, default='uniform',
+                        choices=['uniform', 'clustered'],
+                        help="placement of synthetic stations and warnings")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="maximum random seconds added to responses")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        dest='error_rate',
+                        help="fraction of requests answered with an error")
+    parser.add_argument("--bandwidth", type=float, default=None,
+                        help="maximum bytes per second in each response")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        dest='rate_limit',
+                        help="maximum requests per second")
+    args = parser.parse_args()
+
+    if args.recorded is not None:
+        dataset = RecordedDataset(args.recorded)
+    else:
+        dataset = SyntheticDataset(n_stations=args.stations,
+                                   n_warnings=args.warnings,
+                                   distribution=args.distribution)
+
+    server = StubAPIServer(dataset, args.host, args.port, args.latency,
+                           args.jitter, args.error_rate, args.bandwidth,
+                           args.rate_limit, quiet=False)
+    print("Serving stub Flood Monitoring API on {}".format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,318 @@
+"""Synthetic data in the form returned by the Flood Monitoring API.
+
+SyntheticDataset generates stations, measures with their latest readings,
+reading histories, flood warnings and flood area polygons at any scale, for
+load testing without the API. The data follows the schema parsed by
+stationdata.build_station_list and warningdata.build_warning_list, and may
+be used through a datafetcher.StubDataSource (see SyntheticDataset.source)
+or served over HTTP by floodsystem.stubserver.
+"""
+
+import datetime
+import math
+import random
+from floodsystem.datafetcher import StubDataSource, DEFAULT_BASE_URL
+
+# approximate bounds of England, (min_lat, min_long, max_lat, max_long)
+ENGLAND_BOUNDS = (50.0, -5.7, 55.8, 1.8)
+
+_RIVERS = ["River Thames", "River Severn", "River Trent", "River Avon",
+           "River Great Ouse", "River Wye", "River Tees", "River Tyne",
+           "River Cam", "River Exe", "River Derwent", "River Mersey"]
+_TOWNS = ["Ashford", "Bedford", "Carlisle", "Derby", "Exeter", "Frome",
+          "Gloucester", "Hereford", "Ipswich", "Kendal", "Lincoln", "Maldon",
+          "Norwich", "Oxford", "Penrith", "Reading", "Stroud", "Taunton",
+          "Upton", "Warwick", "York"]
+_COUNTIES = ["Cambridgeshire", "Cumbria", "Devon", "Gloucestershire",
+             "Kent", "Norfolk", "Oxfordshire", "Somerset", "Yorkshire"]
+
+
+class SyntheticDataset:
+    """A reproducible synthetic set of stations, readings and warnings.
+
+    Parameters
+    ----------
+    n_stations : int, optional
+        number of stations. The default is 4000, similar to the API.
+    n_warnings : int, optional
+        number of flood warnings. The default is 100.
+    distribution : {'uniform', 'clustered'}, optional
+        how stations and warnings are placed within the bounds: uniformly,
+        or normally distributed around cluster centres. The default is
+        'uniform'.
+    clusters : int, optional
+        number of clusters for the clustered distribution. The default is
+        10.
+    cluster_spread : float, optional
+        standard deviation in degrees of locations around each cluster
+        centre. The default is 0.3.
+    polygon_vertices : int, optional
+        number of vertices of each warning polygon. The default is 100.
+    polygon_radius : (float, float), optional
+        range of the radius of the warning polygons, in degrees. The default
+        is (0.01, 0.08).
+    missing_fraction : float, optional
+        fraction of stations without a typical range, town or river, and of
+        measures without a latest reading, as in the API. The default is
+        0.05.
+    bounds : (min_lat, min_long, max_lat, max_long), optional
+        the area data is placed in. The default is ENGLAND_BOUNDS.
+    base_url : string, optional
+        base of all urls in the data. The default is the API's base url.
+    seed : int, optional
+        random seed. The default is 0.
+
+    """
+
+    def __init__(self, n_stations=4000, n_warnings=100,
+                 distribution='uniform', clusters=10, cluster_spread=0.3,
+                 polygon_vertices=100, polygon_radius=(0.01, 0.08),
+                 missing_fraction=0.05, bounds=ENGLAND_BOUNDS,
+                 base_url=DEFAULT_BASE_URL, seed=0):
+        if distribution not in ('uniform', 'clustered'):
+            raise ValueError("distribution must be 'uniform' or 'clustered'")
+        self.n_stations = n_stations
+        self.n_warnings = n_warnings
+        self.distribution = distribution
+        self.cluster_spread = cluster_spread
+        self.polygon_vertices = polygon_vertices
+        self.polygon_radius = polygon_radius
+        self.missing_fraction = missing_fraction
+        self.bounds = bounds
+        self.base_url = base_url.rstrip('/')
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self._centres = [self._uniform_location(rng) for _ in range(clusters)]
+
+        self._station_data = None
+        self._level_data = None
+        self._warning_data = None
+        self._areas = None
+        self._polygons = None
+
+    def _uniform_location(self, rng):
+        return (rng.uniform(self.bounds[0], self.bounds[2]),
+                rng.uniform(self.bounds[1], self.bounds[3]))
+
+    def _location(self, rng):
+        """Return a random (lat, long) following the distribution."""
+        if self.distribution == 'uniform':
+            return self._uniform_location(rng)
+        lat, long = rng.choice(self._centres)
+        lat = min(max(rng.gauss(lat, self.cluster_spread), self.bounds[0]),
+                  self.bounds[2])
+        long = min(max(rng.gauss(long, self.cluster_spread), self.bounds[1]),
+                   self.bounds[3])
+        return lat, long
+
+    def station_url(self, notation):
+        return "{}/id/stations/{}".format(self.base_url, notation)
+
+    def measure_url(self, notation):
+        return "{}/id/measures/{}-level-stage-i-15_min-m".format(
+            self.base_url, notation)
+
+    def flood_area_url(self, identifier):
+        return "{}/id/floodAreas/{}".format(self.base_url, identifier)
+
+    def polygon_url(self, identifier):
+        return self.flood_area_url(identifier) + "/polygon"
+
+    def station_data(self):
+        """Return station data, as from datafetcher.fetch_station_data."""
+        if self._station_data is not None:
+            return self._station_data
+
+        rng = random.Random(self.seed + 1)
+        items = []
+        for i in range(self.n_stations):
+            notation = "SYN{:06d}".format(i)
+            lat, long = self._location(rng)
+            e = {'@id': self.station_url(notation),
+                 'label': "Synthetic station {}".format(i),
+                 'notation': notation,
+                 'lat': round(lat, 6), 'long': round(long, 6),
+                 'measures': [{'@id': self.measure_url(notation),
+                               'parameter': 'level',
+                               'parameterName': 'Water Level',
+                               'period': 900, 'qualifier': 'Stage',
+                               'unitName': 'm'}]}
+            if rng.random() >= self.missing_fraction:
+                e['riverName'] = rng.choice(_RIVERS)
+            if rng.random() >= self.missing_fraction:
+                e['town'] = rng.choice(_TOWNS)
+            if rng.random() >= self.missing_fraction:
+                low = round(rng.uniform(0.0, 1.0), 3)
+                e['stageScale'] = {
+                    'typicalRangeLow': low,
+                    'typicalRangeHigh': round(low + rng.uniform(0.2, 3.0), 3)}
+            items.append(e)
+
+        self._station_data = {'items': items}
+        return self._station_data
+
+    def level_data(self):
+        """Return latest readings of all measures, as from
+        datafetcher.fetch_latest_water_level_data."""
+        if self._level_data is not None:
+            return self._level_data
+
+        rng = random.Random(self.seed + 2)
+        now = _now_string()
+        items = []
+        for e in self.station_data()['items']:
+            measure_id = e['measures'][-1]['@id']
+            measure = {'@id': measure_id, 'parameter': 'level',
+                       'qualifier': 'Stage'}
+            if rng.random() >= self.missing_fraction:
+                scale = e.get('stageScale', {'typicalRangeLow': 0.0,
+                                             'typicalRangeHigh': 1.0})
+                low = scale['typicalRangeLow']
+                high = scale['typicalRangeHigh']
+                value = low + (high - low) * rng.uniform(-0.2, 1.5)
+                measure['latestReading'] = {'measure': measure_id,
+                                            'dateTime': now,
+                                            'value': round(value, 3)}
+            items.append(measure)
+
+        self._level_data = {'items': items}
+        return self._level_data
+
+    def readings(self, measure_id, dt=datetime.timedelta(days=2),
+                 period=900):
+        """Return the readings of a measure over the past period dt, as
+        fetched by datafetcher.fetch_measure_levels.
+
+        Levels follow a daily cycle with noise, reproducibly for each
+        measure.
+        """
+        rng = random.Random("{}{}".format(self.seed, measure_id))
+        mean = rng.uniform(0.2, 2.0)
+        amplitude = rng.uniform(0.05, 0.5)
+        now = datetime.datetime.utcnow().replace(microsecond=0)
+        n = int(dt.total_seconds() // period)
+        items = []
+        # readings are sorted most recent first, as with _sorted in the API
+        for k in range(n):
+            t = now - datetime.timedelta(seconds=k * period)
+            phase = 2 * math.pi * t.timestamp() / 86400
+            value = mean + amplitude * math.sin(phase) + rng.gauss(0, 0.01)
+            items.append({'dateTime': t.isoformat() + 'Z',
+                          'measure': measure_id,
+                          'value': round(value, 3)})
+        return {'items': items}
+
+    def _build_warnings(self):
+        rng = random.Random(self.seed + 3)
+        stations = self.station_data()['items']
+        now = _now_string()
+        items = []
+        areas = {}
+        polygons = {}
+        for i in range(self.n_warnings):
+            identifier = "SYNW{:05d}".format(i)
+            # centre warnings near stations, so some stations are within them
+            if stations:
+                e = rng.choice(stations)
+                lat = e['lat'] + rng.uniform(-0.01, 0.01)
+                long = e['long'] + rng.uniform(-0.01, 0.01)
+            else:
+                lat, long = self._location(rng)
+            county = rng.choice(_COUNTIES)
+            severity = rng.choice([1, 2, 2, 3, 3, 3, 4, 4, 4, 4])
+            items.append({
+                '@id': "{}/id/floods/{}".format(self.base_url, identifier),
+                'description': "Synthetic flood area {}".format(i),
+                'eaAreaName': "Synthetic", 'floodAreaID': identifier,
+                'isTidal': rng.random() < 0.1,
+                'message': "Flooding is possible in synthetic area "
+                           "{}.".format(i),
+                'severity': ["Severe Flood Warning", "Flood Warning",
+                             "Flood Alert", "Warning no Longer in Force"][
+                                 severity - 1],
+                'severityLevel': severity,
+                'timeMessageChanged': now, 'timeRaised': now,
+                'timeSeverityChanged': now,
+                'floodArea': {'@id': self.flood_area_url(identifier),
+                              'county': county,
+                              'notation': identifier,
+                              'polygon': self.polygon_url(identifier),
+                              'riverOrSea': rng.choice(_RIVERS)}})
+            areas[identifier] = {'items': {
+                '@id': self.flood_area_url(identifier),
+                'county': county,
+                'currentWarning': {'@id': items[-1]['@id'],
+                                   'floodAreaID': identifier},
+                'description': "Synthetic flood area {}".format(i),
+                'label': "Synthetic area {}".format(i),
+                'lat': round(lat, 6), 'long': round(long, 6),
+                'notation': identifier,
+                'polygon': self.polygon_url(identifier)}}
+            radius = rng.uniform(*self.polygon_radius)
+            polygons[identifier] = {
+                'type': 'FeatureCollection',
+                'features': [{'type': 'Feature',
+                              'properties': {'FWS_TACODE': identifier,
+                                             'AREA': 'Synthetic',
+                                             'DESCRIP': 'Synthetic area',
+                                             'COUNTY': county},
+                              'geometry': {
+                                  'type': 'Polygon',
+                                  'coordinates': _star_polygon(
+                                      rng, (lat, long), radius,
+                                      self.polygon_vertices)}}]}
+
+        self._warning_data = {'items': items}
+        self._areas = areas
+        self._polygons = polygons
+
+    def warning_data(self):
+        """Return all flood warnings, as from
+        datafetcher.fetch_flood_warnings."""
+        if self._warning_data is None:
+            self._build_warnings()
+        return self._warning_data
+
+    def flood_area(self, identifier):
+        """Return the flood area data of a warning, as from
+        datafetcher.fetch_warning_area."""
+        if self._areas is None:
+            self._build_warnings()
+        return self._areas[identifier]
+
+    def polygon(self, identifier):
+        """Return the polygon FeatureCollection of a flood area."""
+        if self._polygons is None:
+            self._build_warnings()
+        return self._polygons[identifier]
+
+    def source(self):
+        """Return a datafetcher.StubDataSource serving this data."""
+        warning_data = self.warning_data()
+        identifiers = [w['floodAreaID'] for w in warning_data['items']]
+        return StubDataSource(
+            station_data=self.station_data(), level_data=self.level_data(),
+            warning_data=warning_data,
+            areas={self.flood_area_url(i): self.flood_area(i)
+                   for i in identifiers},
+            regions={self.polygon_url(i): self.polygon(i)['features']
+                     for i in identifiers})
+
+
+def _now_string():
+    return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + 'Z'
+
+
+def _star_polygon(rng, centre, radius, vertices):
+    """Return geoJSON coordinates of a random star-shaped polygon."""
+    lat, long = centre
+    ring = []
+    for k in range(vertices):
+        angle = 2 * math.pi * k / vertices
+        r = radius * rng.uniform(0.6, 1.0)
+        ring.append([round(long + r * math.cos(angle)
+                           / math.cos(math.radians(lat)), 6),
+                     round(lat + r * math.sin(angle), 6)])
+    ring.append(ring[0])
+    return [ring]
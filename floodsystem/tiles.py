@@ -0,0 +1,217 @@
+"""Export warning regions and stations as zoom-level-aware geoJSON tiles.
+
+Tiles follow the XYZ (slippy map) scheme used by web map clients, so a
+client loads only the tiles in view at its current zoom level. The warning
+geometry in each tile is simplified to the size of a pixel at that zoom,
+clipped to the tile and has its coordinates rounded to the matching number
+of decimal places.
+"""
+
+import json
+import math
+import os
+from floodsystem.utils import round_coordinates, lazy_import
+
+shapely = lazy_import('shapely')
+
+
+def tile_bounds(z, x, y):
+    """Return the bounds of a tile in degrees.
+
+    Parameters
+    ----------
+    z, x, y : int
+        the zoom level and the column and row of the tile.
+
+    Returns
+    -------
+    (min_long, min_lat, max_long, max_lat)
+        bounds of the tile.
+
+    """
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return (x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0,
+            lat(y))
+
+
+def tile_containing(coord, z):
+    """Return the column and row of the tile containing a coordinate.
+
+    Parameters
+    ----------
+    coord : (lat, long)
+        the coordinate.
+    z : int
+        the zoom level.
+
+    Returns
+    -------
+    (x, y) : (int, int)
+        the column and row of the tile.
+
+    """
+    n = 2 ** z
+    lat = math.radians(coord[0])
+    x = int((coord[1] + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bounds(bounds, z):
+    """Return the tiles at zoom level z which overlap the given bounds.
+
+    Parameters
+    ----------
+    bounds : (min_long, min_lat, max_long, max_lat)
+    z : int
+        the zoom level.
+
+    Returns
+    -------
+    list[(int, int)]
+        the column and row of each tile.
+
+    """
+    min_x, max_y = tile_containing((bounds[1], bounds[0]), z)
+    max_x, min_y = tile_containing((bounds[3], bounds[2]), z)
+    return [(x, y) for x in range(min_x, max_x + 1)
+            for y in range(min_y, max_y + 1)]
+
+
+def zoom_tolerance(z, tile_size=256):
+    """Return the width of a pixel at zoom level z, in degrees of longitude."""
+    return 360.0 / (tile_size * 2 ** z)
+
+
+def zoom_precision(z, tile_size=256):
+    """Return the decimal places needed to resolve a pixel at zoom level z."""
+    return max(0, math.ceil(-math.log10(zoom_tolerance(z, tile_size))))
+
+
+def build_tiles(warnings, station_df=None, min_zoom=5, max_zoom=10,
+                tile_size=256):
+    """Split warning regions and stations into tiles for each zoom level.
+
+    Parameters
+    ----------
+    warnings : list[FloodWarning]
+        list of flood warnings, created using
+        warningdata.build_warning_list. Warnings without a region are
+        skipped.
+    station_df : pandas.DataFrame, optional
+        station data created using stationdata.build_station_dataframe.
+        Defaults to None, where no stations are included.
+    min_zoom, max_zoom : int, optional
+        the range of zoom levels for which tiles are built. The defaults are
+        5 and 10.
+    tile_size : int, optional
+        the width of a tile in pixels, which sets the simplification
+        tolerance and coordinate precision. The default is 256.
+
+    Returns
+    -------
+    tiles : dict{(int, int, int) : dict}
+        geoJSON FeatureCollections keyed by (z, x, y). Each feature has a
+        'layer' property of either 'warnings' or 'stations'.
+
+    """
+    tiles = {}
+
+    def add_feature(key, feature):
+        if key not in tiles:
+            tiles[key] = {'type': 'FeatureCollection', 'features': []}
+        tiles[key]['features'].append(feature)
+
+    for z in range(min_zoom, max_zoom + 1):
+        tol = zoom_tolerance(z, tile_size)
+        precision = zoom_precision(z, tile_size)
+
+        for w in warnings:
+            if w.region is None:
+                continue
+            properties = {'layer': 'warnings', 'FWS_TACODE': w.id,
+                          'severity': w.severity.name,
+                          'int_severity': w.severity.value,
+                          'label': w.label}
+            for r in w.region:
+                simplified = r.simplify(tol, preserve_topology=True)
+                if simplified.is_empty:
+                    continue
+                for x, y in tiles_in_bounds(simplified.bounds, z):
+                    # clip with a margin of a pixel to avoid seams between
+                    # neighbouring tiles
+                    clip = shapely.box(*tile_bounds(z, x, y)).buffer(tol)
+                    clipped = simplified.intersection(clip)
+                    if clipped.is_empty:
+                        continue
+                    geometry = shapely.geometry.mapping(clipped)
+                    add_feature((z, x, y), {
+                        'type': 'Feature',
+                        'properties': properties,
+                        'geometry': {'type': geometry['type'],
+                                     'coordinates': round_coordinates(
+                                         geometry['coordinates'],
+                                         precision)}})
+
+        if station_df is None:
+            continue
+        for row in station_df.itertuples(index=False):
+            if math.isnan(row.lat) or math.isnan(row.lon):
+                continue
+            x, y = tile_containing((row.lat, row.lon), z)
+            level = None if math.isnan(row.level) else row.level
+            add_feature((z, x, y), {
+                'type': 'Feature',
+                'properties': {'layer': 'stations', 'name': row.name,
+                               'level': level, 'rel_level': row.rel_level,
+                               'town': row.town},
+                'geometry': {'type': 'Point',
+                             'coordinates': [round(row.lon, precision),
+                                             round(row.lat, precision)]}})
+
+    return tiles
+
+
+def export_tiles(tiles, directory):
+    """Write tiles to a directory as {z}/{x}/{y}.geojson files.
+
+    A tiles.json file listing the zoom range and the tiles written is saved
+    alongside, so clients know which tiles exist.
+
+    Parameters
+    ----------
+    tiles : dict{(int, int, int) : dict}
+        tiles created using build_tiles.
+    directory : string
+        the output directory, created if it does not exist.
+
+    Returns
+    -------
+    None.
+
+    """
+    for (z, x, y), collection in tiles.items():
+        tile_dir = os.path.join(directory, str(z), str(x))
+        try:
+            os.makedirs(tile_dir)
+        except FileExistsError:
+            pass
+        with open(os.path.join(tile_dir, "{}.geojson".format(y)), 'w') as f:
+            json.dump(collection, f, separators=(',', ':'))
+
+    zooms = [key[0] for key in tiles]
+    metadata = {'format': 'geojson',
+                'scheme': 'xyz',
+                'minzoom': min(zooms) if zooms else None,
+                'maxzoom': max(zooms) if zooms else None,
+                'tiles': sorted(list(key) for key in tiles)}
+    try:
+        os.makedirs(directory)
+    except FileExistsError:
+        pass
+    with open(os.path.join(directory, 'tiles.json'), 'w') as f:
+        json.dump(metadata, f)
@@ -3,6 +3,12 @@
 # SPDX-License-Identifier: MIT
 """Utility functions."""
 
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
 
 def sorted_by_key(x, i, reverse=False):
     """For a list of lists, return list sorted by the ith component of list.
@@ -63,3 +69,87 @@ def map(x, in_range, out_range):
     """
     return ((x - in_range[0]) / (in_range[1] - in_range[0])) * \
         (out_range[1] - out_range[0]) + out_range[0]
+
+
+def round_coordinates(coords, ndigits):
+    """Round every number in nested geoJSON coordinates.
+
+    Parameters
+    ----------
+    coords : list/tuple
+        geoJSON coordinates, e.g. the 'coordinates' member of a geometry.
+    ndigits : int
+        number of decimal places to round to.
+
+    Returns
+    -------
+    list
+        the coordinates, rounded, with tuples converted to lists.
+
+    """
+    if isinstance(coords, (list, tuple)):
+        return [round_coordinates(c, ndigits) for c in coords]
+    return round(coords, ndigits)
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module, which imports it at the first access of one of
+    its attributes. Safe to use from several threads at once."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_lock'] = threading.Lock()
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        with self._lazy_lock:
+            module = self._lazy_module
+            if module is None:
+                module = importlib.import_module(self.__name__)
+                # later accesses find the attributes without __getattr__
+                self.__dict__.update(module.__dict__)
+                self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        # only called for attributes not yet copied from the module, e.g.
+        # before it is loaded or submodules imported later
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name):
+    """Import a module lazily, at the first access of one of its attributes.
+
+    Heavy dependencies such as pandas, shapely and plotly are imported with
+    lazy_import, so programs only pay for importing the dependencies they
+    use. Names must be accessed through the module, e.g. pd.DataFrame, as
+    'from module import name' would load the module immediately.
+
+    The module is imported by importlib.import_module under a lock, so the
+    first access may come from several threads together, e.g. the worker
+    threads of floodsystem.pipeline.
+
+    Parameters
+    ----------
+    name : string
+        the name of the module, e.g. 'pandas' or 'plotly.graph_objects'. The
+        parent packages of a submodule are imported immediately.
+
+    Returns
+    -------
+    module
+        a stand-in for the module, which imports it at first use. If the
+        module has already been imported, it is returned as is.
+
+    Raises
+    ------
+    ModuleNotFoundError
+        if the module is not installed.
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError("No module named '{}'".format(name),
+                                  name=name)
+    return _LazyModule(name)
@@ -1,12 +1,46 @@
 """Store and process flood warning data from Flood Monitoring API."""
 
+import threading
 from enum import Enum
-from shapely.geometry import Point, shape, mapping
-from floodsystem.utils import sorted_by_key
+from floodsystem import geometrystore, instrument
+from floodsystem.utils import sorted_by_key, lazy_import
+
+np = lazy_import('numpy')
+shapely = lazy_import('shapely')
+
+
+def _geometry_attribute(name):
+    """Return a property for a geometry attribute of FloodWarning, which
+    loads the geometry of the warning when first read."""
+    attr = '_' + name
+
+    def getter(self):
+        if self._geometry_loader is not None:
+            self.load_geometry()
+        return getattr(self, attr)
+
+    def setter(self, value):
+        # an explicitly set geometry replaces any geometry still to be loaded
+        with FloodWarning._geometry_lock:
+            self._geometry_loader = None
+            setattr(self, attr, value)
+
+    return property(getter, setter)
 
 
 class FloodWarning:
-    """A flood warning data class, obtained from the Flood Monitoring API."""
+    """A flood warning data class, obtained from the Flood Monitoring API.
+
+    The polygons of the warning are held in a RegionGeometry shared with
+    every other warning with the same polygons, see geometrystore. The
+    geometry attributes, geometry, region, geojson, simplified_geojson and
+    is_poly_simplified, may be loaded lazily: see set_geometry_loader.
+    """
+
+    is_poly_simplified = _geometry_attribute('is_poly_simplified')
+
+    # held only while a loaded geometry is published, see load_geometry
+    _geometry_lock = threading.Lock()
 
     def __init__(self,
                  identifier=None,
@@ -32,9 +66,12 @@ class FloodWarning:
         self.county = county
         self.towns = []
 
-        self.region = region
+        self._geometry_loader = None
+        self._geometry = None
+        self._region = None
         self.geojson = geojson
-        self.simplified_geojson = geojson
+        if region is not None:
+            self.region = region
         self.is_poly_simplified = {'tol': 0.000, 'buf': 0.000}
 
         self.tidal = tidal
@@ -51,6 +88,107 @@ class FloodWarning:
         d += "Message : " + self.message if self.message is not None else "Not Available" + "\n"
         return d
 
+    @property
+    def geometry(self):
+        """The RegionGeometry of the warning, or None if it has no region."""
+        if self._geometry_loader is not None:
+            self.load_geometry()
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry):
+        # an explicitly set geometry replaces any geometry still to be loaded
+        with FloodWarning._geometry_lock:
+            self._geometry_loader = None
+            self._geometry = geometry
+            self._region = None
+
+    @property
+    def geojson(self):
+        """The geoJSON features of the region, shared with other warnings
+        with the same region, so must not be modified."""
+        geometry = self.geometry
+        return geometry.geojson if geometry is not None else None
+
+    @geojson.setter
+    def geojson(self, geojson):
+        self.geometry = geometrystore.store.intern(geojson) \
+            if geojson is not None else None
+
+    @property
+    def region(self):
+        """The shapely geometry of each feature of the region."""
+        if self._region is not None:
+            return self._region
+        geometry = self.geometry
+        return geometry.region if geometry is not None else None
+
+    @region.setter
+    def region(self, region):
+        # a region set explicitly is used in place of that of the geoJSON
+        self._region = region
+
+    @property
+    def simplified_geojson(self):
+        """The geoJSON features simplified as given by is_poly_simplified,
+        see simplify_geojson."""
+        geometry = self.geometry
+        if geometry is None:
+            return None
+        params = self.is_poly_simplified
+        return geometry.simplified(params['tol'], params['buf'])
+
+    def set_geometry_loader(self, loader):
+        """Load the geometry of the warning when it is first read.
+
+        Parameters
+        ----------
+        loader : function
+            called with no arguments when any of geometry, region, geojson,
+            simplified_geojson or is_poly_simplified is first read, e.g. to
+            read them from the warning cache or the API. Returns
+            (RegionGeometry, is_poly_simplified), or None if the warning has
+            no geometry. Assigning geometry, geojson or is_poly_simplified
+            first cancels the loading.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._geometry_loader = loader
+
+    @property
+    def geometry_loader(self):
+        """The function which will load the geometry, or None if there is
+        nothing to load."""
+        return self._geometry_loader
+
+    @property
+    def geometry_loaded(self):
+        """True unless the geometry of the warning is still to be loaded."""
+        return self._geometry_loader is None
+
+    def load_geometry(self):
+        """Load the geometry of the warning now, if it is still to be loaded.
+
+        The loader is called without holding a lock, so warnings may be
+        loaded concurrently, e.g. while fetching their regions. If two
+        threads load the same warning, the first result is kept, and a
+        geometry assigned meanwhile is kept instead of either.
+        """
+        loader = self._geometry_loader
+        if loader is None:
+            return
+        geometry = loader()
+        with FloodWarning._geometry_lock:
+            # publish the result unless the loader was already used or
+            # replaced while it ran
+            if self._geometry_loader is loader:
+                if geometry is not None:
+                    self._geometry, self._is_poly_simplified = geometry
+                self._geometry_loader = None
+
     def coord_in_region(self, coord):
         """Determine if a coordinate is within the region of the flood warning.
 
@@ -66,7 +204,7 @@ class FloodWarning:
             the region or the region is None.
 
         """
-        point = Point(coord[1], coord[0])
+        point = shapely.Point(coord[1], coord[0])
         if self.region is not None:
             # return true if any one region contains the point
             for r in self.region:
@@ -75,6 +213,33 @@ class FloodWarning:
             return False
         return False
 
+    def coords_in_region(self, coords):
+        """Determine which of many coordinates are within the region.
+
+        The coordinates are tested together by shapely, against the prepared
+        region, rather than one Point at a time.
+
+        Parameters
+        ----------
+        coords : array_like
+            (lat, long) coordinates, of shape (N, 2).
+
+        Returns
+        -------
+        np.ndarray
+            boolean array of shape (N,), True where the coordinate is in the
+            region. All False if the region is None.
+
+        """
+        coords = coord_array(coords)
+        inside = np.zeros(len(coords), dtype=bool)
+        if self.region is not None:
+            for r in self.region:
+                shapely.prepare(r)
+                inside |= shapely.contains_xy(r, coords[:, 1], coords[:, 0])
+        return inside
+
+    @instrument.timed('stations_in_warning')
     def stations_in_warning(self, stations):
         """Produce a list of stations which are within the warning.
 
@@ -94,11 +259,9 @@ class FloodWarning:
             warning region.
 
         """
-        warning_stations = []
-        for station in stations:
-            if station.coord is not None:
-                if self.coord_in_region(station.coord):
-                    warning_stations.append(station)
+        located = [s for s in stations if s.coord is not None]
+        inside = self.coords_in_region([s.coord for s in located])
+        warning_stations = [s for s, i in zip(located, inside) if i]
 
         return warning_stations
 
@@ -122,8 +285,13 @@ class FloodWarning:
 
         return self.towns
 
+    @instrument.timed('simplify_geojson')
     def simplify_geojson(self, tol=0.001, buf=0.002):
-        """Simplify polygon geometry for better plotting, update self.simplified_geojson.
+        """Simplify polygon geometry for better plotting.
+
+        The simplified geoJSON is computed once for each set of parameters
+        and shared by every warning with the same region. The geoJSON of the
+        warning is not changed.
 
         Parameters
         ----------
@@ -139,9 +307,11 @@ class FloodWarning:
         None.
 
         """
-        for i, r in enumerate(self.region):
-            simplified_poly = r.simplify(tol, preserve_topology=False).buffer(buf)
-            self.simplified_geojson[i]['geometry'] = mapping(simplified_poly)
+        geometry = self.geometry
+        if geometry is None:
+            return
+        geometry.simplified(tol, buf)
+        self.is_poly_simplified = {'tol': tol, 'buf': buf}
 
     @staticmethod
     def geo_json_to_shape(geo_json_obj):
@@ -160,7 +330,7 @@ class FloodWarning:
             points at self intersections.
 
         """
-        return shape(geo_json_obj).buffer(0)
+        return geometrystore.geo_json_to_shape(geo_json_obj)
 
     @staticmethod
     def order_warning_list_with_severity(warnings):
@@ -184,6 +354,7 @@ class FloodWarning:
         return warnings_sorted
 
     @staticmethod
+    @instrument.timed('check_warnings_at_location')
     def check_warnings_at_location(warnings, loc):
         """Check for any flood warnings concerning a specified location.
 
@@ -206,6 +377,35 @@ class FloodWarning:
 
         return warnings_at_loc
 
+    @staticmethod
+    def warning_masks(warnings, coords):
+        """Determine which of many coordinates are within each warning.
+
+        Parameters
+        ----------
+        warnings : list[FloodWarning]
+            List of warnings generated from warningdata.build_warning_list().
+        coords : array_like
+            (lat, long) coordinates, of shape (N, 2).
+
+        Returns
+        -------
+        np.ndarray
+            boolean array of shape (len(warnings), N), where row i is
+            warnings[i].coords_in_region(coords).
+
+        """
+        coords = coord_array(coords)
+        masks = np.zeros((len(warnings), len(coords)), dtype=bool)
+        for i, warning in enumerate(warnings):
+            masks[i] = warning.coords_in_region(coords)
+        return masks
+
+
+def coord_array(coords):
+    """Return (lat, long) coordinates as a float array of shape (N, 2)."""
+    return np.asarray(coords, dtype=float).reshape(-1, 2)
+
 
 class SeverityLevel(Enum):
     """Enum to map severity levels to descriptive severities."""
@@ -0,0 +1,335 @@
+"""Binary cache of flood warning regions and flood area data.
+
+The cache replaces the pickle files previously used for warning polygons,
+which were slow to load, tied to the version of shapely that wrote them and
+unsafe to load from an untrusted source. A cache file holds
+
+    magic       4 bytes, b'FWRC'
+    version     unsigned 32 bit integer, little endian
+    length      unsigned 64 bit integer, little endian, of the metadata
+    metadata    UTF-8 JSON
+    geometry    WKB of every geometry, concatenated
+
+The metadata holds the flood area data of each warning, and the content
+hash of its region and its is_poly_simplified, see warning.FloodWarning.
+Each distinct region is held once, keyed by its content hash, see
+geometrystore: for each feature the properties and the offset and length of
+its geometries within the geometry section, and the same for each simplified
+version of the region. Opening a cache reads only the metadata; the geometry
+section is memory mapped and the geometries of a region are decoded when
+they are first requested.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import weakref
+from floodsystem import geometrystore
+from floodsystem.utils import lazy_import
+
+shapely = lazy_import('shapely')
+
+MAGIC = b'FWRC'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('<4sIQ')
+
+# every WarningCache not yet closed, so that write_cache can release their
+# memory maps before replacing the file
+_open_caches = weakref.WeakSet()
+_open_caches_lock = threading.Lock()
+
+
+class WarningCache:
+    """Read-only view of a warning cache file.
+
+    Parameters
+    ----------
+    filename : string
+        path of the cache file.
+
+    Attributes
+    ----------
+    areas : dict{string : dict}
+        flood area data of each warning id, as from
+        datafetcher.fetch_warning_area.
+    regions : RegionMapping
+        the regions of each warning id, decoded on access.
+
+    Raises
+    ------
+    ValueError
+        if the file is not a cache file of the supported version.
+
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        with open(filename, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError("{} is not a warning cache".format(filename))
+            magic, version, meta_len = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError("{} is not a warning cache".format(filename))
+            if version != FORMAT_VERSION:
+                raise ValueError("{} has cache version {}, not {}".format(
+                    filename, version, FORMAT_VERSION))
+            meta = json.loads(f.read(meta_len).decode('utf-8'))
+            self._offset = _HEADER.size + meta_len
+            size = os.fstat(f.fileno()).st_size
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if size > self._offset else b''
+        self.areas = meta['areas']
+        self.regions = RegionMapping(self, meta['regions'],
+                                     meta['geometries'])
+        if isinstance(self._data, mmap.mmap):
+            with _open_caches_lock:
+                _open_caches.add(self)
+
+    def blob(self, location):
+        """Return the bytes at an [offset, length] in the geometry section."""
+        start = self._offset + location[0]
+        with self._lock:
+            return bytes(self._data[start:start + location[1]])
+
+    def detach(self):
+        """Copy the geometry section into memory and release the memory map,
+        so the file can be replaced while the cache is still in use, e.g. by
+        the geometry loaders of warnings."""
+        with self._lock:
+            if isinstance(self._data, mmap.mmap):
+                data = self._data
+                self._data = data[:]
+                data.close()
+        with _open_caches_lock:
+            _open_caches.discard(self)
+
+    def close(self):
+        """Release the memory map of the file. Regions not yet decoded can
+        no longer be read."""
+        with self._lock:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+        with _open_caches_lock:
+            _open_caches.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RegionMapping:
+    """Mapping of warning ids to cached region data.
+
+    Each value is (RegionGeometry, is_poly_simplified), as set on a
+    FloodWarning by warningdata.apply_cached_poly. A region is decoded from
+    the cache when first requested, unless it is already held by
+    geometrystore.store, and is then shared by every warning with that
+    region.
+    """
+
+    def __init__(self, cache, entries, geometries):
+        self._cache = cache
+        self._entries = entries
+        self._geometries = geometries
+        self._decoded = {}
+
+    def __contains__(self, identifier):
+        return identifier in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, identifier):
+        entry = self._entries[identifier]
+        return self.geometry(entry['geometry']), entry['is_poly_simplified']
+
+    def get(self, identifier, default=None):
+        if identifier not in self._entries:
+            return default
+        return self[identifier]
+
+    def geometry(self, key):
+        """Return the RegionGeometry with a content hash."""
+        geometry = self._decoded.get(key)
+        if geometry is None:
+            geometry = geometrystore.store.get(key)
+            if geometry is None:
+                geometry = self._decode(key, self._geometries[key])
+            self._decoded[key] = geometry
+        return geometry
+
+    def raw(self, identifier):
+        """Return the metadata of an entry."""
+        return self._entries[identifier]
+
+    def raw_geometry(self, key):
+        """Return the metadata of a region and the WKB of its geometries,
+        without decoding them."""
+        entry = self._geometries[key]
+        features = [{k: self._cache.blob(f[k]) for k in ('geometry', 'region')}
+                    for f in entry['features']]
+        simplified = [[self._cache.blob(g) for g in s['geometries']]
+                      for s in entry['simplified']]
+        return entry, features, simplified
+
+    def _decode(self, key, entry):
+        geojson, region = [], []
+        for f in entry['features']:
+            geojson.append(
+                {'type': 'Feature', 'properties': f['properties'],
+                 'geometry': _mapping(self._cache.blob(f['geometry']))})
+            region.append(shapely.from_wkb(self._cache.blob(f['region'])))
+        geometry = geometrystore.store.intern(geojson, region, key=key)
+        for s in entry['simplified']:
+            geometry.add_simplified(s['tol'], s['buf'], [
+                {'type': 'Feature', 'properties': f['properties'],
+                 'geometry': _mapping(self._cache.blob(g))}
+                for f, g in zip(entry['features'], s['geometries'])])
+        return geometry
+
+
+def _mapping(wkb):
+    return shapely.geometry.mapping(shapely.from_wkb(wkb))
+
+
+def read_cache(filename):
+    """Open a warning cache file.
+
+    Parameters
+    ----------
+    filename : string
+        path of the cache file.
+
+    Returns
+    -------
+    WarningCache or None
+        the cache, or None if the file does not exist or is not a cache of
+        the supported version, in which case it should be rebuilt.
+
+    """
+    try:
+        return WarningCache(filename)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print("Ignoring warning cache: {}".format(e))
+        return None
+
+
+def write_cache(filename, warnings, previous=None):
+    """Write the regions and areas of warnings to a cache file.
+
+    The file is written to a temporary file and moved into place, so that
+    readers never see a partly written cache. Caches of the file still open,
+    e.g. from warningdata.load_poly_area_caches, are detached first, so
+    they remain usable and the file can be replaced on Windows.
+
+    Parameters
+    ----------
+    filename : string
+        path of the cache file.
+    warnings : list[FloodWarning]
+        warnings whose region and area data is cached. Warnings with neither
+        are skipped, as are the regions of warnings whose geometry has not
+        been loaded, see FloodWarning.set_geometry_loader.
+    previous : WarningCache, optional
+        entries of this cache not replaced by those of warnings are copied to
+        the new cache without being decoded. It is closed before the new cache
+        replaces it.
+
+    Returns
+    -------
+    None.
+
+    """
+    regions = {}
+    geometries = {}
+    areas = {}
+    chunks = []
+    size = 0
+
+    def append(blob):
+        nonlocal size
+        chunks.append(blob)
+        size += len(blob)
+        return [size - len(blob), len(blob)]
+
+    for warning in warnings:
+        if warning.area_json is not None and warning.id not in areas:
+            areas[warning.id] = warning.area_json
+        if not warning.geometry_loaded or warning.geometry is None \
+                or warning.id in regions:
+            continue
+        geometry = warning.geometry
+        regions[warning.id] = {'geometry': geometry.key,
+                               'is_poly_simplified':
+                                   warning.is_poly_simplified}
+        if geometry.key in geometries:
+            continue
+        features = []
+        for feature, region in zip(geometry.geojson, geometry.region):
+            features.append({'properties': feature.get('properties'),
+                             'geometry': append(_to_wkb(feature['geometry'])),
+                             'region': append(shapely.to_wkb(region))})
+        simplified = []
+        for (tol, buf), versions in geometry.simplified_versions().items():
+            simplified.append({'tol': tol, 'buf': buf, 'geometries': [
+                append(_to_wkb(f['geometry'])) for f in versions]})
+        geometries[geometry.key] = {'features': features,
+                                    'simplified': simplified}
+
+    if previous is not None:
+        for identifier, area in previous.areas.items():
+            areas.setdefault(identifier, area)
+        for identifier in previous.regions:
+            if identifier in regions:
+                continue
+            entry = previous.regions.raw(identifier)
+            regions[identifier] = entry
+            key = entry['geometry']
+            if key in geometries:
+                continue
+            entry, features, simplified = previous.regions.raw_geometry(key)
+            geometries[key] = {
+                'features': [dict(f, **{k: append(v) for k, v in b.items()})
+                             for f, b in zip(entry['features'], features)],
+                'simplified': [dict(s, geometries=[append(g) for g in blobs])
+                               for s, blobs in zip(entry['simplified'],
+                                                   simplified)]}
+        previous.close()
+
+    meta = json.dumps({'regions': regions, 'geometries': geometries,
+                       'areas': areas},
+                      separators=(',', ':')).encode('utf-8')
+    tmp_file = filename + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)))
+        f.write(meta)
+        for chunk in chunks:
+            f.write(chunk)
+    # a file cannot be replaced while it is memory mapped on Windows
+    detach_caches(filename)
+    os.replace(tmp_file, filename)
+
+
+def detach_caches(filename):
+    """Detach every open WarningCache of a file, see WarningCache.detach."""
+    path = os.path.abspath(filename)
+    with _open_caches_lock:
+        caches = [c for c in _open_caches
+                  if os.path.abspath(c.filename) == path]
+    for cache in caches:
+        cache.detach()
+
+
+def _to_wkb(geometry):
+    return shapely.to_wkb(shapely.geometry.shape(geometry))
@@ -3,13 +3,21 @@
 import json
 import pickle
 import os
-import pandas as pd
-from progressbar import ProgressBar
-from floodsystem import datafetcher
+from collections import namedtuple
+from floodsystem import datafetcher, geometrystore, instrument, warningcache
+from floodsystem.utils import round_coordinates, lazy_import
 from floodsystem.warning import FloodWarning, SeverityLevel
 
+pd = lazy_import('pandas')
+progressbar = lazy_import('progressbar')
 
-def build_warning_list(severity, use_pickle_caches=True, progress_bar=False):
+# name of the warning region and area cache file, in the cache directory
+WARNING_CACHE = 'warning_regions.cache'
+
+
+@instrument.timed('build_warning_list')
+def build_warning_list(severity, use_pickle_caches=True, progress_bar=False,
+                       source=datafetcher, lazy_geometry=False):
     """Fetch warnings from the API and create a list of warnings.
 
     Also updates caches for flood regions for any new warnings.
@@ -26,6 +34,15 @@ def build_warning_list(severity, use_pickle_caches=True, progress_bar=False):
     progress_bar : bool, optional
         If supplied, creates a bar in the terminal and updates as the warning
         list is built. The defualt is False
+    source : optional
+        Provides the fetch functions of floodsystem.datafetcher, from which
+        data is obtained. The default is the datafetcher module itself.
+    lazy_geometry : bool, optional
+        If True, the region and geoJSON of each warning are only read from
+        the cache, or fetched, when first used, see
+        FloodWarning.set_geometry_loader. Workflows which only use the
+        warning messages then take the same time whatever the size of the
+        regions. The default is False.
 
     Returns
     -------
@@ -34,82 +51,21 @@ def build_warning_list(severity, use_pickle_caches=True, progress_bar=False):
         severity.
 
     """
-    data = datafetcher.fetch_flood_warnings(severity)
+    data = source.fetch_flood_warnings(severity)
 
     if use_pickle_caches:
-        polys = retrieve_pickle_cache('warning_polys.pk')
-        areas = retrieve_pickle_cache('warning_areas.pk')
+        polys, areas = load_poly_area_caches()
+    else:
+        polys, areas = {}, {}
 
     warnings = []
 
     if progress_bar:
-        bar = ProgressBar(max_value=len(data['items'])).start()
+        bar = progressbar.ProgressBar(max_value=len(data['items'])).start()
 
     for progress_count, w in enumerate(data['items']):
-        warning = FloodWarning()
-
-        if 'floodAreaID' in w:
-            warning.id = w['floodAreaID']
-        if 'county' in w['floodArea']:
-            warning.county = w['floodArea']['county']
-
-        if 'timeMessageChanged' in w:
-            warning.last_update = w['timeMessageChanged']
-
-        # attempts to set the area based on a cached value, if not,
-        # pulls from the api
-        if use_pickle_caches:
-            # finds the first area in the cache which matches the warnings id,
-            # otherwise area is set to None
-            area = next((a for a in areas if
-                         (a['items']['currentWarning']['floodAreaID']
-                          == warning.id)), None)
-            if area is not None:
-                warning.label = area['items']['label']
-                warning.description = area['items']['description']
-                warning.coord = (area['items']['lat'], area['items']['long'])
-
-        if not warning.label or not warning.description:
-            if '@id' in w['floodArea']:
-                flood_area = datafetcher.fetch_warning_area(w['floodArea']['@id'])
-
-                warning.label = flood_area['items']['label']
-                warning.description = flood_area['items']['description']
-                warning.area_json = flood_area
-
-        # attempts to set the poly based on a cached value, if not,
-        # pulls from the api
-        if use_pickle_caches:
-            # finds the first poly in the cache which matches the warnings id,
-            # otherwise poly is set to None
-            poly = next((p for p in polys if
-                         (p[0][0]['properties']['FWS_TACODE'] == warning.id)),
-                        None)
-            if poly is not None:
-                warning.region = poly[1]
-                warning.geojson = poly[0]
-                warning.is_poly_simplified = poly[2]
-                warning.simplified_geojson = poly[3]
-
-        if not warning.region or not warning.geojson:
-            if 'polygon' in w['floodArea']:
-                poly = datafetcher.fetch_warning_region(w['floodArea']['polygon'])
-                if poly is not None:
-                    warning.region = [FloodWarning.geo_json_to_shape(p['geometry'])
-                                      for p in poly]
-                    warning.geojson = poly
-                    warning.is_poly_simplified = {'tol': 0.000, 'buf': 0.000}
-                    warning.simplified_geojson = poly
-
-        if 'severityLevel' in w:
-            warning.severity_lev = w['severityLevel']
-            warning.severity = SeverityLevel(w['severityLevel'])
-
-        if 'isTidal' in w:
-            warning.tidal = w['isTidal']
-        if 'message' in w:
-            warning.message = w['message']
-
+        warning = warning_from_json(w)
+        complete_warning(warning, w, polys, areas, source, lazy_geometry)
         warnings.append(warning)
 
         if progress_bar:
@@ -121,27 +77,396 @@ def build_warning_list(severity, use_pickle_caches=True, progress_bar=False):
     return warnings
 
 
-def update_poly_area_caches(warnings, poly_cache='warning_polys.pk',
-                            area_cache='warning_areas.pk', overwrite=False):
-    """Create updated lists of polygons/areas pertaining to any new warnings.
+class WarningChangeset(namedtuple('WarningChangeset',
+                                  ['warnings', 'added', 'changed',
+                                   'removed'])):
+    """Changes to a warning list, as returned by refresh_warning_list.
 
-    If previous cached data is available, and overwrite is false the new data
-    is appended to this. polygon data is stored as a list of lists containing
-    four attributes for each warning:
-    [[geojson, region, is_poly_simplified, simplified_geojson], ...]
+    Attributes
+    ----------
+    warnings : list[FloodWarning]
+        the refreshed warning list.
+    added : list[FloodWarning]
+        warnings which were not in the previous list.
+    changed : list[FloodWarning]
+        warnings whose message has changed. They replace the previous
+        warning objects of the same id.
+    removed : list[FloodWarning]
+        warnings of the previous list which are no longer in force.
+
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+
+def refresh_warning_list(previous, severity, use_pickle_caches=True,
+                         source=datafetcher, lazy_geometry=False):
+    """Fetch the warnings and update a previously built warning list.
+
+    Warnings are matched to the previous list by their flood area id. Those
+    whose timeMessageChanged is unchanged are kept as they are. Those whose
+    message has changed are rebuilt from the fetched data, reusing the area
+    data and the geometry, simplified or not, of the previous warning, since
+    the flood area itself does not change. Only new warnings have their area
+    and region read from the caches or fetched.
+
+    Parameters
+    ----------
+    previous : list[FloodWarning]
+        the previous warning list, e.g. from build_warning_list.
+    severity : int
+        warnings above this minimum severity value (ie of lower numerical
+        value) are returned.
+    use_pickle_caches : bool, optional
+        If true, cached data is used for the flood regions of new warnings.
+        The default is True.
+    source : optional
+        Provides the fetch functions of floodsystem.datafetcher. The default
+        is the datafetcher module itself.
+    lazy_geometry : bool, optional
+        If True, the regions of new warnings are loaded when first used, see
+        build_warning_list. The default is False.
+
+    Returns
+    -------
+    WarningChangeset
+        the refreshed warning list, and the warnings added, changed and
+        removed. It is false if nothing changed.
+
+    """
+    data = source.fetch_flood_warnings(severity)
+    previous_by_id = {w.id: w for w in previous}
+
+    warnings = []
+    added = []
+    changed = []
+    caches = None
+    for w in data['items']:
+        old = previous_by_id.get(w.get('floodAreaID'))
+        if old is not None and old.last_update == w.get('timeMessageChanged'):
+            warnings.append(old)
+            continue
+
+        warning = warning_from_json(w)
+        if old is not None:
+            reuse_area_and_geometry(warning, old)
+            changed.append(warning)
+        else:
+            # the caches are only read if there are new warnings
+            if caches is None:
+                caches = load_poly_area_caches() if use_pickle_caches \
+                    else ({}, {})
+            complete_warning(warning, w, caches[0], caches[1], source,
+                             lazy_geometry)
+            added.append(warning)
+        warnings.append(warning)
+
+    current_ids = {w.id for w in warnings}
+    removed = [w for w in previous if w.id not in current_ids]
+    return WarningChangeset(warnings, added, changed, removed)
+
+
+def complete_warning(warning, w, polys, areas, source=datafetcher,
+                     lazy_geometry=False):
+    """Set the area and region of a new warning from the caches or the API.
+
+    Parameters
+    ----------
+    warning : FloodWarning
+        created from w by warning_from_json.
+    w : dict
+        the item of the fetched flood warning data.
+    polys, areas : dict
+        cached data keyed by warning id, see load_poly_area_caches.
+    source : optional
+        Provides the fetch functions of floodsystem.datafetcher. The default
+        is the datafetcher module itself.
+    lazy_geometry : bool, optional
+        If True, the region is loaded when first used. The default is False.
+
+    Returns
+    -------
+    None.
+
+    """
+    # attempts to set the area and poly based on cached values, if not,
+    # pulls from the api
+    apply_cached_area(warning, areas)
+    if needs_area(warning) and '@id' in w['floodArea']:
+        set_warning_area(warning,
+                         source.fetch_warning_area(w['floodArea']['@id']))
+
+    if lazy_geometry:
+        warning.set_geometry_loader(geometry_loader(
+            warning.id, polys, w['floodArea'].get('polygon'), source))
+    else:
+        apply_cached_poly(warning, polys)
+        if needs_region(warning) and 'polygon' in w['floodArea']:
+            set_warning_region(warning, source.fetch_warning_region(
+                w['floodArea']['polygon']))
+
+
+def reuse_area_and_geometry(warning, old):
+    """Give a rebuilt warning the area data and geometry of its previous
+    version.
+
+    Parameters
+    ----------
+    warning : FloodWarning
+        the rebuilt warning.
+    old : FloodWarning
+        the previous warning of the same flood area.
+
+    Returns
+    -------
+    None.
+
+    """
+    warning.label = old.label
+    warning.description = old.description
+    warning.coord = old.coord
+    warning.area_json = old.area_json
+    if old.geometry_loaded:
+        warning.geometry = old.geometry
+        warning.is_poly_simplified = old.is_poly_simplified
+    else:
+        warning.set_geometry_loader(old.geometry_loader)
+
+
+def warning_from_json(w):
+    """Create a FloodWarning from an item of the fetched flood warning data.
+
+    The area and region of the warning are not set, see set_warning_area and
+    set_warning_region.
+
+    Parameters
+    ----------
+    w : dict
+        an item of the data returned by datafetcher.fetch_flood_warnings.
+
+    Returns
+    -------
+    warning : FloodWarning
+
+    """
+    warning = FloodWarning()
+
+    if 'floodAreaID' in w:
+        warning.id = w['floodAreaID']
+    if 'county' in w['floodArea']:
+        warning.county = w['floodArea']['county']
+
+    if 'timeMessageChanged' in w:
+        warning.last_update = w['timeMessageChanged']
+
+    if 'severityLevel' in w:
+        warning.severity_lev = w['severityLevel']
+        warning.severity = SeverityLevel(w['severityLevel'])
+
+    if 'isTidal' in w:
+        warning.tidal = w['isTidal']
+    if 'message' in w:
+        warning.message = w['message']
+
+    return warning
+
+
+def load_poly_area_caches(cache_file=WARNING_CACHE):
+    """Open the warning region and area cache, indexed by warning id.
+
+    Only the metadata of the cache is read; the regions of a warning are
+    decoded when they are looked up, see warningcache.
+
+    Parameters
+    ----------
+    cache_file : string, optional
+        The name of the cache file, in the cache directory. The default is
+        WARNING_CACHE.
+
+    Returns
+    -------
+    polys, areas : mapping, dict
+        the cached polygon and area data, keyed by warning id. Both are empty
+        if there is no cache.
+
+    """
+    cache = warningcache.read_cache(os.path.join('cache', cache_file))
+    if cache is None:
+        return {}, {}
+    return cache.regions, cache.areas
+
+
+def apply_cached_area(warning, areas):
+    """Set the label, description and coord of a warning from cached data.
+
+    Parameters
+    ----------
+    warning : FloodWarning
+    areas : dict
+        cached area data keyed by warning id, see load_poly_area_caches.
+
+    Returns
+    -------
+    None.
+
+    """
+    area = areas.get(warning.id)
+    if area is not None:
+        instrument.count('warning_areas', source='cache')
+        warning.label = area['items']['label']
+        warning.description = area['items']['description']
+        warning.coord = (area['items']['lat'], area['items']['long'])
+
+
+def apply_cached_poly(warning, polys):
+    """Set the region and geoJSON of a warning from cached data.
+
+    Parameters
+    ----------
+    warning : FloodWarning
+    polys : dict
+        cached polygon data keyed by warning id, see load_poly_area_caches.
+
+    Returns
+    -------
+    None.
+
+    """
+    poly = polys.get(warning.id)
+    if poly is not None:
+        instrument.count('warning_regions', source='cache')
+        warning.geometry, warning.is_poly_simplified = poly
+
+
+def needs_area(warning):
+    """Return True if the area data of a warning has to be fetched."""
+    return not warning.label or not warning.description
+
+
+def needs_region(warning):
+    """Return True if the region of a warning has to be fetched."""
+    return not warning.region or not warning.geojson
+
+
+def set_warning_area(warning, flood_area):
+    """Set the area data of a warning from fetched flood area data.
+
+    Parameters
+    ----------
+    warning : FloodWarning
+    flood_area : dict
+        as returned by datafetcher.fetch_warning_area.
+
+    Returns
+    -------
+    None.
+
+    """
+    instrument.count('warning_areas', source='fetch')
+    warning.label = flood_area['items']['label']
+    warning.description = flood_area['items']['description']
+    warning.area_json = flood_area
+
+
+def set_warning_region(warning, poly):
+    """Set the region of a warning from fetched polygon data.
+
+    Parameters
+    ----------
+    warning : FloodWarning
+    poly : list[dict]
+        geoJSON features, as returned by datafetcher.fetch_warning_region.
+        If None, the warning is unchanged.
+
+    Returns
+    -------
+    None.
+
+    """
+    if poly is not None:
+        warning.geometry, warning.is_poly_simplified = region_geometry(poly)
+
+
+def region_geometry(poly):
+    """Return the geometry attributes of a warning from fetched polygon data.
+
+    Parameters
+    ----------
+    poly : list[dict]
+        geoJSON features, as returned by datafetcher.fetch_warning_region.
+
+    Returns
+    -------
+    tuple
+        (RegionGeometry, is_poly_simplified), as set on a FloodWarning. The
+        geometry is shared with any other warning with the same polygons.
+
+    """
+    instrument.count('warning_regions', source='fetch')
+    geometry = geometrystore.store.intern(poly)
+    # make the shapely region now rather than when the warning is first used
+    geometry.region
+    return geometry, {'tol': 0.000, 'buf': 0.000}
 
-    area data is stored as a list of json objects obtained from the API for
-    each warning: [[area_json], ...]
+
+def geometry_loader(identifier, polys, url, source=datafetcher):
+    """Return a function loading the geometry of a warning on demand.
+
+    The geometry is read from the cache if available, otherwise fetched.
+    See FloodWarning.set_geometry_loader.
+
+    Parameters
+    ----------
+    identifier : string
+        the warning id.
+    polys : dict
+        cached polygon data keyed by warning id, see load_poly_area_caches.
+    url : string
+        the url of the polygon of the warning's flood area, or None.
+    source : optional
+        Provides the fetch functions of floodsystem.datafetcher. The default
+        is the datafetcher module itself.
+
+    Returns
+    -------
+    function
+
+    """
+    def load():
+        cached = polys.get(identifier)
+        if cached is not None:
+            instrument.count('warning_regions', source='cache')
+            return cached
+        if url is not None:
+            poly = source.fetch_warning_region(url)
+            if poly is not None:
+                return region_geometry(poly)
+        return None
+    return load
+
+
+def update_poly_area_caches(warnings, cache_file=WARNING_CACHE,
+                            overwrite=False):
+    """Add the polygons and areas of warnings to the cache.
+
+    If previous cached data is available, and overwrite is false the new data
+    is added to this, replacing any previous data of the same warnings. The
+    cache holds each distinct region once, with its geoJSON, shapely region
+    and simplified geoJSON stored as WKB. For each warning it holds the
+    content hash of its region, its is_poly_simplified and its area data as
+    obtained from the API. See warningcache for the format.
 
     Parameters
     ----------
     warnings : list[FLoodWarnings]
         The list of FloodWarning objects of severity greater than or equal to
         severity.
-    poly_cache : string, optional
-        The name of the polygon cache file. The default is 'warning_polys.pk'.
-    area_cache : string, optional
-        The name of the area cache file. The default is 'warning_areas.pk'.
+    cache_file : string, optional
+        The name of the cache file, in the cache directory. The default is
+        WARNING_CACHE.
     overwrite : bool, optional
         If True, previously cached data is overwritten and only current data is
          added to the cache files. The default is False.
@@ -151,33 +476,9 @@ def update_poly_area_caches(warnings, poly_cache='warning_polys.pk',
     None.
 
     """
-    # if not overwriting, tries to read previous data and appends on new data
-    if not overwrite:
-        polys = retrieve_pickle_cache(poly_cache)
-        areas = retrieve_pickle_cache(area_cache)
-    else:
-        polys = []
-        areas = []
-
-    for warning in warnings:
-        # if the warning id does not already have a corresponding polygon
-        # region cached, add it
-        if not any((poly[0][0]['properties']['FWS_TACODE'] == warning.id)
-                   for poly in polys):
-            if warning.geojson is not None and warning.region is not None:
-                polys.append([warning.geojson, warning.region,
-                              warning.is_poly_simplified,
-                              warning.simplified_geojson])
-
-        # if the warning id does not already have corresponding area data
-        # cached, add it
-        if not any((area['items']['currentWarning']['floodAreaID'] ==
-                    warning.id) for area in areas):
-            if warning.area_json is not None:
-                areas.append(warning.area_json)
-
-    save_to_pickle_cache(poly_cache, polys)
-    save_to_pickle_cache(area_cache, areas)
+    path = datafetcher.cache_file_path(cache_file)
+    previous = None if overwrite else warningcache.read_cache(path)
+    warningcache.write_cache(path, warnings, previous)
 
 
 def retrieve_pickle_cache(filename):
@@ -237,7 +538,8 @@ def save_to_pickle_cache(filename, data):
         print('Error saving polygon data')
 
 
-def build_regions_geojson(warnings, file=None):
+def build_regions_geojson(warnings, file=None, precision=None,
+                          properties=None, report_size=False):
     """Create geoJSON FeatureCollection object to plot flood warnings on a map.
 
     Parameters
@@ -247,6 +549,17 @@ def build_regions_geojson(warnings, file=None):
     file : string, optional
         For debug purposes, saves parameters data to a file, without any
         coordinates if file is a non-None string. The default is None.
+    precision : int, optional
+        If given, coordinates are rounded to this number of decimal places.
+        5 decimal places is roughly 1m. The default is None, where
+        coordinates are unchanged.
+    properties : list[string], optional
+        If given, only these feature properties are kept. Plotting with
+        plot.map_flood_warnings requires 'FWS_TACODE'. The default is None,
+        where all properties are kept.
+    report_size : bool, optional
+        If True, prints the size of the geoJSON in bytes, before and after
+        rounding coordinates and dropping properties. The default is False.
 
     Returns
     -------
@@ -259,14 +572,7 @@ def build_regions_geojson(warnings, file=None):
     features_without_coords = []
 
     for w in warnings:
-        geo = []
-        # If available use the simplified geojson, otherwise use the raw
-        if w.simplified_geojson is not None:
-            geo = w.simplified_geojson
-        elif w.geojson is not None:
-            geo = w.geojson
-
-        for feature in geo:
+        for feature in _warning_features(w):
             features.append(feature)
             # pprint(feature)
             if file is not None:
@@ -278,6 +584,17 @@ def build_regions_geojson(warnings, file=None):
 
     data = {'type': 'FeatureCollection', 'features': features}
 
+    if precision is not None or properties is not None:
+        compact_data = {'type': 'FeatureCollection',
+                        'features': [_compact_feature(f, precision, properties)
+                                     for f in features]}
+        if report_size:
+            print("geoJSON size: {} bytes, reduced to {} bytes".format(
+                json_size(data), json_size(compact_data)))
+        data = compact_data
+    elif report_size:
+        print("geoJSON size: {} bytes".format(json_size(data)))
+
     # debugging - outputs the geojson to a file for verification
     if file is not None:
         with open(file, 'w') as out:
@@ -288,6 +605,188 @@ def build_regions_geojson(warnings, file=None):
     return data
 
 
+def build_regions_topojson(warnings, quantization=100000, properties=None,
+                           report_size=False):
+    """Create a TopoJSON topology of the warning regions.
+
+    Coordinates are quantized to an integer grid and boundaries shared by
+    adjacent regions are stored once, as arcs referenced by each region, so
+    the output is much smaller than the equivalent geoJSON. Regions are
+    stored in the 'regions' object of the topology, with the warning id
+    (FWS_TACODE) as the id of each geometry.
+
+    Parameters
+    ----------
+    warnings : list[FloodWarning]
+        List of flood warnings.
+    quantization : int, optional
+        The number of distinct values along each axis of the grid that
+        coordinates are snapped to. The default is 100000.
+    properties : list[string], optional
+        If given, only these feature properties are kept. The default is
+        None, where all properties are kept.
+    report_size : bool, optional
+        If True, prints the size of the geoJSON and of the TopoJSON in bytes.
+        The default is False.
+
+    Returns
+    -------
+    topology : dict
+        The TopoJSON Topology object.
+
+    """
+    features = [f for w in warnings for f in _warning_features(w)
+                if f.get('geometry') is not None
+                and f['geometry']['type'] in ('Polygon', 'MultiPolygon')]
+
+    # find the bounds of all coordinates to set up the quantization grid
+    xs = []
+    ys = []
+    for f in features:
+        for polygon in _polygons(f['geometry']):
+            for ring in polygon:
+                xs.extend(p[0] for p in ring)
+                ys.extend(p[1] for p in ring)
+    x0, y0 = (min(xs), min(ys)) if xs else (0, 0)
+    kx = (max(xs) - x0) / (quantization - 1) if xs and max(xs) > x0 else 1
+    ky = (max(ys) - y0) / (quantization - 1) if ys and max(ys) > y0 else 1
+
+    def quantize_ring(ring):
+        points = []
+        for p in ring:
+            q = (int(round((p[0] - x0) / kx)), int(round((p[1] - y0) / ky)))
+            if not points or q != points[-1]:
+                points.append(q)
+        # rings are treated cyclically, without a closing point
+        if len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        return points
+
+    quantized = []
+    for f in features:
+        polygons = []
+        for polygon in _polygons(f['geometry']):
+            rings = [quantize_ring(ring) for ring in polygon]
+            rings = [ring for ring in rings if len(ring) >= 3]
+            if rings:
+                polygons.append(rings)
+        quantized.append(polygons)
+
+    # a point is a junction if it is joined to different neighbours in
+    # different rings, i.e. where shared boundaries begin or end
+    neighbours = {}
+    for polygons in quantized:
+        for rings in polygons:
+            for ring in rings:
+                n = len(ring)
+                for i, p in enumerate(ring):
+                    pair = frozenset((ring[i - 1], ring[(i + 1) % n]))
+                    neighbours.setdefault(p, set()).add(pair)
+    junctions = {p for p, pairs in neighbours.items() if len(pairs) > 1}
+
+    arcs = []
+    arc_index = {}
+
+    def add_arc(points):
+        key = tuple(points)
+        if key in arc_index:
+            return arc_index[key]
+        reverse_key = key[::-1]
+        if reverse_key in arc_index:
+            return ~arc_index[reverse_key]
+        arc_index[key] = len(arcs)
+        arcs.append(points)
+        return arc_index[key]
+
+    def ring_arcs(ring):
+        cuts = [i for i, p in enumerate(ring) if p in junctions]
+        if not cuts:
+            # start closed rings at their smallest point, so the same ring
+            # in another region is recognised as the same arc
+            start = ring.index(min(ring))
+            ring = ring[start:] + ring[:start]
+            return [add_arc(ring + [ring[0]])]
+        ring = ring[cuts[0]:] + ring[:cuts[0]]
+        cuts = [i - cuts[0] for i in cuts] + [len(ring)]
+        ring = ring + [ring[0]]
+        return [add_arc(ring[a:b + 1]) for a, b in zip(cuts, cuts[1:])]
+
+    geometries = []
+    for f, polygons in zip(features, quantized):
+        if not polygons:
+            continue
+        polygon_arcs = [[ring_arcs(ring) for ring in rings]
+                        for rings in polygons]
+        geometry = {'type': 'MultiPolygon', 'arcs': polygon_arcs}
+        if f['geometry']['type'] == 'Polygon':
+            geometry = {'type': 'Polygon', 'arcs': polygon_arcs[0]}
+        props = f.get('properties') or {}
+        if 'FWS_TACODE' in props:
+            geometry['id'] = props['FWS_TACODE']
+        geometry['properties'] = {k: v for k, v in props.items()
+                                  if properties is None or k in properties}
+        geometries.append(geometry)
+
+    # arcs are delta encoded, each point relative to the previous one
+    encoded_arcs = []
+    for arc in arcs:
+        encoded = [list(arc[0])]
+        for prev, p in zip(arc, arc[1:]):
+            encoded.append([p[0] - prev[0], p[1] - prev[1]])
+        encoded_arcs.append(encoded)
+
+    topology = {'type': 'Topology',
+                'transform': {'scale': [kx, ky], 'translate': [x0, y0]},
+                'objects': {'regions': {'type': 'GeometryCollection',
+                                        'geometries': geometries}},
+                'arcs': encoded_arcs}
+
+    if report_size:
+        print("geoJSON size: {} bytes, TopoJSON size: {} bytes".format(
+            json_size({'type': 'FeatureCollection', 'features': features}),
+            json_size(topology)))
+
+    return topology
+
+
+def json_size(data):
+    """Return the size in bytes of an object serialized as compact JSON."""
+    return len(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def _warning_features(warning):
+    """Return the geoJSON features of a warning, simplified if available."""
+    if warning.simplified_geojson is not None:
+        return warning.simplified_geojson
+    if warning.geojson is not None:
+        return warning.geojson
+    return []
+
+
+def _compact_feature(feature, precision, properties):
+    """Return a copy of a feature with rounded coordinates and fewer
+    properties."""
+    compact = {'type': 'Feature'}
+    props = feature.get('properties') or {}
+    compact['properties'] = {k: v for k, v in props.items()
+                             if properties is None or k in properties}
+    geometry = feature.get('geometry')
+    if geometry is not None and precision is not None \
+            and 'coordinates' in geometry:
+        geometry = {'type': geometry['type'],
+                    'coordinates': round_coordinates(geometry['coordinates'],
+                                                     precision)}
+    compact['geometry'] = geometry
+    return compact
+
+
+def _polygons(geometry):
+    """Return the polygons of a Polygon or MultiPolygon geoJSON geometry."""
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    return geometry['coordinates']
+
+
 def build_severity_dataframe(warnings):
     """Build dataframe with warnings data, used to colour the map regions.
 
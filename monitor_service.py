@@ -0,0 +1,75 @@
+"""Flood monitoring service, keeping station and warning data up to date."""
+
+import argparse
+import datetime
+from floodsystem import instrument
+from floodsystem.monitor import FloodMonitor
+from floodsystem.server import serve
+from floodsystem.warning import SeverityLevel
+
+
+def print_summary(monitor, ran):
+    """Print the state of the monitor after a refresh."""
+    with monitor.lock:
+        print("[{}] refreshed {}: {} stations, {} warnings".format(
+            datetime.datetime.now().strftime("%H:%M:%S"), ", ".join(ran),
+            len(monitor.stations), len(monitor.warnings)))
+        for station in monitor.highest_stations:
+            level = station.relative_water_level()
+            print("    {:<30} {}".format(
+                station.name, "{:.3f}".format(level) if level is not None
+                else "Not available"))
+
+
+def run(severity, level_interval, warning_interval, top_n, host=None,
+        port=None):
+    monitor = FloodMonitor(severity, level_interval=level_interval,
+                           warning_interval=warning_interval, top_n=top_n)
+    try:
+        if port is None:
+            monitor.run(callback=print_summary)
+        else:
+            print("Serving queries on http://{}:{}".format(host, port))
+            serve(monitor, host, port, callback=print_summary)
+    except KeyboardInterrupt:
+        print("Stopped")
+
+
+if __name__ == "__main__":
+    print("*** Flood Monitoring Service ***")
+    print("")
+
+    severity_levels = [s.name for s in SeverityLevel]
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--warning-min-severity", type=str,
+                        default="moderate", choices=severity_levels,
+                        dest='warning_min_severity',
+                        help="Monitors warnings only of the given severity "
+                             "level or greater.")
+    parser.add_argument("-li", "--level-interval", type=float, default=900,
+                        dest='level_interval',
+                        help="Seconds between water level refreshes.")
+    parser.add_argument("-wi", "--warning-interval", type=float, default=900,
+                        dest='warning_interval',
+                        help="Seconds between flood warning refreshes.")
+    parser.add_argument("-n", "--top-n", type=int, default=10, dest='top_n',
+                        help="Number of stations with the highest relative "
+                             "water level to report.")
+
+    parser.add_argument("-p", "--port", type=int, default=None,
+                        help="Serves queries over HTTP on this port, see "
+                             "floodsystem.server for the endpoints.")
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                        help="The address to serve queries on.")
+    parser.add_argument("--instrument", action='store_true',
+                        help="Records timers and counters, served at "
+                             "/metrics, see floodsystem.instrument.")
+
+    args = parser.parse_args()
+
+    if args.instrument:
+        instrument.enable()
+
+    run(SeverityLevel[args.warning_min_severity], args.level_interval,
+        args.warning_interval, args.top_n, args.host, args.port)
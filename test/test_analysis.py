@@ -0,0 +1,68 @@
+"""Unit test for the analysis module"""
+
+import datetime
+import numpy as np
+import pytest
+from floodsystem.analysis import lttb_indices, minmax_indices, downsample
+
+
+def make_series(n):
+    start = datetime.datetime(2021, 1, 1)
+    dates = [start + datetime.timedelta(minutes=15 * i) for i in range(n)]
+    levels = list(np.sin(np.arange(n) / 50.0))
+    # a single spike, which downsampling must keep
+    levels[n // 3] = 5.0
+    return dates, levels
+
+
+def test_lttb_indices():
+    x = np.arange(1000.0)
+    y = np.sin(x / 50.0)
+    y[333] = 5.0
+    kept = lttb_indices(x, y, 100)
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert 333 in kept
+    assert list(lttb_indices(x[:50], y[:50], 100)) == list(range(50))
+    for n_out, expected in [(0, []), (1, [0]), (2, [0, 999])]:
+        kept = lttb_indices(x, y, n_out)
+        assert kept.dtype == np.intp and list(kept) == expected
+
+
+def test_minmax_indices():
+    x = np.arange(1000.0)
+    y = np.sin(x / 50.0)
+    y[333] = 5.0
+    y[666] = -5.0
+    kept = minmax_indices(x, y, 50)
+    assert len(kept) <= 102
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 333 in kept and 666 in kept
+    # every bucket keeps its extremes
+    for b in range(50):
+        bucket = np.arange(20 * b, 20 * b + 20)
+        assert bucket[np.argmax(y[bucket])] in kept
+        assert bucket[np.argmin(y[bucket])] in kept
+
+
+def test_downsample():
+    dates, levels = make_series(5000)
+    for method in ['lttb', 'minmax']:
+        d, lv = downsample(dates, levels, 400, method)
+        assert len(d) == len(lv) <= 400
+        assert d == sorted(d) and d[0] == dates[0] and d[-1] == dates[-1]
+        assert 5.0 in lv
+
+    # readings newest first, as from the API, are plotted in date order
+    d, lv = downsample(dates[::-1], levels[::-1], 400)
+    assert d == sorted(d) and 5.0 in lv
+
+    assert downsample(dates, levels, 10000) == (dates, levels)
+    assert downsample(dates, levels, 400, None) == (dates, levels)
+    with pytest.raises(ValueError):
+        downsample(dates, levels, 400, 'every other')
+    with pytest.raises(ValueError):
+        downsample(dates, levels, 0)
+    d, lv = downsample(dates, levels, 1)
+    assert d == [dates[0]] and lv == [levels[0]]
@@ -0,0 +1,64 @@
+"""Unit test for the asyncdatafetcher module"""
+
+import asyncio
+import os
+import threading
+import time
+from floodsystem import asyncdatafetcher, datafetcher
+
+
+def test_bounded_concurrency(monkeypatch):
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def get_json(url):
+        with lock:
+            in_flight.append(url)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.remove(url)
+        return {'url': url}
+
+    monkeypatch.setattr(asyncdatafetcher, '_get_json', get_json)
+    asyncdatafetcher.set_max_concurrency(3)
+
+    async def fetch_all():
+        return await asyncio.gather(*[asyncdatafetcher.fetch(str(i))
+                                      for i in range(10)])
+
+    try:
+        results = asyncio.run(fetch_all())
+    finally:
+        asyncdatafetcher.set_max_concurrency(8)
+
+    assert [r['url'] for r in results] == [str(i) for i in range(10)]
+    assert max(max_in_flight) == 3
+
+
+def test_cache_semantics(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    fetched = []
+
+    def get_json(url):
+        fetched.append(url)
+        return {'items': [len(fetched)]}
+
+    monkeypatch.setattr(asyncdatafetcher, '_get_json', get_json)
+
+    # without a cache file, data is fetched and written to the cache
+    data = asyncio.run(asyncdatafetcher.fetch_station_data(use_cache=True))
+    assert data == {'items': [1]}
+    assert os.path.isfile(os.path.join('cache', 'station_data.json'))
+
+    # the cache file is then used, and is shared with the sync functions
+    data = asyncio.run(asyncdatafetcher.fetch_station_data(use_cache=True))
+    assert data == {'items': [1]}
+    assert datafetcher.fetch_station_data(use_cache=True) == data
+
+    # the cache is bypassed and rewritten if use_cache is false
+    data = asyncio.run(asyncdatafetcher.fetch_station_data(use_cache=False))
+    assert data == {'items': [2]}
+    assert datafetcher.fetch_station_data(use_cache=True) == data
+    assert fetched == [datafetcher.station_data_url()] * 2
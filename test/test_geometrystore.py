@@ -0,0 +1,69 @@
+"""Unit test for the geometrystore module"""
+
+import copy
+from floodsystem import geometrystore
+from floodsystem.warning import FloodWarning
+
+
+def square_features(x, y):
+    geometry = {"type": "Polygon",
+                "coordinates": [[[x, y], [x + 1.0, y], [x + 1.0, y + 1.0],
+                                 [x, y + 1.0], [x, y]]]}
+    return [{"type": "Feature", "properties": {"FWS_TACODE": "A"},
+             "geometry": geometry}]
+
+
+def test_content_hash():
+    features = square_features(0.0, 50.0)
+    as_tuples = copy.deepcopy(features)
+    ring = as_tuples[0]['geometry']['coordinates'][0]
+    as_tuples[0]['geometry']['coordinates'] = (tuple(tuple(p) for p in ring),)
+    assert geometrystore.content_hash(features) == \
+        geometrystore.content_hash(as_tuples)
+    assert geometrystore.content_hash(features) != \
+        geometrystore.content_hash(square_features(1.0, 50.0))
+
+
+def test_identical_regions_are_shared():
+    store = geometrystore.GeometryStore()
+    a = store.intern(square_features(0.0, 50.0))
+    b = store.intern(square_features(0.0, 50.0))
+    assert a is b and len(store) == 1
+    assert store.intern(square_features(1.0, 50.0)) is not a
+
+    # geometries no warning refers to are released
+    del b
+    assert len(store) == 1
+
+    # after clearing, the same geoJSON is stored as a new geometry
+    store.clear()
+    assert len(store) == 0
+    assert store.intern(square_features(0.0, 50.0)) is not a
+    del a
+    assert len(store) == 0
+
+    low = FloodWarning(identifier="A", severity_lev=3,
+                       geojson=square_features(0.0, 50.0))
+    severe = FloodWarning(identifier="A", severity_lev=1,
+                          geojson=square_features(0.0, 50.0))
+    assert low.geometry is severe.geometry
+    assert low.region is severe.region
+
+
+def test_simplify_does_not_change_geojson():
+    warning = FloodWarning(geojson=square_features(0.0, 50.0))
+    other = FloodWarning(geojson=square_features(0.0, 50.0))
+    original = copy.deepcopy(warning.geojson)
+    assert warning.simplified_geojson is warning.geojson
+
+    warning.simplify_geojson(tol=0.01, buf=0.1)
+    assert warning.geojson == original
+    assert warning.is_poly_simplified == {'tol': 0.01, 'buf': 0.1}
+    simplified = warning.simplified_geojson
+    assert FloodWarning.geo_json_to_shape(
+        simplified[0]['geometry']).area > warning.region[0].area
+
+    # the simplified version is computed once and shared
+    other.simplify_geojson(tol=0.01, buf=0.1)
+    assert other.simplified_geojson is simplified
+    assert warning.geometry.simplified(0.01, 0.1) is simplified
@@ -0,0 +1,112 @@
+"""Unit test for the index module"""
+
+import floodsystem.geo as geo
+from floodsystem.index import StationIndex, WarningIndex
+from floodsystem.stationdata import build_station_list
+from floodsystem.warning import FloodWarning
+from .test_warningdata import make_square_warning
+
+
+def test_station_index():
+    stations = build_station_list(use_cache=False, test=True)
+    index = StationIndex(stations)
+
+    # radius queries match the unindexed search in geo
+    centre = (52.2053, 0.1218)
+    for r in [5, 20, 100]:
+        found = index.within_radius(centre, r)
+        expected = geo.stations_within_radius(stations, centre, r)
+        assert [s for s, _ in found] == expected
+        assert all(d <= r for _, d in found)
+
+    assert len(index.on_river('River Thames')) == 55
+    assert index.on_river('Not a river') == []
+
+
+def test_warning_index():
+    warnings = [make_square_warning(str(i), x, 50.0)
+                for i, x in enumerate([0.0, 0.5, 3.0])]
+    warnings.append(FloodWarning(identifier="no region"))
+
+    index = WarningIndex(warnings)
+    for loc in [(50.5, 0.2), (50.5, 0.7), (50.5, 3.5), (52.0, 0.2)]:
+        assert index.warnings_at(loc) == \
+            FloodWarning.check_warnings_at_location(warnings, loc)
+
+
+def test_assign_stations():
+    stations = build_station_list(use_cache=False, test=True)
+    warnings = [make_square_warning(str(i), long, lat, size=0.5)
+                for i, (lat, long) in enumerate([(52.0, -0.5), (52.3, -0.2),
+                                                 (51.3, -1.0)])]
+    warnings.append(FloodWarning(identifier="no region"))
+
+    assignment = WarningIndex(warnings).assign_stations(stations)
+    assert len(assignment) > 0
+
+    # the same as testing each warning against every station
+    for i, w in enumerate(warnings):
+        assert assignment.stations_in_warning(i) == \
+            w.stations_in_warning(stations)
+    assert assignment.towns_affected() == \
+        {w.id: w.find_towns_affected(stations) for w in warnings}
+    for j, s in enumerate(stations):
+        expected = [w for w in warnings if s.coord is not None
+                    and w.coord_in_region(s.coord)]
+        assert assignment.warnings_at_station(j) == expected
+
+    df = assignment.to_dataframe()
+    assert len(df) == len(assignment)
+    assert list(df[df['warning_id'] == "1"]['station_id']) == \
+        [s.station_id for s in assignment.stations_in_warning(1)]
+
+    empty = WarningIndex([]).assign_stations(stations)
+    assert len(empty) == 0 and empty.warnings_at_station(0) == []
+
+
+def test_warnings_at_many():
+    warnings = [make_square_warning(str(i), x, 50.0)
+                for i, x in enumerate([0.0, 0.5, 3.0])]
+
+    index = WarningIndex(warnings)
+    locs = [(50.5, 0.2), (50.5, 0.7), (50.5, 3.5), (52.0, 0.2)]
+    assert index.warnings_at_many(locs) == \
+        [index.warnings_at(loc) for loc in locs]
+    assert index.warnings_at_many([]) == []
+    assert WarningIndex([]).warnings_at_many(locs) == [[], [], [], []]
+
+
+def test_nearest_and_within_distance():
+    import random
+    from haversine import haversine
+    from shapely.ops import nearest_points
+    from shapely import Point
+
+    warnings = [make_square_warning(str(i), long, lat, size=0.2)
+                for i, (lat, long) in enumerate([(52.0, -1.0), (52.1, 0.5),
+                                                 (54.0, 0.0)])]
+    warnings.append(FloodWarning(identifier="no region"))
+    index = WarningIndex(warnings)
+
+    def distance(warning, coord):
+        p = Point(coord[1], coord[0])
+        q = nearest_points(warning.region[0], p)[0]
+        return haversine(coord, (q.y, q.x))
+
+    rng = random.Random(1)
+    coords = [(rng.uniform(51.0, 55.0), rng.uniform(-2.0, 1.5))
+              for _ in range(50)] + [(52.05, -0.9)]
+    for coord, (warning, d) in zip(coords, index.nearest_warnings(coords)):
+        expected = min(warnings[:3], key=lambda w: distance(w, coord))
+        assert warning is expected
+        assert abs(d - distance(expected, coord)) < 1e-6
+    assert index.nearest_warning((52.05, -0.9)) == (warnings[0], 0.0)
+    assert WarningIndex([]).nearest_warning((52.0, 0.0)) is None
+
+    centre = (52.5, 0.0)
+    for r in [10, 60, 200]:
+        found = index.warnings_within(centre, r)
+        expected = sorted(w.id for w in warnings[:3]
+                          if distance(w, centre) <= r)
+        assert sorted(w.id for w, _ in found) == expected
+        assert [d for _, d in found] == sorted(d for _, d in found)
@@ -0,0 +1,45 @@
+"""Unit test for the instrument module"""
+
+import json
+from floodsystem import instrument
+from floodsystem.stationdata import build_station_list
+from floodsystem.warningdata import build_warning_list
+from .test_monitor import make_source
+
+
+def test_instrument_disabled():
+    instrument.reset()
+    instrument.disable()
+    with instrument.timer('nothing'):
+        pass
+    instrument.count('nothing')
+    assert instrument.summary() == {'timers': {}, 'counters': {}}
+
+
+def test_instrument_builders(tmp_path):
+    source = make_source()
+    instrument.reset()
+    instrument.enable()
+    try:
+        build_station_list(source=source)
+        build_warning_list(4, use_pickle_caches=False, source=source)
+        instrument.count('cache_hits', file='station_data.json')
+    finally:
+        instrument.disable()
+
+    summary = instrument.summary()
+    assert summary['timers']['build_station_list']['count'] == 1
+    assert summary['timers']['build_warning_list']['count'] == 1
+    n = len(source.warning_data['items'])
+    assert summary['counters']['warning_regions{source="fetch"}'] == n
+    assert summary['counters']['cache_hits{file="station_data.json"}'] == 1
+
+    text = instrument.prometheus_text()
+    assert "# TYPE floodsystem_build_station_list_seconds summary" in text
+    assert "floodsystem_build_station_list_seconds_count 1" in text
+    assert 'floodsystem_cache_hits_total{file="station_data.json"} 1' in text
+
+    instrument.dump_json(tmp_path / 'metrics.json')
+    with open(tmp_path / 'metrics.json') as f:
+        assert json.load(f) == summary
+    instrument.reset()
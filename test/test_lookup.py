@@ -0,0 +1,51 @@
+"""Unit test for the lookup module"""
+
+import csv
+import io
+from floodsystem.index import WarningIndex
+from floodsystem.lookup import lookup_locations, stream_lookup, lookup_csv
+from floodsystem.warning import FloodWarning
+from .test_warningdata import make_square_warning
+
+
+def make_warnings():
+    a = make_square_warning("A", 0.0, 50.0)
+    a.severity_lev = 3
+    b = make_square_warning("B", 0.5, 50.0)
+    b.severity_lev = 1
+    return [a, b]
+
+
+def test_lookup_locations():
+    warnings = make_warnings()
+    coords = [(50.5, 0.2), (50.5, 0.7), (52.0, 0.2)]
+    expected = [FloodWarning.check_warnings_at_location(warnings, c)
+                for c in coords]
+    assert lookup_locations(warnings, coords) == expected
+    assert lookup_locations(WarningIndex(warnings), coords) == expected
+
+
+def test_stream_lookup():
+    warnings = make_warnings()
+    locations = [(i, (50.5, 0.7) if i % 3 else None) for i in range(10)]
+    results = list(stream_lookup(warnings, iter(locations), chunk_size=4))
+    assert [item for item, _ in results] == list(range(10))
+    for item, warnings_here in results:
+        assert len(warnings_here) == (2 if item % 3 else 0)
+
+
+def test_lookup_csv():
+    infile = io.StringIO("name,lat,long\n"
+                         "first,50.5,0.2\n"
+                         "both,50.5,0.7\n"
+                         "dry,52.0,0.2\n"
+                         "unknown,,\n")
+    outfile = io.StringIO()
+    assert lookup_csv(make_warnings(), infile, outfile, chunk_size=2) == \
+        (4, 2)
+
+    outfile.seek(0)
+    rows = list(csv.DictReader(outfile))
+    assert [r['name'] for r in rows] == ["first", "both", "dry", "unknown"]
+    assert [r['warning_ids'] for r in rows] == ["A", "A;B", "", ""]
+    assert [r['max_severity'] for r in rows] == ["3", "1", "", ""]
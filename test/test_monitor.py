@@ -0,0 +1,196 @@
+"""Unit test for the monitor module"""
+
+from floodsystem.datafetcher import StubDataSource, fetch_test_station_data
+from floodsystem import monitor as monitor_module
+from floodsystem.monitor import FloodMonitor
+from floodsystem.plot import get_recommended_simplification_params
+from floodsystem.warning import FloodWarning, SeverityLevel
+
+
+def make_warning_data(identifier, coord, severity, time_changed):
+    """Return API-shaped warning, area and polygon data for a square region
+    of side 0.02 degrees around coord."""
+    area_url = "http://stub/id/floodAreas/" + identifier
+    poly_url = area_url + "/polygon"
+    lat, long = coord
+    geometry = {"type": "Polygon",
+                "coordinates": [[[long - 0.01, lat - 0.01],
+                                 [long + 0.01, lat - 0.01],
+                                 [long + 0.01, lat + 0.01],
+                                 [long - 0.01, lat + 0.01],
+                                 [long - 0.01, lat - 0.01]]]}
+    warning = {"floodAreaID": identifier, "severityLevel": severity,
+               "timeMessageChanged": time_changed, "message": "Test",
+               "isTidal": False,
+               "floodArea": {"@id": area_url, "county": "Testshire",
+                             "polygon": poly_url}}
+    area = {"items": {"label": "Area " + identifier, "description": "Test",
+                      "lat": lat, "long": long,
+                      "currentWarning": {"floodAreaID": identifier}}}
+    poly = [{"type": "Feature", "properties": {"FWS_TACODE": identifier},
+             "geometry": geometry}]
+    return warning, (area_url, area), (poly_url, poly)
+
+
+def make_source():
+    station_data = fetch_test_station_data()
+    items = station_data['items'][:2]
+    coords = [(e['lat'], e['long']) for e in items]
+    measure_ids = [e['measures'][-1]['@id'] for e in items]
+
+    source = StubDataSource(station_data=station_data)
+    source.level_data = {'items': [
+        {'latestReading': {'measure': m, 'value': 1.5}} for m in measure_ids]}
+
+    warnings = []
+    for i, coord in enumerate(coords):
+        w, area, poly = make_warning_data("W{}".format(i), coord, 2, "t0")
+        warnings.append(w)
+        source.areas[area[0]] = area[1]
+        source.regions[poly[0]] = poly[1]
+    source.warning_data = {'items': warnings}
+    return source
+
+
+def test_monitor_refresh():
+    source = make_source()
+    monitor = FloodMonitor(SeverityLevel.moderate, level_interval=10,
+                           warning_interval=20, top_n=2,
+                           use_pickle_caches=False, source=source)
+
+    # everything is built on the first run
+    assert monitor.run_pending(now=0) == ['stations', 'warnings']
+    assert len(monitor.stations) > 0
+    assert [w.id for w in monitor.warnings] == ["W0", "W1"]
+    assert len(monitor.station_warnings["W0"]) == 1
+    assert len(monitor.highest_stations) == 2
+    assert len(monitor.geojson['features']) == 2
+
+    # levels and warnings then refresh on their own schedules
+    assert monitor.run_pending(now=5) == []
+    assert monitor.run_pending(now=10) == ['levels']
+    assert monitor.run_pending(now=20) == ['levels', 'warnings']
+    assert source.calls['fetch_station_data'] == 1
+    assert source.calls['fetch_latest_water_level_data'] == 3
+
+
+def test_monitor_refresh_errors(monkeypatch, capsys):
+    source = make_source()
+    monitor = FloodMonitor(SeverityLevel.moderate, level_interval=100,
+                           warning_interval=100, use_pickle_caches=False,
+                           source=source, retry_interval=10)
+
+    def fail_once(fetch):
+        def fetch_failing(*args, **kwargs):
+            monkeypatch.setattr(source, fetch.__name__, fetch)
+            raise ConnectionError("Network down")
+        monkeypatch.setattr(source, fetch.__name__, fetch_failing)
+
+    # a failed refresh is retried on its own, and does not stop the others
+    fail_once(source.fetch_station_data)
+    assert monitor.run_pending(now=0) == ['warnings']
+    assert "Error refreshing stations" in capsys.readouterr().out
+    assert monitor.stations == []
+    assert monitor.run_pending(now=5) == []
+    assert monitor.run_pending(now=10) == ['stations']
+    assert len(monitor.stations) > 0
+
+    # the data of a failed refresh is kept until it succeeds
+    fail_once(source.fetch_flood_warnings)
+    warnings = monitor.warnings
+    assert monitor.run_pending(now=100) == []
+    assert "Error refreshing warnings" in capsys.readouterr().out
+    assert monitor.warnings is warnings
+    assert monitor.run_pending(now=110) == ['levels', 'warnings']
+    assert source.calls['fetch_flood_warnings'] == 2
+
+
+def test_monitor_levels_attached_under_lock(monkeypatch):
+    source = make_source()
+    monitor = FloodMonitor(SeverityLevel.moderate, use_pickle_caches=False,
+                           source=source)
+    monitor.refresh_stations()
+
+    # levels are fetched without holding the lock, so readers are not
+    # blocked by the request, but are only changed while holding it
+    fetch = source.fetch_latest_water_level_data
+    attach = monitor_module.attach_water_levels
+
+    def fetch_unlocked(*args, **kwargs):
+        assert not monitor.lock._is_owned()
+        return fetch(*args, **kwargs)
+
+    attached = []
+
+    def attach_locked(stations, measure_data):
+        attached.append(stations)
+        assert monitor.lock._is_owned()
+        assert stations is monitor.stations
+        attach(stations, measure_data)
+
+    monkeypatch.setattr(source, 'fetch_latest_water_level_data',
+                        fetch_unlocked)
+    monkeypatch.setattr(monitor_module, 'attach_water_levels', attach_locked)
+    monitor.refresh_levels()
+    assert attached == [monitor.stations]
+    assert sum(s.latest_level is not None for s in monitor.stations) == 2
+
+
+def test_monitor_warning_changes():
+    source = make_source()
+    monitor = FloodMonitor(SeverityLevel.moderate, use_pickle_caches=False,
+                           source=source)
+    monitor.run_pending(now=0)
+    first = {w.id: w for w in monitor.warnings}
+
+    # nothing has changed
+    changes = monitor.refresh_warnings()
+    assert not changes
+    assert changes.warnings == monitor.warnings
+
+    # one warning is updated, the other is no longer in force
+    w0 = dict(source.warning_data['items'][0], timeMessageChanged="t1")
+    source.warning_data = {'items': [w0]}
+    changes = monitor.refresh_warnings()
+    assert changes.added == []
+    assert [w.id for w in changes.changed] == ["W0"]
+    assert changes.removed == [first["W1"]]
+    assert monitor.warnings[0] is not first["W0"]
+    # the updated warning keeps its geometry, which is not fetched again
+    assert monitor.warnings[0].region is first["W0"].region
+    assert source.calls['fetch_warning_region'] == 2
+    assert set(monitor.station_warnings) == {"W0"}
+    assert len(monitor.geojson['features']) == 1
+
+
+def test_monitor_shared_warnings_simplified_under_lock(monkeypatch):
+    source = make_source()
+    monitor = FloodMonitor(SeverityLevel.moderate, use_pickle_caches=False,
+                           source=source)
+    monitor.run_pending(now=0)
+    shared = list(monitor.warnings)
+
+    # enough new warnings that every warning is simplified further
+    for i in range(2, 15):
+        w, area, poly = make_warning_data("W{}".format(i), (52.0, 0.1 * i),
+                                          2, "t0")
+        source.warning_data['items'].append(w)
+        source.areas[area[0]] = area[1]
+        source.regions[poly[0]] = poly[1]
+
+    simplify = FloodWarning.simplify_geojson
+    simplified = {}
+
+    def simplify_recorded(warning, *args, **kwargs):
+        simplified[warning.id] = monitor.lock._is_owned()
+        simplify(warning, *args, **kwargs)
+
+    monkeypatch.setattr(FloodWarning, 'simplify_geojson', simplify_recorded)
+    monitor.refresh_warnings()
+    params = get_recommended_simplification_params(15)
+    assert params['tol'] > 0
+    assert all(w.is_poly_simplified == params for w in monitor.warnings)
+    # warnings already visible to readers are only changed under the lock
+    assert len(simplified) == 15
+    assert all(simplified[w.id] for w in shared)
+    assert monitor.warnings[:2] == shared
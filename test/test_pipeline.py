@@ -0,0 +1,73 @@
+"""Unit test for the pipeline module"""
+
+import asyncio
+import os
+import subprocess
+import sys
+from floodsystem import asyncdatafetcher, datafetcher
+from floodsystem.pipeline import StageTimer, startup_async
+from .test_monitor import make_source
+
+
+def test_startup(monkeypatch, tmp_path):
+    source = make_source()
+    responses = {datafetcher.station_data_url(): source.station_data,
+                 datafetcher.latest_water_level_url(): source.level_data,
+                 datafetcher.flood_warnings_url(3): source.warning_data}
+    responses.update(source.areas)
+    for url, features in source.regions.items():
+        responses[url] = {'type': 'FeatureCollection', 'features': features}
+
+    monkeypatch.setattr(asyncdatafetcher, '_get_json', responses.get)
+    monkeypatch.chdir(tmp_path)
+
+    timer = StageTimer()
+    simpl_params = {'tol': 0.001, 'buf': 0.001}
+    stations, warnings = asyncio.run(startup_async(
+        3, use_pickle_caches=False, simpl_params=simpl_params, timer=timer))
+
+    assert len(stations) == len(source.station_data['items'])
+    assert sum(s.latest_level is not None for s in stations) == 2
+
+    assert [w.id for w in warnings] == ["W0", "W1"]
+    for w in warnings:
+        assert w.label == "Area " + w.id
+        assert len(w.region) == 1
+        assert w.is_poly_simplified == simpl_params
+
+    for stage in ["total", "fetch stations", "fetch levels", "fetch warnings",
+                  "fetch polygons", "simplify"]:
+        assert stage in timer.stages
+    assert timer.stages["fetch polygons"]['count'] == 2
+    assert "fetch stations" in timer.report()
+
+
+def test_startup_fresh_interpreter(tmp_path):
+    # the heavy dependencies are first used together by the worker threads
+    # building and simplifying regions, which must not see them half loaded
+    code = """
+import os, sys
+from floodsystem import asyncdatafetcher, datafetcher, pipeline
+from test.test_monitor import make_source
+
+source = make_source()
+responses = {datafetcher.station_data_url(): source.station_data,
+             datafetcher.latest_water_level_url(): source.level_data,
+             datafetcher.flood_warnings_url(3): source.warning_data}
+responses.update(source.areas)
+for url, features in source.regions.items():
+    responses[url] = {'type': 'FeatureCollection', 'features': features}
+asyncdatafetcher._get_json = responses.get
+os.chdir(sys.argv[1])
+
+# shapely is not loaded yet
+assert type(sys.modules.get('shapely')).__name__ in ('NoneType',
+                                                    '_LazyModule')
+stations, warnings = pipeline.startup(3, use_pickle_caches=False)
+print(len(warnings), sum(w.region is not None for w in warnings))
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code, str(tmp_path)],
+                            cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-2:] == ["2", "2"]
@@ -0,0 +1,64 @@
+"""Unit test for the plot module"""
+
+import os
+import pytest
+import plotly.graph_objects as go
+from floodsystem.plot import render_figure, render_figures
+
+
+def test_render_figure_returns_figure():
+    fig = go.Figure()
+    assert render_figure(fig, output='figure') is fig
+
+
+def test_render_figures_share_plotlyjs(tmp_path):
+    figs = {'a': go.Figure(), 'b': go.Figure()}
+    filenames = render_figures(figs, str(tmp_path))
+
+    assert [os.path.basename(f) for f in filenames] == ['a.html', 'b.html']
+    # plotly.js is written once and referenced rather than embedded
+    assert os.path.isfile(os.path.join(str(tmp_path), 'plotly.min.js'))
+    for filename in filenames:
+        assert os.path.getsize(filename) < 100000
+
+    filenames = render_figures(figs, str(tmp_path), output='json')
+    assert all(f.endswith('.json') for f in filenames)
+
+
+def test_water_levels_plot_downsampled():
+    from floodsystem.plot import create_water_levels_plot
+    from floodsystem.station import MonitoringStation
+    from .test_analysis import make_series
+
+    station = MonitoringStation("s", "m", "Station", (52.0, 0.0), (0.1, 0.9),
+                                "River", "Town")
+    dates, levels = make_series(20000)
+
+    fig = create_water_levels_plot([station, dates, levels], width=500)
+    assert len(fig.data[0].x) <= 1000
+    assert max(fig.data[0].y) == 5.0
+
+    fig = create_water_levels_plot([station, dates, levels], method=None)
+    assert len(fig.data[0].x) == 20000
+
+    with pytest.raises(ValueError):
+        create_water_levels_plot([station, dates, levels], width=0)
+
+
+def test_flood_warning_map_station_levels():
+    from floodsystem.plot import create_flood_warning_map
+    from floodsystem.station import MonitoringStation
+    from floodsystem.stationdata import build_station_dataframe
+
+    stations = [MonitoringStation("s{}".format(i), "m{}".format(i),
+                                  "Station {}".format(i), (52.0, 0.1 * i),
+                                  (0.1, 0.9), "River", "Town")
+                for i in range(3)]
+    stations[0].latest_level = 0.0
+    stations[1].latest_level = 0.5
+
+    fig = create_flood_warning_map(None, station_df=build_station_dataframe(
+        stations))
+    # a reading of zero is shown, and a missing reading is not available
+    assert list(fig.data[0].customdata[:, 1]) == ["0.0 m", "0.5 m",
+                                                  "Not available"]
@@ -0,0 +1,41 @@
+"""Unit test for the profiling module"""
+
+import os
+import pstats
+import time
+from floodsystem import profiling
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_profile_call_sample(tmp_path):
+    output = str(tmp_path / 'run')
+    result = profiling.profile_call(busy, 0.2, mode='sample', output=output,
+                                    interval=0.002, memory=True)
+    assert result > 0
+
+    with open(output + '.collapsed') as f:
+        lines = f.read().splitlines()
+    assert lines
+    stack, n = lines[0].rsplit(" ", 1)
+    assert int(n) > 0
+    assert stack.startswith("MainThread;")
+    assert any("test_profiling.py:busy" in line for line in lines)
+
+
+def test_profile_call_cprofile(tmp_path):
+    output = str(tmp_path / 'run')
+    profiling.main(lambda: busy(0.05),
+                   ['--profile', 'cprofile', '--profile-output', output])
+    assert os.path.exists(output + '.prof')
+    stats = pstats.Stats(output + '.prof')
+    assert any(func[2] == 'busy' for func in stats.stats)
+
+    # without options the function is just called
+    assert profiling.main(lambda: 1, []) == 1
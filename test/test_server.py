@@ -0,0 +1,89 @@
+"""Unit test for the server module"""
+
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from floodsystem import server as server_module
+from floodsystem.monitor import FloodMonitor
+from floodsystem.server import FloodRequestHandler, create_server
+from floodsystem.warning import SeverityLevel
+from .test_monitor import make_source
+
+
+def test_server_queries():
+    source = make_source()
+    monitor = FloodMonitor(SeverityLevel.moderate, use_pickle_caches=False,
+                           source=source)
+    monitor.run_pending()
+
+    server = create_server(monitor, port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = "http://127.0.0.1:{}".format(server.server_address[1])
+
+    def get(path):
+        with urlopen(base + path) as response:
+            return json.loads(response.read())
+
+    try:
+        station = monitor.stations[0]
+        lat, long = station.coord
+
+        assert get("/status")['stations'] == len(monitor.stations)
+
+        warnings = get("/warnings?lat={}&long={}".format(lat, long))
+        assert [w['id'] for w in warnings] == ["W0"]
+
+        near = get("/stations/near?lat={}&long={}&radius=1".format(lat, long))
+        assert near[0]['station_id'] == station.station_id
+
+        on_river = get("/stations/river?name=River+Thames")
+        assert len(on_river) == 55
+
+        highest = get("/stations/highest?n=2")
+        assert len(highest) == 2
+
+        with urlopen(base + "/metrics") as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+
+        for path, status in [("/warnings?lat=x&long=0", 400),
+                             ("/stations/highest?n=0", 400),
+                             ("/stations/highest?n=-1", 400),
+                             ("/unknown", 404)]:
+            try:
+                get(path)
+                assert False
+            except HTTPError as e:
+                assert e.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_levels_read_under_lock(monkeypatch):
+    source = make_source()
+    monitor = FloodMonitor(SeverityLevel.moderate, use_pickle_caches=False,
+                           source=source)
+    monitor.run_pending()
+    station = monitor.stations[0]
+    lat, long = station.coord
+
+    # levels are changed by refresh_levels, so are only read under the lock
+    station_to_dict = server_module.station_to_dict
+    locked = []
+
+    def station_to_dict_recorded(*args, **kwargs):
+        locked.append(monitor.lock._is_owned())
+        return station_to_dict(*args, **kwargs)
+
+    monkeypatch.setattr(server_module, 'station_to_dict',
+                        station_to_dict_recorded)
+    params = {'lat': str(lat), 'long': str(long), 'radius': '1',
+              'name': 'River Thames', 'n': '2'}
+    for handler in [FloodRequestHandler.stations_near,
+                    FloodRequestHandler.stations_on_river,
+                    FloodRequestHandler.stations_highest]:
+        del locked[:]
+        assert handler(monitor, params)
+        assert locked and all(locked)
@@ -27,3 +27,22 @@ def test_create_monitoring_station():
     assert s.town == town
     
     assert s.typical_range_consistent() == (s.typical_range[0] <= s.typical_range[1])
+
+
+def test_monitoring_station_is_compact():
+
+    s = MonitoringStation("test-s-id", "test-m-id", "some station", None,
+                          None, "River X", "My Town")
+    assert s.coord is None
+    assert not hasattr(s, '__dict__')
+
+    # coordinates are stored as a (lat, long) tuple of floats, built once
+    s.coord = [52, 0.1]
+    assert s.coord == (52.0, 0.1)
+    assert s.coord is s.coord
+
+    # river and town names are shared between stations
+    t = MonitoringStation("test-s-id-2", "test-m-id-2", "other station",
+                          (52.1, 0.2), None, "".join(["River ", "X"]),
+                          "My Town")
+    assert t.river is s.river
@@ -3,7 +3,9 @@
 # SPDX-License-Identifier: MIT
 """Unit test for the stationdata module"""
 
-from floodsystem.stationdata import build_station_list, update_water_levels
+from math import isclose, isnan
+from floodsystem.stationdata import build_station_list, update_water_levels, \
+    build_station_dataframe
 
 
 def test_build_station_list():
@@ -28,3 +30,32 @@ def test_update_level():
             counter += 1
 
     assert counter > 0
+
+
+def test_build_station_dataframe():
+    """Test the station dataframe columns against the station methods"""
+
+    stations = build_station_list(use_cache=False, test=True)
+    for i, station in enumerate(stations):
+        # give some stations a level, leaving others unavailable
+        if i % 3:
+            station.latest_level = 0.1 * (i % 17)
+
+    df = build_station_dataframe(stations)
+    assert len(df) == len(stations)
+    assert df['level'].dtype == float
+    assert df['town'].dtype == 'category'
+
+    for station, rel_level, level in zip(stations, df['rel_level'],
+                                         df['level']):
+        expected = station.relative_water_level()
+        if expected is None:
+            assert rel_level == 0
+        else:
+            assert isclose(rel_level, expected)
+        # a reading of zero is kept, and only a missing reading is NaN
+        if station.latest_level is not None:
+            assert level == station.latest_level
+        else:
+            assert isnan(level)
+    assert (df['level'] == 0.0).sum() > 0
@@ -0,0 +1,84 @@
+"""Unit test for the stubserver module"""
+
+import datetime
+import pytest
+import requests
+from floodsystem import datafetcher
+from floodsystem.stationdata import build_station_list, update_water_levels
+from floodsystem.stubserver import StubAPIServer, RecordedDataset
+from floodsystem.synthetic import SyntheticDataset
+from floodsystem.warningdata import build_warning_list
+
+
+@pytest.fixture
+def stub_server(tmp_path, monkeypatch):
+    # the datafetcher cache is written to the working directory
+    monkeypatch.chdir(tmp_path)
+    dataset = SyntheticDataset(n_stations=200, n_warnings=5,
+                               polygon_vertices=20)
+    with StubAPIServer(dataset) as server:
+        datafetcher.set_base_url(server.url)
+        yield server
+    datafetcher.set_base_url()
+
+
+def test_stub_server_stations(stub_server):
+    stations = build_station_list(use_cache=False)
+    assert len(stations) == 200
+    update_water_levels(stations)
+    assert any(s.latest_level is not None for s in stations)
+
+    # measure urls refer to the stub server
+    measure_id = stations[0].measure_id
+    assert measure_id.startswith(stub_server.url)
+    dates, levels = datafetcher.fetch_measure_levels(
+        measure_id, datetime.timedelta(hours=2))
+    assert len(dates) == len(levels) == 8
+
+    assert stub_server.stats['stations'] == 1
+    assert stub_server.stats['measures'] == 1
+    assert stub_server.stats['readings'] == 1
+
+
+def test_stub_server_warnings(stub_server):
+    warnings = build_warning_list(4, use_pickle_caches=False)
+    assert len(warnings) == 5
+    assert all(w.region is not None for w in warnings)
+    assert stub_server.stats['area'] == 5
+    assert stub_server.stats['polygon'] == 5
+
+
+def test_stub_server_errors(stub_server):
+    stub_server.error_rate = 1.0
+    response = requests.get(datafetcher.station_data_url())
+    assert response.status_code == 503
+    assert stub_server.stats['errors'] == 1
+
+    stub_server.error_rate = 0.0
+    response = requests.get(stub_server.url + "/id/unknown")
+    assert response.status_code == 404
+
+
+def test_recorded_dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dataset = SyntheticDataset(n_stations=20, n_warnings=2,
+                               polygon_vertices=20)
+    (tmp_path / 'floodAreas').mkdir()
+    datafetcher.dump(dataset.station_data(), tmp_path / 'station_data.json')
+    datafetcher.dump(dataset.level_data(), tmp_path / 'level_data.json')
+    datafetcher.dump(dataset.warning_data(), tmp_path / 'warning_data.json')
+    for w in dataset.warning_data()['items']:
+        identifier = w['floodAreaID']
+        path = tmp_path / 'floodAreas' / identifier
+        datafetcher.dump(dataset.flood_area(identifier),
+                         str(path) + '.json')
+        datafetcher.dump(dataset.polygon(identifier),
+                         str(path) + '_polygon.json')
+
+    with StubAPIServer(RecordedDataset(str(tmp_path))) as server:
+        datafetcher.set_base_url(server.url)
+        try:
+            warnings = build_warning_list(4, use_pickle_caches=False)
+        finally:
+            datafetcher.set_base_url()
+    assert len(warnings) == 2
@@ -0,0 +1,50 @@
+"""Unit test for the synthetic module"""
+
+import datetime
+from floodsystem.datafetcher import parse_measure_levels
+from floodsystem.stationdata import build_station_list, update_water_levels
+from floodsystem.synthetic import SyntheticDataset
+from floodsystem.warningdata import build_warning_list
+
+
+def test_synthetic_stations_and_levels():
+    for distribution in ['uniform', 'clustered']:
+        dataset = SyntheticDataset(n_stations=500, n_warnings=0,
+                                   distribution=distribution)
+        source = dataset.source()
+        stations = build_station_list(source=source)
+        assert len(stations) == 500
+        assert all(50.0 <= s.coord[0] <= 55.8 for s in stations)
+
+        update_water_levels(stations, source=source)
+        with_level = [s for s in stations if s.latest_level is not None]
+        assert 400 < len(with_level) < 500
+
+    # the same seed gives the same data
+    assert SyntheticDataset(n_stations=10, seed=3).station_data() == \
+        SyntheticDataset(n_stations=10, seed=3).station_data()
+
+
+def test_synthetic_warnings():
+    dataset = SyntheticDataset(n_stations=100, n_warnings=20,
+                               polygon_vertices=30)
+    warnings = build_warning_list(4, use_pickle_caches=False,
+                                  source=dataset.source())
+    assert len(warnings) == 20
+    for w in warnings:
+        assert w.label is not None
+        assert len(w.region) == 1 and w.region[0].is_valid
+        assert 1 <= w.severity_lev <= 4
+
+    # warnings of a higher severity only
+    severe = build_warning_list(1, use_pickle_caches=False,
+                                source=dataset.source())
+    assert all(w.severity_lev == 1 for w in severe)
+
+
+def test_synthetic_readings():
+    dataset = SyntheticDataset(n_stations=1)
+    measure_id = dataset.station_data()['items'][0]['measures'][0]['@id']
+    dates, levels = parse_measure_levels(
+        dataset.readings(measure_id, dt=datetime.timedelta(days=1)))
+    assert len(dates) == len(levels) == 96
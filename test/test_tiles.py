@@ -0,0 +1,59 @@
+"""Unit test for the tiles module"""
+
+import json
+import os
+from floodsystem.stationdata import build_station_list, \
+    build_station_dataframe
+from floodsystem.tiles import tile_bounds, tile_containing, build_tiles, \
+    export_tiles
+from floodsystem.warning import FloodWarning
+
+
+def test_tile_bounds():
+    # the zoom level 0 tile covers the whole web mercator projection
+    min_long, min_lat, max_long, max_lat = tile_bounds(0, 0, 0)
+    assert (min_long, max_long) == (-180.0, 180.0)
+    assert 85 < max_lat < 86 and -86 < min_lat < -85
+
+    # a point is within the bounds of the tile which contains it
+    cambridge = (52.2053, 0.1218)
+    for z in [5, 10, 15]:
+        x, y = tile_containing(cambridge, z)
+        bounds = tile_bounds(z, x, y)
+        assert bounds[0] <= cambridge[1] <= bounds[2]
+        assert bounds[1] <= cambridge[0] <= bounds[3]
+
+
+def test_build_and_export_tiles(tmp_path):
+    geojson_geometry = {"type": "Polygon",
+                        "coordinates": [[[0.1, 52.1], [0.3, 52.1],
+                                         [0.3, 52.3], [0.1, 52.3],
+                                         [0.1, 52.1]]]}
+    warning = FloodWarning(identifier="TEST1", severity_lev=2)
+    warning.region = [FloodWarning.geo_json_to_shape(geojson_geometry)]
+
+    stations = build_station_list(use_cache=False, test=True)
+    station_df = build_station_dataframe(stations)
+
+    tiles = build_tiles([warning], station_df, min_zoom=5, max_zoom=8)
+    assert {key[0] for key in tiles} == {5, 6, 7, 8}
+
+    # every station appears once per zoom level
+    for z in range(5, 9):
+        n_stations = sum(1 for key, t in tiles.items() if key[0] == z
+                         for f in t['features']
+                         if f['properties']['layer'] == 'stations')
+        assert n_stations == len(stations)
+
+    # the warning is found in the tile containing its centre
+    x, y = tile_containing((52.2, 0.2), 8)
+    ids = [f['properties'].get('FWS_TACODE')
+           for f in tiles[(8, x, y)]['features']]
+    assert "TEST1" in ids
+
+    export_tiles(tiles, str(tmp_path))
+    with open(os.path.join(str(tmp_path), 'tiles.json')) as f:
+        metadata = json.load(f)
+    assert (metadata['minzoom'], metadata['maxzoom']) == (5, 8)
+    assert os.path.isfile(os.path.join(str(tmp_path), '8', str(x),
+                                       '{}.geojson'.format(y)))
@@ -1,5 +1,8 @@
 """Unit test for the utils module"""
 
+import os
+import subprocess
+import sys
 import floodsystem.utils
 
 
@@ -55,3 +58,35 @@ def test_reverse_sort():
     assert list1[0] == c
     assert list1[1] == a
     assert list1[2] == b
+
+
+def test_round_coordinates():
+    """Test rounding of nested coordinates"""
+
+    coords = (((0.123456, 52.654321), (1.5, 2.25)),)
+    assert floodsystem.utils.round_coordinates(coords, 2) == \
+        [[[0.12, 52.65], [1.5, 2.25]]]
+
+
+def test_lazy_import():
+    """Test heavy dependencies are only loaded when used"""
+
+    module = floodsystem.utils.lazy_import('json')
+    assert module.dumps([1]) == "[1]"
+    assert floodsystem.utils.lazy_import('json') is module
+
+    # import the modules in a fresh interpreter, and list the heavy
+    # dependencies which were loaded
+    code = """
+import sys
+import floodsystem.index, floodsystem.plot, floodsystem.stationdata, \\
+    floodsystem.warningdata
+print(' '.join(m for m in ['numpy', 'pandas', 'plotly.graph_objects',
+                           'requests', 'shapely']
+               if m in sys.modules
+               and type(sys.modules[m]).__name__ != '_LazyModule'))
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
@@ -23,4 +23,66 @@ def test_coord_in_region():
 
     # should be outside the region
     assert (not warning.coord_in_region((3.5, 50.5)))
-    assert (not warning.coord_in_region((4.2, 81.3)))
\ No newline at end of file
+    assert (not warning.coord_in_region((4.2, 81.3)))
+
+
+def test_coords_in_region():
+    geojson_geometry = {"type": "Polygon",
+                        "coordinates": [[[50.0, 0.0], [51.0, 0.0],
+                                         [51.0, 1.0], [50.0, 1.0],
+                                         [50.0, 0.0]]]}
+    warning = FloodWarning()
+    warning.region = [FloodWarning.geo_json_to_shape(geojson_geometry)]
+    coords = [(0.5, 50.5), (0.8, 50.1), (3.5, 50.5), (4.2, 81.3)]
+
+    inside = warning.coords_in_region(coords)
+    assert inside.tolist() == [warning.coord_in_region(c) for c in coords]
+    assert FloodWarning().coords_in_region(coords).tolist() == [False] * 4
+    assert warning.coords_in_region([]).shape == (0,)
+
+    masks = FloodWarning.warning_masks([warning, FloodWarning()], coords)
+    assert masks.shape == (2, 4)
+    assert masks[0].tolist() == [True, True, False, False]
+    assert not masks[1].any()
+
+
+def test_load_geometry_concurrently():
+    import threading
+    from floodsystem import geometrystore
+
+    features = [{"type": "Feature", "properties": {},
+                 "geometry": {"type": "Polygon",
+                              "coordinates": [[[0.0, 50.0], [1.0, 50.0],
+                                               [1.0, 51.0], [0.0, 50.0]]]}}]
+    geometry = geometrystore.store.intern(features)
+    params = {'tol': 0.0, 'buf': 0.0}
+
+    # the loaders of different warnings run at the same time, as they would
+    # while fetching regions, rather than one after another
+    both_loading = threading.Barrier(2, timeout=5)
+
+    def loader():
+        both_loading.wait()
+        return geometry, params
+
+    warnings = [FloodWarning(identifier=str(i)) for i in range(2)]
+    for w in warnings:
+        w.set_geometry_loader(loader)
+    threads = [threading.Thread(target=w.load_geometry) for w in warnings]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not both_loading.broken
+    assert all(w.geometry is geometry for w in warnings)
+
+    # a geometry assigned while the loader runs is kept
+    warning = FloodWarning()
+
+    def slow_loader():
+        warning.geojson = None
+        return geometry, params
+
+    warning.set_geometry_loader(slow_loader)
+    warning.load_geometry()
+    assert warning.geometry_loaded and warning.geometry is None
@@ -0,0 +1,111 @@
+"""Unit test for the warningcache module"""
+
+import mmap
+from floodsystem import warningcache
+from floodsystem.warningdata import load_poly_area_caches, \
+    update_poly_area_caches, apply_cached_poly
+from floodsystem.warning import FloodWarning
+from .test_warningdata import make_square_warning
+
+
+def make_cached_warning(identifier, x, y):
+    warning = make_square_warning(identifier, x, y)
+    warning.area_json = {'items': {'label': identifier,
+                                   'description': "Area " + identifier}}
+    return warning
+
+
+def test_write_and_read_cache(tmp_path):
+    filename = str(tmp_path / 'test.cache')
+    a = make_cached_warning("A", 0.0, 50.0)
+    b = make_cached_warning("B", 1.0, 50.0)
+    b.simplify_geojson(tol=0.01, buf=0.01)
+    # a warning of another severity for the same area shares its region
+    b2 = make_cached_warning("B", 1.0, 50.0)
+    b2.id = "B2"
+    b2.is_poly_simplified = {'tol': 0.01, 'buf': 0.01}
+    warningcache.write_cache(filename, [a, b, b2])
+
+    with warningcache.WarningCache(filename) as cache:
+        assert set(cache.regions) == {"A", "B", "B2"}
+        assert cache.areas["A"]['items']['label'] == "A"
+
+        geometry, simplified_params = cache.regions["A"]
+        assert geometry is a.geometry
+        assert simplified_params == {'tol': 0.0, 'buf': 0.0}
+
+        geometry, simplified_params = cache.regions["B"]
+        assert simplified_params == {'tol': 0.01, 'buf': 0.01}
+        assert cache.regions["B2"][0] is geometry
+        assert cache.regions.get("C") is None
+
+    # regions not already held are decoded from the cache, once
+    del a, b, b2, geometry
+    with warningcache.WarningCache(filename) as cache:
+        geometry, simplified_params = cache.regions["B"]
+        assert cache.regions["B2"][0] is geometry
+        assert geometry.region[0].bounds == (1.0, 50.0, 2.0, 51.0)
+        assert geometry.geojson[0]['properties']['FWS_TACODE'] == "B"
+        simplified = geometry.simplified_versions()[(0.01, 0.01)]
+        assert FloodWarning.geo_json_to_shape(
+            simplified[0]['geometry']).area > geometry.region[0].area
+
+    # entries of a previous cache are kept, and replaced by new warnings
+    c = make_cached_warning("C", 2.0, 50.0)
+    a_moved = make_cached_warning("A", 5.0, 50.0)
+    warningcache.write_cache(filename, [c, a_moved],
+                             warningcache.read_cache(filename))
+    cache = warningcache.read_cache(filename)
+    assert set(cache.regions) == {"A", "B", "B2", "C"}
+    assert cache.regions["A"][0].region[0].equals(a_moved.region[0])
+    assert cache.regions["B"][1] == {'tol': 0.01, 'buf': 0.01}
+    assert cache.regions["B"][0].simplified_versions()
+    cache.close()
+
+
+def test_write_cache_detaches_open_caches(tmp_path):
+    filename = str(tmp_path / 'test.cache')
+    warningcache.write_cache(filename, [make_cached_warning("A", 3.0, 50.0)])
+    cache = warningcache.read_cache(filename)
+    assert isinstance(cache._data, mmap.mmap)
+
+    # the file is rewritten while the open cache is still in use, e.g. by
+    # geometry loaders; the open cache no longer maps it, but still reads
+    # its regions from a copy
+    warningcache.write_cache(filename, [make_cached_warning("B", 4.0, 50.0)],
+                             warningcache.read_cache(filename))
+    assert not isinstance(cache._data, mmap.mmap)
+    geometry, _ = cache.regions["A"]
+    assert geometry.region[0].bounds == (3.0, 50.0, 4.0, 51.0)
+
+    with warningcache.WarningCache(filename) as new:
+        assert set(new.regions) == {"A", "B"}
+    assert not list(warningcache._open_caches)
+
+
+def test_read_invalid_cache(tmp_path):
+    assert warningcache.read_cache(str(tmp_path / 'missing.cache')) is None
+
+    filename = tmp_path / 'old.cache'
+    filename.write_bytes(warningcache._HEADER.pack(
+        warningcache.MAGIC, warningcache.FORMAT_VERSION + 1, 0))
+    assert warningcache.read_cache(str(filename)) is None
+
+
+def test_update_poly_area_caches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert load_poly_area_caches() == ({}, {})
+
+    update_poly_area_caches([make_cached_warning("A", 0.0, 50.0)])
+    update_poly_area_caches([make_cached_warning("B", 1.0, 50.0)])
+    polys, areas = load_poly_area_caches()
+    assert set(polys) == {"A", "B"} and set(areas) == {"A", "B"}
+
+    warning = FloodWarning(identifier="B")
+    apply_cached_poly(warning, polys)
+    assert warning.region[0].bounds == (1.0, 50.0, 2.0, 51.0)
+
+    update_poly_area_caches([make_cached_warning("C", 2.0, 50.0)],
+                            overwrite=True)
+    polys, areas = load_poly_area_caches()
+    assert set(polys) == {"C"}
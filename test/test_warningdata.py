@@ -1,5 +1,6 @@
 from floodsystem.warningdata import build_warning_list, build_regions_geojson,\
-    build_severity_dataframe, save_to_pickle_cache, retrieve_pickle_cache
+    build_severity_dataframe, save_to_pickle_cache, retrieve_pickle_cache, \
+    build_regions_topojson
 from floodsystem.warning import FloodWarning, SeverityLevel
 
 import os
@@ -51,3 +52,138 @@ def test_pickle_dump_and_receive():
     assert (retrieved_data == test_data)
 
     os.remove('cache/test_file.pk')
+
+
+def make_square_warning(identifier, x, y, size=1.0):
+    """Create a warning with a square region with corner (x, y), where x is
+    the longitude and y the latitude."""
+    geometry = {"type": "Polygon",
+                "coordinates": [[[x, y], [x + size, y], [x + size, y + size],
+                                 [x, y + size], [x, y]]]}
+    feature = {"type": "Feature",
+               "properties": {"FWS_TACODE": identifier, "AREA": "Test"},
+               "geometry": geometry}
+    warning = FloodWarning(identifier=identifier, geojson=[feature])
+    warning.region = [FloodWarning.geo_json_to_shape(geometry)]
+    return warning
+
+
+def test_build_regions_geojson_compact():
+    warning = make_square_warning("A", 0.123456789, 50.987654321)
+    geojson = build_regions_geojson([warning], precision=3,
+                                    properties=['FWS_TACODE'])
+
+    feature = geojson['features'][0]
+    assert feature['properties'] == {'FWS_TACODE': 'A'}
+    assert feature['geometry']['coordinates'][0][0] == [0.123, 50.988]
+
+    # the warning's own geometry is not modified
+    assert warning.geojson[0]['properties']['AREA'] == 'Test'
+    assert warning.geojson[0]['geometry']['coordinates'][0][0][0] \
+        == 0.123456789
+
+
+def test_build_regions_topojson():
+    # two squares sharing an edge, and a duplicate of the first square
+    warnings = [make_square_warning("A", 0.0, 50.0),
+                make_square_warning("B", 1.0, 50.0),
+                make_square_warning("C", 0.0, 50.0)]
+    topology = build_regions_topojson(warnings, quantization=101)
+
+    assert topology['type'] == 'Topology'
+    geometries = topology['objects']['regions']['geometries']
+    assert [g['id'] for g in geometries] == ["A", "B", "C"]
+
+    # the shared edge and the duplicate square are only stored once
+    assert len(topology['arcs']) == 3
+
+    # decode the arcs and check that each region is reconstructed
+    scale = topology['transform']['scale']
+    translate = topology['transform']['translate']
+    arcs = []
+    for arc in topology['arcs']:
+        x, y = 0, 0
+        points = []
+        for dx, dy in arc:
+            x, y = x + dx, y + dy
+            points.append((x * scale[0] + translate[0],
+                           y * scale[1] + translate[1]))
+        arcs.append(points)
+
+    for warning, geometry in zip(warnings, geometries):
+        ring = []
+        for i in geometry['arcs'][0]:
+            points = arcs[i] if i >= 0 else arcs[~i][::-1]
+            ring.extend(points if not ring else points[1:])
+        region = FloodWarning.geo_json_to_shape(
+            {"type": "Polygon", "coordinates": [ring]})
+        assert region.symmetric_difference(warning.region[0]).area < 1e-6
+
+
+def test_build_warning_list_lazy_geometry(tmp_path, monkeypatch):
+    from .test_monitor import make_source
+    from floodsystem.warningdata import update_poly_area_caches, \
+        load_poly_area_caches
+    source = make_source()
+    monkeypatch.chdir(tmp_path)
+    warnings = build_warning_list(4, use_pickle_caches=False, source=source,
+                                  lazy_geometry=True)
+    assert len(warnings) == 2
+    assert all(w.label is not None for w in warnings)
+    assert source.calls.get('fetch_warning_region', 0) == 0
+
+    # text-only use does not load the geometry
+    build_severity_dataframe(warnings)
+    assert not any(w.geometry_loaded for w in warnings)
+
+    # the regions of warnings which were not loaded are not cached
+    assert warnings[0].region is not None
+    assert warnings[0].geometry_loaded and not warnings[1].geometry_loaded
+    assert source.calls['fetch_warning_region'] == 1
+    update_poly_area_caches(warnings)
+    polys, areas = load_poly_area_caches()
+    assert set(polys) == {warnings[0].id}
+
+    # the geometry is then loaded from the cache
+    warnings = build_warning_list(4, source=source, lazy_geometry=True)
+    assert warnings[0].geojson[0]['properties'] is not None
+    assert source.calls['fetch_warning_region'] == 1
+
+
+def test_refresh_warning_list():
+    from .test_monitor import make_source, make_warning_data
+    from floodsystem.warningdata import refresh_warning_list
+    source = make_source()
+
+    changes = refresh_warning_list([], 4, use_pickle_caches=False,
+                                   source=source)
+    assert [w.id for w in changes.added] == ["W0", "W1"]
+    assert changes.changed == [] and changes.removed == []
+    warnings = changes.warnings
+
+    # a new warning is added, W0 is updated and W1 has expired
+    w2, area, poly = make_warning_data("W2", (52.0, 0.1), 3, "t0")
+    source.areas[area[0]] = area[1]
+    source.regions[poly[0]] = poly[1]
+    w0 = dict(source.warning_data['items'][0], timeMessageChanged="t1",
+              message="Updated")
+    source.warning_data = {'items': [w0, w2]}
+
+    changes = refresh_warning_list(warnings, 4, use_pickle_caches=False,
+                                   source=source)
+    assert changes
+    assert [w.id for w in changes.warnings] == ["W0", "W2"]
+    assert [w.id for w in changes.added] == ["W2"]
+    assert [w.id for w in changes.changed] == ["W0"]
+    assert changes.removed == [warnings[1]]
+
+    updated = changes.changed[0]
+    assert updated.message == "Updated"
+    assert updated.label == warnings[0].label
+    assert updated.region is warnings[0].region
+    assert source.calls['fetch_warning_region'] == 3
+    assert source.calls['fetch_warning_area'] == 3
+
+    # nothing has changed
+    assert not refresh_warning_list(changes.warnings, 4,
+                                    use_pickle_caches=False, source=source)